@@ -0,0 +1,353 @@
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from shared import Shared, connect_sqlite
+from weather_record import Record, to_dicts
+
+# Метрика -> (нижняя граница, ширина корзины) для скетча квантилей
+METRIC_BINS = {
+    'temperature_c': (-90.0, 0.5),
+    'feelslike_c': (-90.0, 0.5),
+    'humidity': (0.0, 1.0),
+    'wind_kph': (0.0, 1.0),
+    'pressure_mb': (850.0, 1.0),
+}
+
+GRANULARITIES = {
+    'hour': 13,   # 'YYYY-MM-DD HH'
+    'day': 10,    # 'YYYY-MM-DD'
+}
+
+# Сколько сводок держать в памяти при хранении в SQLite (остальные читаются с диска)
+MAX_CACHED_STATS = 4096
+
+
+def _norm(name: str) -> str:
+    """Ключ сводки: название без учета регистра"""
+    return name.strip().lower()
+
+
+class RollingStats:
+    """
+    Инкрементальная статистика одной метрики
+
+    Среднее и дисперсия считаются по Уэлфорду, квантили - по
+    разреженной гистограмме с фиксированной шириной корзины. Обновление
+    и слияние выполняются за O(1) от числа наблюдений.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'low', 'width', 'bins')
+
+    def __init__(self, low: float = -90.0, width: float = 0.5):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.low = low
+        self.width = width
+        self.bins: Dict[int, int] = {}
+
+    def add(self, value: float):
+        """Учесть одно значение"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        index = int((value - self.low) // self.width)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: 'RollingStats'):
+        """Слияние с другой статистикой (формула Чана)"""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for index, n in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + n
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Приближенный квантиль (середина корзины, с точностью до width)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= target:
+                value = self.low + (index + 0.5) * self.width
+                return min(self.max, max(self.min, value))
+        return self.max
+
+    def summary(self) -> Dict:
+        """Сводка в виде словаря"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 2),
+            'std': round(math.sqrt(self.variance), 2),
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+        }
+
+    def to_state(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max, 'low': self.low,
+                'width': self.width, 'bins': self.bins}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'RollingStats':
+        stats = cls(state['low'], state['width'])
+        stats.count = state['count']
+        stats.mean = state['mean']
+        stats.m2 = state['m2']
+        stats.min = state['min']
+        stats.max = state['max']
+        stats.bins = {int(k): v for k, v in state['bins'].items()}
+        return stats
+
+    @classmethod
+    def for_metric(cls, metric: str) -> 'RollingStats':
+        low, width = METRIC_BINS.get(metric, (0.0, 1.0))
+        return cls(low, width)
+
+
+class AggregateStore:
+    """
+    Материализованные почасовые и посуточные сводки по городам и регионам
+
+    Каждое новое наблюдение (по паре город + last_updated) обновляет
+    сводки города, страны и, если передан, региона сбора; дубликаты
+    отбрасываются для каждой сводки отдельно. Состояние
+    хранится в SQLite, чтение сводки - один запрос по первичному ключу.
+    
+    Названия хранятся в нижнем регистре, поэтому поиск без учета
+    регистра идет по индексу. Сводки в памяти - LRU-кэш поверх SQLite:
+    каждая пачка сразу пишется на диск, и лишние записи вытесняются.
+    """
+
+    def __init__(self, db_path: Optional[str] = 'data/history/aggregates.sqlite',
+                 metrics: Tuple[str, ...] = ('temperature_c', 'humidity', 'wind_kph'),
+                 max_cached: int = MAX_CACHED_STATS):
+        """
+        Инициализация хранилища сводок
+
+        Args:
+            db_path: Путь к SQLite файлу (None - только память)
+            metrics: Метрики, по которым ведется статистика
+            max_cached: Сколько сводок держать в памяти (без db_path
+                ограничения нет: память - единственное хранилище)
+        """
+        self.db_path = db_path
+        self.metrics = metrics
+        self.max_cached = max_cached
+        self._cache: 'OrderedDict[Tuple[str, str, str, str, str], RollingStats]' = OrderedDict()
+        self._seen: Dict[Tuple[str, str, str], str] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.db_path:
+            self._conn = connect_sqlite(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aggregates ("
+                "scope TEXT NOT NULL, key TEXT NOT NULL, granularity TEXT NOT NULL, "
+                "bucket TEXT NOT NULL, metric TEXT NOT NULL, state TEXT NOT NULL, "
+                "PRIMARY KEY (scope, key, granularity, bucket, metric))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen (scope TEXT NOT NULL, key TEXT NOT NULL, "
+                "city TEXT NOT NULL, last_updated TEXT, PRIMARY KEY (scope, key, city))"
+            )
+            self._normalize_keys()
+            self._seen = {(scope, key, city): updated for scope, key, city, updated in
+                          self._conn.execute("SELECT scope, key, city, last_updated FROM seen")}
+
+    def _normalize_keys(self):
+        """Перевод названий из файлов старого формата в нижний регистр"""
+        # SQLite lower() меняет только ASCII, поэтому кириллица переводится здесь
+        for table in ('aggregates', 'seen'):
+            keys = [row[0] for row in self._conn.execute(f"SELECT DISTINCT key FROM {table}")]
+            renames = [(_norm(key), key) for key in keys if key != _norm(key)]
+            if renames:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(f"UPDATE OR REPLACE {table} SET key = ? WHERE key = ?", renames)
+
+    def _get(self, key: Tuple[str, str, str, str, str],
+             create: bool = False) -> Optional[RollingStats]:
+        """Сводка из памяти или SQLite; пустая создается только при create (для записи)"""
+        stats = self._cache.get(key)
+        if stats is not None:
+            self._cache.move_to_end(key)
+            return stats
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT state FROM aggregates WHERE scope = ? AND key = ? "
+                "AND granularity = ? AND bucket = ? AND metric = ?", key
+            ).fetchone()
+            if row is not None:
+                stats = RollingStats.from_state(json.loads(row[0]))
+        if stats is None:
+            if not create:
+                return None
+            stats = RollingStats.for_metric(key[4])
+        self._cache[key] = stats
+        return stats
+
+    def ingest_many(self, records: Iterable[Record], region: Optional[str] = None) -> int:
+        """
+        Учесть пачку наблюдений
+
+        Args:
+            records: Записи о погоде
+            region: Название региона сбора (например 'Европа')
+
+        Returns:
+            Число городов, по которым учтено новое наблюдение
+        """
+        with self._lock:
+            touched = set()
+            seen_updates = {}
+            for row in to_dicts(records):
+                city = row.get('city_name') or row.get('city')
+                updated = row.get('last_updated') or ''
+                if not city or not isinstance(updated, str) or not updated or row.get('demo_mode'):
+                    continue
+
+                scopes = [('city', _norm(city))]
+                if row.get('country'):
+                    scopes.append(('country', _norm(row['country'])))
+                if region:
+                    scopes.append(('region', _norm(region)))
+
+                for scope, name in scopes:
+                    # Повторный опрос до обновления у провайдера не учитывается
+                    seen_key = (scope, name, city)
+                    if self._seen.get(seen_key, '') >= updated:
+                        continue
+                    self._seen[seen_key] = updated
+                    seen_updates[seen_key] = updated
+
+                    for granularity, length in GRANULARITIES.items():
+                        for metric in self.metrics:
+                            value = row.get(metric)
+                            if value is None or value != value:  # None или NaN
+                                continue
+                            key = (scope, name, granularity, updated[:length], metric)
+                            self._get(key, create=True).add(float(value))
+                            touched.add(key)
+
+            if self._conn is not None and touched:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO aggregates "
+                        "(scope, key, granularity, bucket, metric, state) VALUES (?, ?, ?, ?, ?, ?)",
+                        [key + (json.dumps(self._cache[key].to_state()),) for key in touched]
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO seen (scope, key, city, last_updated) "
+                        "VALUES (?, ?, ?, ?)",
+                        [key + (updated,) for key, updated in seen_updates.items()]
+                    )
+                self._evict()
+            return len({key[2] for key in seen_updates})
+
+    def _evict(self):
+        """Вытеснение давно не использованных сводок (все они уже записаны в SQLite)"""
+        if self._conn is None:
+            return
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def ingest(self, record: Record, region: Optional[str] = None) -> bool:
+        """Учесть одно наблюдение; False, если оно уже учтено"""
+        return self.ingest_many([record], region) == 1
+
+    def summary(self, scope: str, key: str, bucket: str,
+                metric: str = 'temperature_c', granularity: str = 'day') -> Dict:
+        """
+        Готовая сводка за период
+
+        Args:
+            scope: 'city', 'country' или 'region'
+            key: Название города/страны/региона
+            bucket: Период: 'YYYY-MM-DD' для day, 'YYYY-MM-DD HH' для hour
+            metric: Метрика
+            granularity: 'hour' или 'day'
+
+        Returns:
+            Сводка или None, если наблюдений за период нет
+        """
+        with self._lock:
+            stats = self._get((scope, _norm(key), granularity, bucket, metric))
+            self._evict()
+            return stats.summary() if stats is not None else None
+
+    def buckets(self, scope: str, key: str, granularity: str = 'day',
+                metric: str = 'temperature_c') -> List[str]:
+        """Список периодов, по которым есть сводки"""
+        key = _norm(key)
+        with self._lock:
+            if self._conn is None:
+                return sorted(k[3] for k in self._cache
+                              if k[0] == scope and k[1] == key and k[2] == granularity and k[4] == metric)
+            return [row[0] for row in self._conn.execute(
+                "SELECT bucket FROM aggregates WHERE scope = ? AND key = ? AND granularity = ? "
+                "AND metric = ? ORDER BY bucket", (scope, key, granularity, metric)
+            )]
+
+    def latest_summary(self, scope: str, key: str, metric: str = 'temperature_c',
+                       granularity: str = 'day') -> Tuple[Optional[str], Dict]:
+        """
+        Сводка за последний период (название без учета регистра)
+
+        Returns:
+            (период, сводка) или (None, {'count': 0}), если данных нет
+        """
+        if self._conn is None:
+            periods = self.buckets(scope, key, granularity, metric)
+            if not periods:
+                return None, {'count': 0}
+            return periods[-1], self.summary(scope, key, periods[-1], metric, granularity) or {'count': 0}
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT bucket, state FROM aggregates WHERE scope = ? AND key = ? "
+                "AND granularity = ? AND metric = ? ORDER BY bucket DESC LIMIT 1",
+                (scope, _norm(key), granularity, metric)
+            ).fetchone()
+        if row is None:
+            return None, {'count': 0}
+        return row[0], RollingStats.from_state(json.loads(row[1])).summary()
+
+
+_shared_aggregates: Shared[AggregateStore] = Shared()
+
+
+def get_aggregate_store() -> Optional[AggregateStore]:
+    """
+    Общее для процесса хранилище сводок
+
+    Путь задается WEATHERAPI_AGGREGATES_PATH, пустое значение отключает сводки.
+    """
+    path = os.getenv('WEATHERAPI_AGGREGATES_PATH', 'data/history/aggregates.sqlite')
+    if not path:
+        return None
+    return _shared_aggregates.get(lambda: AggregateStore(path))
@@ -1,17 +1,25 @@
-import requests
-import pandas as pd
-import time
 import json
+import time
 from typing import Dict, List
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from rate_limiter import get_rate_controller
+from weather_cache import get_weather_cache
+from circuit_breaker import get_circuit_breaker, backoff_delay
+from metrics import get_metrics
+from profiler import profiled
+from weather_record import to_dicts, to_frame
 
 load_dotenv()
 
 class APIDataCollector:
     """Базовый класс для сбора данных через API"""
     
+    cacheable_endpoints = ('/current.json',)
+    max_retries = 2
+    connect_timeout = 3.05
+    
     def __init__(self, api_name: str):
         """
         Инициализация коллектора данных
@@ -21,26 +29,38 @@ class APIDataCollector:
         """
         self.api_name = api_name
         self.demo_mode = False
-        self.session = requests.Session()
+        self._session = None
         self.setup_session()
-        self.request_delay = 1.0
+        self.rate_controller = get_rate_controller()
+        self.cache = get_weather_cache()
+    
+    @property
+    def session(self):
+        """HTTP сессия; requests импортируется при первом обращении к сети"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update({
+                'User-Agent': 'DataScienceStudent/1.0',
+                'Accept': 'application/json'
+            })
+        return self._session
     
     def setup_session(self):
-        """Настройка HTTP сессии"""
-        self.session.headers.update({
-            'User-Agent': 'DataScienceStudent/1.0',
-            'Accept': 'application/json'
-        })
-        
+        """Проверка API ключа (сама сессия создается при первом запросе)"""
         api_key = os.getenv('WEATHERAPI_API_KEY')
         if not api_key or api_key == 'ваш_api_ключ_здесь':
             print("⚠️  API ключ не найден, используем демо-режим")
             self.demo_mode = True
     
+    @profiled('fetch')
     def make_request(self, endpoint: str, params: Dict = None) -> Dict:
         """
         Выполнение API запроса
         
+        Этап профилирования fetch отмечается здесь, а не вокруг HTTP:
+        так в него попадают и демо-режим, и ответы из кэша.
+        
         Args:
             endpoint: API endpoint
             params: Параметры запроса
@@ -52,68 +72,164 @@ class APIDataCollector:
             print(f"   [ДЕМО] Запрос к {endpoint}")
             return self._get_mock_data(params)
         
-        try:
-            base_url = "http://api.weatherapi.com/v1"
-            url = f"{base_url}{endpoint}"
-            request_params = params or {}
-            api_key = os.getenv('WEATHERAPI_API_KEY')
-            if api_key:
-                request_params['key'] = api_key
-            request_params['lang'] = 'ru'
-            
-            print(f"   Запрос: {url}")
-            
-            response = self.session.get(url, params=request_params, timeout=15)
-            response.raise_for_status()
+        use_cache = self.cache is not None and endpoint in self.cacheable_endpoints
+        if use_cache:
+            cached = self.cache.get(endpoint, params)
+            get_metrics().inc('weather_cache_requests_total', endpoint=endpoint,
+                              result='miss' if cached is None else 'hit')
+            if cached is not None:
+                return cached
+        
+        data = self._send('GET', endpoint, params)
+        if use_cache and data:
+            self.cache.put(endpoint, params, data)
+        return data
+    
+    @profiled('fetch')
+    def make_bulk_request(self, endpoint: str, locations: List[Dict],
+                          params: Dict = None) -> List[Dict]:
+        """
+        Выполнение bulk-запроса (POST с q=bulk) для нескольких локаций
+        
+        Args:
+            endpoint: API endpoint, поддерживающий bulk (например /current.json)
+            locations: Список {'q': ..., 'custom_id': ...}
+            params: Дополнительные параметры запроса
             
-            return response.json()
+        Returns:
+            Список элементов ответа (содержимое поля 'query' каждого элемента)
+        """
+        if self.demo_mode:
+            print(f"   [ДЕМО] Bulk-запрос к {endpoint} ({len(locations)} локаций)")
+            from synthetic_weather import get_synthetic_weather
             
-        except requests.exceptions.HTTPError as e:
-            print(f"   ❌ HTTP ошибка {e.response.status_code}: {e.response.text[:100]}")
-            return {}
-        except requests.exceptions.RequestException as e:
-            print(f"   ❌ Ошибка при запросе: {e}")
-            return {}
-        except json.JSONDecodeError as e:
-            print(f"   ❌ Ошибка декодирования JSON: {e}")
+            items = get_synthetic_weather().payloads([location['q'] for location in locations])
+            for item, location in zip(items, locations):
+                item.update(location)
+            return items
+        
+        request_params = dict(params or {})
+        request_params['q'] = 'bulk'
+        data = self._send('POST', endpoint, request_params, {'locations': locations})
+        return [item.get('query', {}) for item in data.get('bulk', [])] if data else []
+    
+    def _send(self, method: str, endpoint: str, params: Dict = None,
+              json_body: Dict = None) -> Dict:
+        """
+        Отправка HTTP запроса с учетом лимита частоты и обработкой ошибок
+        
+        Таймаут чтения берется из перцентиля наблюдаемых задержек endpoint.
+        Таймауты, сетевые ошибки, 429 и 5xx повторяются не более max_retries
+        раз с паузой и джиттером; ошибки 5xx и сетевые ошибки размыкают
+        предохранитель endpoint, после чего запросы отклоняются сразу.
+        Адрес API переопределяется переменной WEATHERAPI_BASE_URL
+        (например, локальный стенд бенчмарков). Каждая попытка попадает
+        в метрики: код ответа или тип ошибки, длительность, объем ответа,
+        повтор и ожидание в ограничителе частоты.
+        """
+        metrics = get_metrics()
+        breaker = get_circuit_breaker(endpoint)
+        if not breaker.allow_request():
+            metrics.record_request(endpoint, 'circuit_open')
+            print(f"   ⛔ Предохранитель {endpoint} разомкнут, "
+                  f"повтор через {breaker.retry_in():.0f} с")
             return {}
+        
+        import requests
+        base_url = os.getenv('WEATHERAPI_BASE_URL', 'http://api.weatherapi.com/v1').rstrip('/')
+        url = f"{base_url}{endpoint}"
+        request_params = dict(params or {})
+        api_key = os.getenv('WEATHERAPI_API_KEY')
+        if api_key:
+            request_params['key'] = api_key
+        request_params['lang'] = 'ru'
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = backoff_delay(attempt - 1)
+                print(f"   🔁 Повтор {attempt}/{self.max_retries} через {delay:.1f} с")
+                time.sleep(delay)
+                if not breaker.allow_request():
+                    print(f"   ⛔ Предохранитель {endpoint} разомкнут")
+                    metrics.record_request(endpoint, 'circuit_open', retry=True)
+                    return {}
+            
+            try:
+                waited = self.rate_controller.acquire()
+                metrics.observe('weather_rate_limit_wait_seconds', waited, endpoint=endpoint)
+                print(f"   Запрос: {url}")
+                
+                started = time.monotonic()
+                response = self.session.request(
+                    method, url, params=request_params, json=json_body,
+                    timeout=(self.connect_timeout, breaker.latency.timeout())
+                )
+                elapsed = time.monotonic() - started
+                breaker.latency.record(elapsed)
+                metrics.record_request(endpoint, response.status_code, elapsed,
+                                       len(response.content), retry=attempt > 0)
+                self.rate_controller.update_from_response(response.status_code, response.headers)
+                
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                    print(f"   ❌ HTTP ошибка {response.status_code}: {response.text[:100]}")
+                    continue
+                if response.status_code == 429:
+                    breaker.record_success()
+                    print("   ⚠️  HTTP 429: превышен лимит запросов")
+                    continue
+                
+                if response.status_code >= 400:
+                    # Ошибка в самом запросе (4xx): endpoint при этом исправен
+                    breaker.record_success()
+                    response.raise_for_status()
+                
+                payload = response.json()
+                breaker.record_success()
+                return payload
+                
+            except requests.exceptions.HTTPError as e:
+                print(f"   ❌ HTTP ошибка {e.response.status_code}: {e.response.text[:100]}")
+                return {}
+            except ValueError as e:
+                # Раньше RequestException: requests.JSONDecodeError наследует оба
+                breaker.record_failure()
+                print(f"   ❌ Ошибка декодирования JSON: {e}")
+                return {}
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                breaker.record_failure()
+                status = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection_error'
+                metrics.record_request(endpoint, status, time.monotonic() - started, retry=attempt > 0)
+                print(f"   ❌ Ошибка соединения: {e}")
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure()
+                metrics.record_request(endpoint, 'request_error', time.monotonic() - started,
+                                       retry=attempt > 0)
+                print(f"   ❌ Ошибка при запросе: {e}")
+                return {}
+        
+        return {}
+    
+    def circuit_state(self, endpoint: str) -> str:
+        """Состояние предохранителя endpoint: closed / open / half_open"""
+        return get_circuit_breaker(endpoint).state
     
     def _get_mock_data(self, params: Dict = None) -> Dict:
-        """Возвращает тестовые данные для демо-режима"""
-        import random
-        from datetime import datetime
-        
-        city_name = params.get('q', 'Test City') if params else 'Test City'
-        
-        return {
-            "location": {
-                "name": city_name,
-                "country": "Russia",
-                "lat": random.uniform(50, 60),
-                "lon": random.uniform(30, 40),
-                "localtime": datetime.now().isoformat()
-            },
-            "current": {
-                "temp_c": random.randint(-10, 25),
-                "feelslike_c": random.randint(-15, 20),
-                "humidity": random.randint(30, 90),
-                "pressure_mb": random.randint(980, 1030),
-                "wind_kph": random.uniform(0, 20),
-                "wind_dir": random.choice(['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']),
-                "cloud": random.randint(0, 100),
-                "condition": {
-                    "text": random.choice(['Sunny', 'Cloudy', 'Rainy', 'Snowy']),
-                    "icon": "//cdn.weatherapi.com/weather/64x64/day/113.png"
-                }
-            }
-        }
+        """Синтетический ответ в формате WeatherAPI для демо-режима"""
+        from synthetic_weather import get_synthetic_weather
+        
+        params = params or {}
+        city_name = params.get('q', 'Test City')
+        return get_synthetic_weather().payloads([city_name], days=params.get('days', 0))[0]
     
     def safe_request_with_delay(self, endpoint: str, params: Dict = None) -> Dict:
-        """Безопасный запрос с задержкой"""
-        result = self.make_request(endpoint, params)
-        if not self.demo_mode:
-            time.sleep(self.request_delay)
-        return result
+        """
+        Безопасный запрос с учетом лимита частоты
+        
+        Темп задает общий для процесса RateController внутри make_request,
+        поэтому фиксированная пауза после запроса не нужна.
+        """
+        return self.make_request(endpoint, params)
     
     def save_to_csv(self, data: List[Dict], filename: str):
         """
@@ -127,7 +243,7 @@ class APIDataCollector:
             print("❌ Нет данных для сохранения")
             return
         
-        df = pd.DataFrame(data)
+        df = to_frame(data)
     
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         
@@ -147,6 +263,6 @@ class APIDataCollector:
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump(to_dicts(data), f, ensure_ascii=False, indent=2)
         
         print(f"✅ JSON сохранен в {filename}")
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from weather_record import WeatherRecord
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+class AsyncWeatherAPIDataCollector:
+    """Асинхронный сборщик погоды с ограниченным пулом параллельных запросов"""
+
+    def __init__(self, collector: Optional[WeatherAPIDataCollector] = None,
+                 max_concurrency: int = 10):
+        """
+        Инициализация асинхронного сборщика
+
+        Args:
+            collector: Синхронный сборщик, чья сессия и парсер используются
+            max_concurrency: Максимальное число одновременных запросов
+        """
+        self.collector = collector or WeatherAPIDataCollector()
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix='weatherapi'
+        )
+        self._setup_connection_pool()
+
+    def _setup_connection_pool(self):
+        """Общий keep-alive пул соединений по размеру пула воркеров"""
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.max_concurrency,
+            pool_block=True
+        )
+        self.collector.session.mount('http://', adapter)
+        self.collector.session.mount('https://', adapter)
+
+    @property
+    def demo_mode(self) -> bool:
+        return self.collector.demo_mode
+
+    def _fetch_current(self, city: str) -> Dict:
+        """Блокирующий запрос текущей погоды (выполняется в пуле потоков)"""
+        return self.collector.make_request('/current.json', self.collector._current_params(city))
+
+    async def get_current_weather(self, city: str) -> Optional[WeatherRecord]:
+        """
+        Получение текущей погоды для города
+
+        Args:
+            city: Название города
+
+        Returns:
+            Запись WeatherRecord (None при ошибке)
+        """
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._executor, self._fetch_current, city)
+        return self.collector._handle_current_response(data, city)
+
+    async def collect_multiple_cities(self, cities: List[str],
+                                      on_record: Optional[Callable[[Dict], None]] = None
+                                      ) -> List[Dict]:
+        """
+        Параллельный сбор погоды для нескольких городов
+
+        Args:
+            cities: Список названий городов
+            on_record: Вызывается для каждой записи в порядке получения
+
+        Returns:
+            Список с данными о погоде в порядке входного списка
+        """
+        results: List[Optional[Dict]] = [None] * len(cities)
+
+        def keep(index: int, weather_data):
+            results[index] = weather_data
+            if on_record:
+                on_record(weather_data)
+
+        await self._collect(cities, keep)
+        return [weather_data for weather_data in results if weather_data]
+
+    async def stream_multiple_cities(self, cities: List[str],
+                                     on_record: Callable[[Dict], None]) -> int:
+        """
+        Параллельный сбор погоды без накопления записей в памяти
+
+        Args:
+            cities: Список названий городов
+            on_record: Вызывается для каждой записи в порядке получения
+
+        Returns:
+            Число полученных записей
+        """
+        return await self._collect(cities, lambda index, weather_data: on_record(weather_data))
+
+    async def _collect(self, cities: List[str], handle: Callable[[int, Dict], None]) -> int:
+        """Пул воркеров: handle(индекс города, запись) для каждой полученной записи"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(cities):
+            queue.put_nowait(item)
+        received = 0
+
+        print(f"📊 Начинаем параллельный сбор данных для {len(cities)} городов "
+              f"(потоков: {self.max_concurrency})...")
+
+        async def worker():
+            nonlocal received
+            while True:
+                try:
+                    index, city = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    weather_data = await self.get_current_weather(city)
+                    if not weather_data and self.demo_mode:
+                        weather_data = self.collector._create_mock_data(city)
+                    if weather_data:
+                        received += 1
+                        handle(index, weather_data)
+                except Exception as e:
+                    print(f"   ❌ Ошибка при сборе данных для {city}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = min(self.max_concurrency, len(cities))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+        print(f"\n{'='*50}")
+        print(f"✅ Собраны данные для {received} из {len(cities)} городов")
+        return received
+
+    def close(self):
+        """Остановка пула потоков"""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,155 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+from profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Колонка результата -> (блок ответа, ключ, тип колонки)
+CURRENT_COLUMNS = {
+    'city_name': ('location', 'name', 'string'),
+    'country': ('location', 'country', 'category'),
+    'region': ('location', 'region', 'category'),
+    'latitude': ('location', 'lat', 'float64'),
+    'longitude': ('location', 'lon', 'float64'),
+    'local_time': ('location', 'localtime', 'string'),
+
+    'temperature_c': ('current', 'temp_c', 'float64'),
+    'feelslike_c': ('current', 'feelslike_c', 'float64'),
+    'temperature_f': ('current', 'temp_f', 'float64'),
+    'feelslike_f': ('current', 'feelslike_f', 'float64'),
+
+    'humidity': ('current', 'humidity', 'Int64'),
+    'pressure_mb': ('current', 'pressure_mb', 'float64'),
+    'pressure_in': ('current', 'pressure_in', 'float64'),
+
+    'wind_kph': ('current', 'wind_kph', 'float64'),
+    'wind_mph': ('current', 'wind_mph', 'float64'),
+    'wind_dir': ('current', 'wind_dir', 'category'),
+    'wind_degree': ('current', 'wind_degree', 'Int64'),
+    'gust_kph': ('current', 'gust_kph', 'float64'),
+    'gust_mph': ('current', 'gust_mph', 'float64'),
+
+    'cloud': ('current', 'cloud', 'Int64'),
+    'visibility_km': ('current', 'vis_km', 'float64'),
+    'visibility_miles': ('current', 'vis_miles', 'float64'),
+
+    'condition_text': ('condition', 'text', 'category'),
+    'condition_icon': ('condition', 'icon', 'category'),
+    'condition_code': ('condition', 'code', 'Int64'),
+
+    'uv_index': ('current', 'uv', 'float64'),
+
+    'last_updated': ('current', 'last_updated', 'string'),
+}
+
+# Колонка результата -> (блок дня прогноза, ключ, тип колонки)
+FORECAST_COLUMNS = {
+    'date': ('forecastday', 'date', 'string'),
+    'max_temp_c': ('day', 'maxtemp_c', 'float64'),
+    'min_temp_c': ('day', 'mintemp_c', 'float64'),
+    'avg_temp_c': ('day', 'avgtemp_c', 'float64'),
+    'max_wind_kph': ('day', 'maxwind_kph', 'float64'),
+    'total_precip_mm': ('day', 'totalprecip_mm', 'float64'),
+    'avg_humidity': ('day', 'avghumidity', 'float64'),
+    'condition': ('condition', 'text', 'category'),
+    'uv_index': ('day', 'uv', 'float64'),
+    'sunrise': ('astro', 'sunrise', 'string'),
+    'sunset': ('astro', 'sunset', 'string'),
+}
+
+
+@profiled('dataframe')
+def _build_frame(columns: Dict[str, list], spec: Dict[str, tuple]) -> 'pd.DataFrame':
+    """Сборка DataFrame из готовых колонок с приведением типов"""
+    import pandas as pd
+
+    data = {}
+    for name, values in columns.items():
+        dtype = spec[name][2] if name in spec else 'string'
+        if dtype in ('float64', 'Int64'):
+            data[name] = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype(dtype)
+        else:
+            data[name] = pd.Series(values, dtype=object).astype(dtype)
+    return pd.DataFrame(data)
+
+
+@profiled('parse')
+def parse_current_batch(payloads: Sequence[Dict], cities: Optional[Sequence[str]] = None,
+                        scraped_at: Optional[str] = None) -> 'pd.DataFrame':
+    """
+    Разбор пачки ответов /current.json сразу в колоночный DataFrame
+
+    Колонки заполняются за один проход без промежуточных словарей на
+    запись; набор колонок совпадает с WeatherRecord/_parse_weather_data.
+
+    Args:
+        payloads: Сырые ответы API (элементы без блока current пропускаются)
+        cities: Исходные запросы для колонки city (по умолчанию location.name)
+        scraped_at: Время сбора (по умолчанию текущее)
+
+    Returns:
+        DataFrame с числовыми и категориальными колонками
+    """
+    import pandas as pd
+
+    scraped_at = scraped_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    columns: Dict[str, list] = {'city': []}
+    columns.update({name: [] for name in CURRENT_COLUMNS})
+    appenders = [(columns[name].append, section, key) for name, (section, key, _) in CURRENT_COLUMNS.items()]
+    city_append = columns['city'].append
+
+    for i, payload in enumerate(payloads):
+        if not payload or 'current' not in payload:
+            continue
+        current = payload['current']
+        blocks = {
+            'location': payload.get('location', {}),
+            'current': current,
+            'condition': current.get('condition', {}),
+        }
+        for append, section, key in appenders:
+            append(blocks[section].get(key))
+        city_append(cities[i] if cities is not None else blocks['location'].get('name'))
+
+    df = _build_frame(columns, CURRENT_COLUMNS)
+    df['scraped_at'] = pd.Series([scraped_at] * len(df), dtype='string')
+    return df
+
+
+@profiled('parse')
+def parse_forecast_batch(payloads: Sequence[Dict],
+                         cities: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+    """
+    Разбор пачки ответов /forecast.json в DataFrame (строка на город и день)
+
+    Args:
+        payloads: Сырые ответы API
+        cities: Исходные запросы для колонки city (по умолчанию location.name)
+
+    Returns:
+        DataFrame с колонкой city и колонками ForecastDay
+    """
+    columns: Dict[str, list] = {'city': []}
+    columns.update({name: [] for name in FORECAST_COLUMNS})
+    appenders = [(columns[name].append, section, key) for name, (section, key, _) in FORECAST_COLUMNS.items()]
+    city_append = columns['city'].append
+
+    for i, payload in enumerate(payloads):
+        if not payload or 'forecast' not in payload:
+            continue
+        city = cities[i] if cities is not None else payload.get('location', {}).get('name')
+        for day_data in payload['forecast'].get('forecastday', []):
+            day = day_data.get('day', {})
+            blocks = {
+                'forecastday': day_data,
+                'day': day,
+                'condition': day.get('condition', {}),
+                'astro': day_data.get('astro', {}),
+            }
+            for append, section, key in appenders:
+                append(blocks[section].get(key))
+            city_append(city)
+
+    return _build_frame(columns, FORECAST_COLUMNS)
+
@@ -0,0 +1,534 @@
+import copy
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_SIZES = (100, 1000, 10000)
+CASES = ('collect', 'collect_bulk', 'parse', 'save_csv', 'save_json', 'save_parquet')
+
+# Записанные ответы WeatherAPI: стенд отдает их, подставляя имя локации
+SAMPLE_CURRENT = [
+    {
+        "location": {
+            "name": "Moscow", "region": "Moscow City", "country": "Russia",
+            "lat": 55.75, "lon": 37.62, "tz_id": "Europe/Moscow",
+            "localtime_epoch": 1705309200, "localtime": "2024-01-15 12:00"
+        },
+        "current": {
+            "last_updated_epoch": 1705308300, "last_updated": "2024-01-15 11:45",
+            "temp_c": -8.0, "temp_f": 17.6, "is_day": 1,
+            "condition": {"text": "Небольшой снег",
+                          "icon": "//cdn.weatherapi.com/weather/64x64/day/326.png", "code": 1213},
+            "wind_mph": 8.1, "wind_kph": 13.0, "wind_degree": 230, "wind_dir": "SW",
+            "pressure_mb": 1012.0, "pressure_in": 29.88, "precip_mm": 0.2, "precip_in": 0.01,
+            "humidity": 86, "cloud": 100, "feelslike_c": -13.9, "feelslike_f": 7.0,
+            "vis_km": 4.0, "vis_miles": 2.0, "uv": 1.0, "gust_mph": 12.5, "gust_kph": 20.2
+        }
+    },
+    {
+        "location": {
+            "name": "Paris", "region": "Ile-de-France", "country": "France",
+            "lat": 48.87, "lon": 2.33, "tz_id": "Europe/Paris",
+            "localtime_epoch": 1705309200, "localtime": "2024-01-15 10:00"
+        },
+        "current": {
+            "last_updated_epoch": 1705308300, "last_updated": "2024-01-15 09:45",
+            "temp_c": 4.0, "temp_f": 39.2, "is_day": 1,
+            "condition": {"text": "Переменная облачность",
+                          "icon": "//cdn.weatherapi.com/weather/64x64/day/116.png", "code": 1003},
+            "wind_mph": 11.9, "wind_kph": 19.1, "wind_degree": 270, "wind_dir": "W",
+            "pressure_mb": 1019.0, "pressure_in": 30.09, "precip_mm": 0.0, "precip_in": 0.0,
+            "humidity": 75, "cloud": 50, "feelslike_c": 0.1, "feelslike_f": 32.2,
+            "vis_km": 10.0, "vis_miles": 6.0, "uv": 1.0, "gust_mph": 16.9, "gust_kph": 27.2
+        }
+    },
+    {
+        "location": {
+            "name": "Tokyo", "region": "Tokyo", "country": "Japan",
+            "lat": 35.69, "lon": 139.69, "tz_id": "Asia/Tokyo",
+            "localtime_epoch": 1705309200, "localtime": "2024-01-15 18:00"
+        },
+        "current": {
+            "last_updated_epoch": 1705308300, "last_updated": "2024-01-15 17:45",
+            "temp_c": 7.0, "temp_f": 44.6, "is_day": 0,
+            "condition": {"text": "Ясно",
+                          "icon": "//cdn.weatherapi.com/weather/64x64/night/113.png", "code": 1000},
+            "wind_mph": 5.6, "wind_kph": 9.0, "wind_degree": 320, "wind_dir": "NW",
+            "pressure_mb": 1021.0, "pressure_in": 30.15, "precip_mm": 0.0, "precip_in": 0.0,
+            "humidity": 45, "cloud": 0, "feelslike_c": 5.2, "feelslike_f": 41.4,
+            "vis_km": 10.0, "vis_miles": 6.0, "uv": 1.0, "gust_mph": 8.3, "gust_kph": 13.3
+        }
+    },
+]
+SAMPLE_FORECAST_DAY = {
+    "date": "2024-01-15", "date_epoch": 1705276800,
+    "day": {
+        "maxtemp_c": -5.2, "mintemp_c": -11.4, "avgtemp_c": -8.1, "maxwind_kph": 18.7,
+        "totalprecip_mm": 1.3, "avghumidity": 88, "uv": 1.0,
+        "condition": {"text": "Небольшой снег",
+                      "icon": "//cdn.weatherapi.com/weather/64x64/day/326.png", "code": 1213}
+    },
+    "astro": {"sunrise": "08:52 AM", "sunset": "04:32 PM"}
+}
+
+
+def load_payloads(payload_dir: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Загрузка записанных ответов API для стенда
+
+    Args:
+        payload_dir: Папка с сохраненными ответами *.json (по умолчанию
+            встроенные образцы); ответы с блоком forecast идут в прогнозы
+
+    Returns:
+        (ответы current.json, ответы forecast.json)
+    """
+    current, forecast = [], []
+    for filename in sorted(glob.glob(os.path.join(payload_dir, '*.json'))) if payload_dir else []:
+        with open(filename, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if 'forecast' in payload:
+            forecast.append(payload)
+        if 'current' in payload:
+            current.append({'location': payload.get('location', {}), 'current': payload['current']})
+
+    current = current or SAMPLE_CURRENT
+    if not forecast:
+        forecast = [dict(item, forecast={'forecastday': [SAMPLE_FORECAST_DAY]}) for item in current]
+    return current, forecast
+
+
+def _pick(pool: List[Dict], query: str) -> Dict:
+    """Ответ из набора для локации: одна и та же локация всегда получает один ответ"""
+    payload = copy.deepcopy(pool[zlib.crc32(query.encode('utf-8')) % len(pool)])
+    payload['location']['name'] = query
+    return payload
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    stub: 'StubWeatherAPI' = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status: int = 200, headers: Optional[Dict] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.stub._count('bytes', len(body))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self) -> bool:
+        """Задержка и внедренные ошибки; True, если ответ уже отправлен"""
+        status = self.stub.before_response()
+        if status == 500:
+            self._send_json({'error': {'code': 9999, 'message': 'Internal application error.'}}, 500)
+            return True
+        if status == 429:
+            self._send_json({'error': {'code': 2007, 'message': 'API key has exceeded calls per month quota.'}},
+                            429, {'Retry-After': str(self.stub.retry_after)})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        query = parse_qs(url.query).get('q', [''])[0]
+        self.stub._count(endpoint)
+        if self._inject():
+            return
+
+        if endpoint == 'current.json':
+            return self._send_json(_pick(self.stub.current, query))
+        if endpoint == 'forecast.json':
+            return self._send_json(_pick(self.stub.forecast, query))
+        if endpoint == 'search.json':
+            location = _pick(self.stub.current, query)['location']
+            return self._send_json([{
+                'id': zlib.crc32(query.encode('utf-8')), 'name': query,
+                'region': location.get('region', ''), 'country': location.get('country', ''),
+                'lat': location.get('lat'), 'lon': location.get('lon'), 'url': query.lower()
+            }])
+        self._send_json({'error': {'code': 1005, 'message': 'API request url is invalid'}}, 400)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        self.stub._count('bulk')
+        if self._inject():
+            return
+
+        items = []
+        for location in body.get('locations', []):
+            payload = _pick(self.stub.current, location.get('q', ''))
+            payload.update(location)
+            items.append({'query': payload})
+        self._send_json({'bulk': items})
+
+
+class StubWeatherAPI:
+    """
+    Локальный стенд WeatherAPI для бенчмарков
+
+    Отвечает на /v1/current.json, /v1/forecast.json, /v1/search.json и
+    bulk POST записанными ответами. Задержка, доля ошибок 5xx и доля
+    ответов 429 настраиваются; случайность воспроизводима через seed.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: int = 1, payload_dir: Optional[str] = None, seed: int = 42):
+        """
+        Инициализация стенда
+
+        Args:
+            host: Адрес сервера
+            port: Порт (0 - любой свободный)
+            latency_ms: Задержка каждого ответа в миллисекундах
+            jitter_ms: Случайная добавка к задержке (равномерно от 0 до jitter_ms)
+            error_rate: Доля ответов HTTP 500
+            throttle_rate: Доля ответов HTTP 429
+            retry_after: Значение заголовка Retry-After в ответах 429
+            payload_dir: Папка с записанными ответами (см. load_payloads)
+            seed: Зерно генератора случайных задержек и ошибок
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.current, self.forecast = load_payloads(payload_dir)
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'errors': 0, 'throttled': 0, 'bytes': 0}
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def before_response(self) -> Optional[int]:
+        """Задержка ответа и выбор внедряемой ошибки (500, 429 или None)"""
+        with self._lock:
+            self.counters['requests'] += 1
+            draw = self._random.random()
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if draw < self.error_rate:
+            self._count('errors')
+            return 500
+        if draw < self.error_rate + self.throttle_rate:
+            self._count('throttled')
+            return 429
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def start(self) -> 'StubWeatherAPI':
+        handler = type('StubWeatherAPIHandler', (_StubHandler,), {'stub': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name='stub-weatherapi').start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Пиковый RSS текущего процесса (None там, где нет модуля resource)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _locations(size: int) -> List[str]:
+    return [f"Benchmark City {i:05d}" for i in range(size)]
+
+
+def _parsed_records(collector, size: int, payload_dir: Optional[str]) -> List:
+    current, _ = load_payloads(payload_dir)
+    return [collector._parse_weather_data(_pick(current, city), city) for city in _locations(size)]
+
+
+def _run_collect(collector, size: int, payload_dir: Optional[str], out_dir: str,
+                 repeat: int, bulk: bool) -> Dict:
+    latencies = []
+    request = collector.session.request
+
+    def timed_request(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return request(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    collector.session.request = timed_request
+    started = time.perf_counter()
+    records = collector.collect_multiple_cities(_locations(size), bulk=bulk)
+    return {'records': len(records), 'seconds': time.perf_counter() - started,
+            'latencies': latencies, 'rate_limiter': collector.rate_controller.stats()}
+
+
+def _run_parse(collector, size: int, payload_dir: Optional[str], out_dir: str, repeat: int) -> Dict:
+    current, _ = load_payloads(payload_dir)
+    payloads = [(city, _pick(current, city)) for city in _locations(size)]
+    latencies = []
+    parse = collector._parse_weather_data
+    records = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for city, payload in payloads:
+            call_started = time.perf_counter()
+            if parse(payload, city):
+                records += 1
+            latencies.append(time.perf_counter() - call_started)
+    return {'records': records, 'seconds': time.perf_counter() - started, 'latencies': latencies}
+
+
+def _run_save(collector, size: int, payload_dir: Optional[str], out_dir: str,
+              repeat: int, fmt: str) -> Dict:
+    from data_saver import DataSaver
+
+    records = _parsed_records(collector, size, payload_dir)
+    target = os.path.join(out_dir, f"weather_{size}.{fmt}" if fmt != 'parquet' else f"weather_{size}")
+    save = {'csv': DataSaver.save_to_csv, 'json': DataSaver.save_to_json,
+            'parquet': DataSaver.save_to_parquet}[fmt]
+    # Первый вызов прогревает импорты pandas/pyarrow и в замер не входит
+    save(records[:1], target + '_warmup' if fmt == 'parquet' else target)
+    latencies = []
+    for _ in range(repeat):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        call_started = time.perf_counter()
+        save(records, target)
+        latencies.append(time.perf_counter() - call_started)
+    return {'records': len(records) * repeat, 'seconds': sum(latencies), 'latencies': latencies}
+
+
+_CASE_RUNNERS = {
+    'collect': lambda *args: _run_collect(*args, bulk=False),
+    'collect_bulk': lambda *args: _run_collect(*args, bulk=True),
+    'parse': _run_parse,
+    'save_csv': lambda *args: _run_save(*args, fmt='csv'),
+    'save_json': lambda *args: _run_save(*args, fmt='json'),
+    'save_parquet': lambda *args: _run_save(*args, fmt='parquet'),
+}
+
+
+def _run_case(case: str, size: int, base_url: str, payload_dir: Optional[str],
+              out_dir: str, repeat: int) -> Dict:
+    """Один замер в текущем процессе (вызывается в отдельном процессе)"""
+    # Только стенд: без кэша, истории, сводок, разрешения локаций и лимита частоты
+    os.environ.update({
+        'WEATHERAPI_BASE_URL': base_url,
+        'WEATHERAPI_API_KEY': os.getenv('BENCHMARK_API_KEY', 'benchmark'),
+        'WEATHERAPI_RATE_LIMIT': '1000000', 'WEATHERAPI_RATE_BURST': '1000000',
+        'WEATHERAPI_RATE_MAX': '1000000',
+        'WEATHERAPI_CACHE': '0', 'WEATHERAPI_RESOLVE': '0',
+        'WEATHERAPI_HISTORY_PATH': '', 'WEATHERAPI_AGGREGATES_PATH': '',
+    })
+    os.makedirs(out_dir, exist_ok=True)
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        from weatherapi_collector import WeatherAPIDataCollector
+        collector = WeatherAPIDataCollector()
+        result = _CASE_RUNNERS[case](collector, size, payload_dir, out_dir, repeat)
+
+    latencies = result.pop('latencies')
+    seconds = result['seconds']
+    result.update({
+        'case': case,
+        'size': size,
+        'seconds': round(seconds, 3),
+        'records_per_s': round(result['records'] / seconds, 1) if seconds else None,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'samples': len(latencies),
+        'peak_rss_mb': _peak_rss_mb(),
+    })
+    return result
+
+
+def _case_process(conn, *args):
+    try:
+        conn.send(_run_case(*args))
+    except Exception as e:
+        conn.send({'error': f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmark(sizes: Sequence[int] = DEFAULT_SIZES, cases: Sequence[str] = CASES,
+                  stub: Optional[StubWeatherAPI] = None, payload_dir: Optional[str] = None,
+                  output_dir: str = 'data/benchmarks', repeat: int = 3) -> Dict:
+    """
+    Прогон бенчмарков сборщика против локального стенда
+
+    Каждый замер идет в отдельном процессе, чтобы пиковый RSS относился
+    только к нему. Для сбора задержка - время HTTP запроса, для разбора -
+    вызов _parse_weather_data, для сохранения - один вызов DataSaver.
+
+    Args:
+        sizes: Числа локаций
+        cases: Замеры из CASES
+        stub: Настроенный стенд (по умолчанию без задержек и ошибок)
+        payload_dir: Папка с записанными ответами API
+        output_dir: Папка для отчета и временных файлов
+        repeat: Повторы для разбора и сохранения
+
+    Returns:
+        Отчет; он же сохраняется в output_dir/benchmark_<время>.json
+    """
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise ValueError(f"Неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    stub = stub or StubWeatherAPI(payload_dir=payload_dir)
+    own_stub = stub._server is None
+    if own_stub:
+        stub.start()
+
+    context = multiprocessing.get_context('spawn')
+    scratch = os.path.join(output_dir, 'scratch')
+    results = []
+    try:
+        for size in sizes:
+            for case in cases:
+                before = stub.stats()
+                parent_conn, child_conn = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_case_process,
+                    args=(child_conn, case, size, stub.base_url, payload_dir, scratch, repeat),
+                    name=f"benchmark-{case}-{size}"
+                )
+                process.start()
+                child_conn.close()
+                try:
+                    result = parent_conn.recv()
+                except EOFError:
+                    result = {'error': 'процесс замера завершился без результата'}
+                process.join()
+
+                after = stub.stats()
+                result.setdefault('case', case)
+                result.setdefault('size', size)
+                result['stub'] = {name: after[name] - before.get(name, 0) for name in after}
+                results.append(result)
+                print_result(result)
+    finally:
+        if own_stub:
+            stub.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'stub': {'latency_ms': stub.latency_ms, 'jitter_ms': stub.jitter_ms,
+                 'error_rate': stub.error_rate, 'throttle_rate': stub.throttle_rate,
+                 'payloads': len(stub.current)},
+        'repeat': repeat,
+        'results': results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    report['path'] = os.path.join(output_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report['path'], 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def print_result(result: Dict):
+    """Строка таблицы результатов"""
+    if result.get('error'):
+        print(f"   ❌ {result['case']:<14}{result['size']:>7}  {result['error']}")
+        return
+    rss = result['peak_rss_mb'] if result['peak_rss_mb'] is not None else '-'
+    print(f"   {result['case']:<14}{result['size']:>7}{result['records_per_s'] or '-':>12}"
+          f"{result['p50_ms'] or '-':>10}{result['p99_ms'] or '-':>10}{rss:>10}")
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[Dict]:
+    """
+    Сравнение двух отчетов run_benchmark по замерам с одинаковыми case и size
+
+    Returns:
+        Строки с отношением скорости (больше 1 - быстрее) и p99
+    """
+    before = {(row['case'], row['size']): row for row in baseline['results'] if not row.get('error')}
+    rows = []
+    for row in current['results']:
+        old = before.get((row['case'], row['size']))
+        if old is None or row.get('error'):
+            continue
+        rows.append({
+            'case': row['case'],
+            'size': row['size'],
+            'speedup': round(row['records_per_s'] / old['records_per_s'], 3)
+            if old['records_per_s'] and row['records_per_s'] else None,
+            'p99_ratio': round(row['p99_ms'] / old['p99_ms'], 3)
+            if old['p99_ms'] and row['p99_ms'] else None,
+            'rss_delta_mb': round(row['peak_rss_mb'] - old['peak_rss_mb'], 1)
+            if old.get('peak_rss_mb') is not None and row.get('peak_rss_mb') is not None else None,
+        })
+    return rows
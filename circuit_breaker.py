@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LatencyTracker:
+    """Скользящее окно задержек ответов и таймаут по их перцентилю"""
+
+    def __init__(self, window: int = 200, percentile: float = 0.99,
+                 multiplier: float = 3.0, min_timeout: float = 2.0,
+                 max_timeout: float = 15.0, min_samples: int = 20):
+        """
+        Инициализация трекера
+
+        Args:
+            window: Сколько последних замеров учитывать
+            percentile: Перцентиль, от которого считается таймаут
+            multiplier: Запас над перцентилем
+            min_timeout: Нижняя граница таймаута (секунды)
+            max_timeout: Верхняя граница и таймаут до накопления замеров
+            min_samples: Сколько замеров нужно для адаптивного таймаута
+        """
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Квантиль задержки по текущему окну"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def timeout(self) -> float:
+        """Таймаут чтения для следующего запроса"""
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        if not enough:
+            return self.max_timeout
+        value = self.quantile(self.percentile) * self.multiplier
+        return min(self.max_timeout, max(self.min_timeout, value))
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для одного endpoint (closed / open / half_open)
+
+    После failure_threshold подряд неудачных запросов переходит в open и
+    сразу отклоняет вызовы. Через reset_timeout пропускает один пробный
+    запрос (half_open): успех закрывает цепь, ошибка снова открывает.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        """
+        Инициализация предохранителя
+
+        Args:
+            name: Имя endpoint
+            failure_threshold: Число ошибок подряд до размыкания
+            reset_timeout: Сколько секунд цепь остается разомкнутой
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency = LatencyTracker()
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние с учетом истечения reset_timeout"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до пробного запроса"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        """Состояние предохранителя и задержки endpoint"""
+        p50 = self.latency.quantile(0.5)
+        p99 = self.latency.quantile(0.99)
+        return {
+            'state': self.state,
+            'failures': self._failures,
+            'rejected': self.rejected,
+            'latency_p50_s': round(p50, 3) if p50 is not None else None,
+            'latency_p99_s': round(p99, 3) if p99 is not None else None,
+            'timeout_s': round(self.latency.timeout(), 3)
+        }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Экспоненциальная пауза с полным джиттером для попытки attempt (с 0)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Общий для процесса предохранитель endpoint"""
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def circuit_stats() -> Dict[str, Dict]:
+    """Состояние всех предохранителей процесса"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,308 @@
+import bisect
+import hashlib
+import json
+import os
+import pickle
+from typing import Dict, Iterable, List, Optional, Tuple
+from shared import Shared
+
+_TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+_SEPARATORS = str.maketrans({c: ' ' for c in "-'’`.,()/"})
+
+# Ранги совпадений: чем меньше, тем выше в выдаче
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+
+def fold(text: str) -> str:
+    """
+    Ключ поиска: транслитерация кириллицы и сведение вариантов латиницы
+
+    'Нижний Новгород', 'Nizhny Novgorod' и 'nizhniy novgorod' дают
+    один ключ, так же как 'Екатеринбург' и 'Yekaterinburg'.
+    """
+    text = ''.join(_TRANSLIT.get(c, c) for c in text.lower().translate(_SEPARATORS))
+    words = []
+    for word in text.split():
+        word = word.replace('y', 'i').replace('j', 'i')
+        # Сжатие повторов: 'tolyatti' -> 'toliati', 'nizhnii' -> 'nizhni'
+        word = ''.join(c for i, c in enumerate(word)
+                       if i == 0 or c != word[i - 1] or not c.isalpha())
+        if word.startswith('ie'):
+            word = word[1:]
+        words.append(word)
+    return ' '.join(words)
+
+
+def _trigrams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityIndex:
+    """
+    Поисковый индекс названий городов (русские и английские)
+
+    Содержит двусторонние словари RU<->EN, отсортированный массив ключей
+    (названия целиком и каждое слово отдельно) для поиска по префиксу
+    бинарным поиском и индекс триграмм для поиска по подстроке и с
+    опечатками. Строится один раз и сохраняется на диск.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.russian: List[Optional[str]] = []
+        self.weights: List[float] = []
+        self._en_to_ru: Dict[str, str] = {}
+        self._ru_to_en: Dict[str, str] = {}
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._key_ids: List[Tuple[int, int]] = []
+        self._full_keys: List[List[str]] = []
+        self._grams: Dict[str, List[int]] = {}
+        self.fingerprint = ''
+
+    def add(self, name: str, russian_name: Optional[str] = None,
+            weight: float = 0.0, alternates: Iterable[str] = ()):
+        """
+        Добавить место (до вызова build)
+
+        Args:
+            name: Английское название (его возвращает поиск)
+            russian_name: Русское название
+            weight: Значимость для ранжирования (население и т.п.)
+            alternates: Другие написания
+        """
+        city_id = self._ids.get(name)
+        if city_id is None:
+            city_id = len(self.names)
+            self._ids[name] = city_id
+            self.names.append(name)
+            self.russian.append(None)
+            self.weights.append(weight)
+            self._full_keys.append([])
+        else:
+            self.weights[city_id] = max(self.weights[city_id], weight)
+
+        if russian_name:
+            if self.russian[city_id] is None:
+                self.russian[city_id] = russian_name
+                self._en_to_ru[name.lower()] = russian_name
+            self._ru_to_en.setdefault(russian_name.lower(), name)
+
+        for spelling in (name, russian_name, *alternates):
+            key = fold(spelling) if spelling else ''
+            if key and key not in self._full_keys[city_id]:
+                self._full_keys[city_id].append(key)
+
+    def build(self) -> 'CityIndex':
+        """Построение массивов префиксов и индекса триграмм"""
+        pairs = []
+        grams: Dict[str, set] = {}
+        for city_id, keys in enumerate(self._full_keys):
+            for key in keys:
+                pairs.append((key, city_id, PREFIX))
+                words = key.split(' ')
+                for i in range(1, len(words)):
+                    pairs.append((' '.join(words[i:]), city_id, WORD_PREFIX))
+                for gram in _trigrams(key):
+                    grams.setdefault(gram, set()).add(city_id)
+        pairs.sort()
+        self._keys = [key for key, _, _ in pairs]
+        self._key_ids = [(city_id, rank) for _, city_id, rank in pairs]
+        self._grams = {gram: sorted(ids) for gram, ids in grams.items()}
+        return self
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def english_name(self, russian_name: str) -> Optional[str]:
+        """Английское название по русскому (без учета регистра)"""
+        return self._ru_to_en.get(russian_name.strip().lower())
+
+    def russian_name(self, english_name: str) -> Optional[str]:
+        """Русское название по английскому (без учета регистра)"""
+        return self._en_to_ru.get(english_name.strip().lower())
+
+    def is_exact(self, query: str, name: str) -> bool:
+        """Совпадает ли запрос с одним из написаний места целиком"""
+        city_id = self._ids.get(name)
+        return city_id is not None and fold(query) in self._full_keys[city_id]
+
+    def _prefix_matches(self, key: str, found: Dict[int, int], limit: Optional[int]):
+        start = bisect.bisect_left(self._keys, key)
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            city_id, rank = self._key_ids[i]
+            if self._keys[i] == key and rank == PREFIX:
+                rank = EXACT
+            if rank < found.get(city_id, FUZZY + 1):
+                found[city_id] = rank
+            if limit is not None and len(found) >= limit * 20:
+                break
+
+    def search(self, query: str, limit: Optional[int] = 10) -> List[str]:
+        """
+        Поиск места по названию или его части
+
+        Args:
+            query: Запрос на русском или английском (в любой транслитерации)
+            limit: Максимальное число результатов (None - все)
+
+        Returns:
+            Английские названия: сначала точные совпадения, затем по
+            префиксу названия, префиксу слова, подстроке и с опечатками;
+            внутри ранга - по значимости места
+        """
+        return [name for name, _ in self.search_ranked(query, limit)]
+
+    def best_match(self, query: str) -> Optional[str]:
+        """
+        Место, которое можно выбрать без уточнения у пользователя
+
+        Только точное совпадение или единственное совпадение по префиксу
+        названия; подстрока и опечатки ('Tomsk' -> 'Omsk') - лишь варианты.
+
+        Returns:
+            Английское название или None
+        """
+        matches = self.search_ranked(query, limit=2)
+        if not matches:
+            return None
+        name, rank = matches[0]
+        if rank == EXACT or (rank == PREFIX and len(matches) == 1):
+            return name
+        return None
+
+    def search_ranked(self, query: str, limit: Optional[int] = 10) -> List[Tuple[str, int]]:
+        """
+        Поиск как search(), но с рангом совпадения для каждого места
+
+        Returns:
+            Пары (английское название, ранг EXACT..FUZZY)
+        """
+        key = fold(query)
+        if not key:
+            names = self.names[:limit] if limit is not None else self.names
+            return [(name, PREFIX) for name in names]
+
+        found: Dict[int, int] = {}
+        self._prefix_matches(key, found, limit)
+
+        if limit is None or len(found) < limit:
+            inner = sorted({key[i:i + 3] for i in range(len(key) - 2)},
+                           key=lambda g: len(self._grams.get(g, ())))
+            postings = [self._grams.get(gram, []) for gram in inner]
+            if postings and all(postings):
+                # Подстрока: кандидаты из пересечения списков триграмм, затем проверка
+                candidates = set(postings[0])
+                for ids in postings[1:]:
+                    candidates.intersection_update(ids)
+                for city_id in candidates:
+                    if city_id not in found and any(key in k for k in self._full_keys[city_id]):
+                        found[city_id] = SUBSTRING
+
+            if not found and len(key) >= 4:
+                # Опечатки: не меньше половины общих триграмм
+                postings = [self._grams.get(gram, []) for gram in _trigrams(key)]
+                counts: Dict[int, int] = {}
+                for ids in postings:
+                    for city_id in ids:
+                        counts[city_id] = counts.get(city_id, 0) + 1
+                threshold = max(2, len(postings) // 2)
+                for city_id, count in counts.items():
+                    if count >= threshold:
+                        found[city_id] = FUZZY
+
+        ranked = sorted(found, key=lambda i: (found[i], -self.weights[i], len(self.names[i]), i))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.names[i], found[i]) for i in ranked]
+
+    def save(self, path: str):
+        """Сохранение построенного индекса (атомарно)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CityIndex':
+        """Загрузка индекса, сохраненного save()"""
+        index = cls()
+        with open(path, 'rb') as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+
+def _config_fingerprint() -> str:
+    """Отпечаток исходных данных индекса: при их изменении индекс перестраивается"""
+    from config import CITIES, CITIES_RU
+    from gazetteer import get_gazetteer
+
+    digest = hashlib.sha1()
+    digest.update('\n'.join(CITIES).encode('utf-8'))
+    digest.update('\n'.join(f"{ru}|{en}" for ru, en in CITIES_RU.items()).encode('utf-8'))
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        digest.update(json.dumps(gazetteer.meta, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_config_index() -> CityIndex:
+    """Индекс по спискам городов из config и офлайн-справочнику, если он построен"""
+    from config import CITIES, CITIES_RU
+    from gazetteer import get_gazetteer
+
+    index = CityIndex()
+    # Города из config всегда выше мест справочника с тем же рангом совпадения
+    total = len(CITIES)
+    for position, name in enumerate(CITIES):
+        index.add(name, weight=1e10 + total - position)
+    for russian_name, name in CITIES_RU.items():
+        index.add(name, russian_name)
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        for name, russian_name, population in gazetteer.iter_names():
+            index.add(name, russian_name, weight=population)
+    index.fingerprint = _config_fingerprint()
+    return index.build()
+
+
+_shared_index: Shared[CityIndex] = Shared()
+
+
+def get_city_index() -> CityIndex:
+    """
+    Общий для процесса индекс городов
+
+    Индекс берется из файла CITY_INDEX_PATH (по умолчанию
+    data/cache/city_index.pkl), если он построен по тем же данным;
+    иначе строится заново и сохраняется. Пустой путь - только в памяти.
+    """
+    def load() -> CityIndex:
+        path = os.getenv('CITY_INDEX_PATH', 'data/cache/city_index.pkl')
+        index = None
+        if path and os.path.exists(path):
+            try:
+                index = CityIndex.load(path)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                index = None
+            if index is not None and index.fingerprint != _config_fingerprint():
+                index = None
+        if index is None:
+            index = build_config_index()
+            if path:
+                index.save(path)
+        return index
+
+    return _shared_index.get(load)
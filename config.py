@@ -20,6 +20,25 @@ CITIES = [
     'Stockholm', 'Oslo', 'Copenhagen', 'Helsinki'
 ]
 
+RUSSIAN_CITIES = CITIES[:36]
+
+EUROPEAN_CITIES = [
+    'London', 'Berlin', 'Paris', 'Rome', 'Madrid',
+    'Vienna', 'Prague', 'Warsaw', 'Budapest', 'Athens',
+    'Lisbon', 'Stockholm', 'Oslo', 'Copenhagen', 'Helsinki'
+]
+
+ASIAN_CITIES = [
+    'Tokyo', 'Beijing', 'Istanbul', 'Dubai', 'Singapore',
+    'Seoul', 'Mumbai', 'Bangkok', 'Hong Kong'
+]
+
+REGION_CITIES = {
+    'russia': RUSSIAN_CITIES,
+    'europe': EUROPEAN_CITIES,
+    'asia': ASIAN_CITIES,
+}
+
 CITIES_RU = {
     'Москва': 'Moscow',
     'Санкт-Петербург': 'Saint Petersburg',
@@ -75,29 +94,41 @@ CITIES_RU = {
     'Каир': 'Cairo'
 }
 
-def find_city(search_term):
+def find_city(search_term, limit=None):
     """
     Найти город по названию (частичному совпадению)
     
     Args:
-        search_term: название города или его часть
+        search_term: название города или его часть (русское или английское)
+        limit: максимальное число результатов (None - все)
         
     Returns:
-        Список найденных городов
+        Список найденных городов, лучшие совпадения первыми
     """
-    search_term = search_term.lower().strip()
-    results = []
+    from city_index import get_city_index
+    return get_city_index().search(search_term, limit)
+
+def get_cities_list(region=None, limit=None):
+    """
+    Получить список городов региона
     
-    for city in CITIES:
-        if search_term in city.lower():
-            results.append(city)
+    Если построен офлайн-справочник (gazetteer.py), города берутся из
+    него по убыванию населения, иначе - из списков выше.
     
-    for ru_name, en_name in CITIES_RU.items():
-        if search_term in ru_name.lower():
-            if en_name not in results:
-                results.append(en_name)
+    Args:
+        region: 'russia', 'europe', 'asia' или None для всех городов
+        limit: максимальное число городов
+        
+    Returns:
+        Список английских названий
+    """
+    from gazetteer import get_gazetteer
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        return gazetteer.cities(region, limit)
     
-    return results
+    cities = REGION_CITIES.get(region.lower(), []) if region else CITIES
+    return list(cities[:limit] if limit is not None else cities)
 
 def get_city_info(city_name):
     """
@@ -132,10 +163,8 @@ def get_russian_name(english_name):
     Returns:
         Русское название или None
     """
-    for ru_name, en_name in CITIES_RU.items():
-        if en_name == english_name:
-            return ru_name
-    return None
+    from city_index import get_city_index
+    return get_city_index().russian_name(english_name)
 
 def get_english_name(russian_name):
     """
@@ -147,4 +176,5 @@ def get_english_name(russian_name):
     Returns:
         Английское название или None
     """
-    return CITIES_RU.get(russian_name)
\ No newline at end of file
+    from city_index import get_city_index
+    return get_city_index().english_name(russian_name)
\ No newline at end of file
@@ -1,13 +1,195 @@
-import pandas as pd
+import csv
 import json
 import os
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Optional, get_args, get_type_hints
+from weather_record import ForecastDay, Record, WeatherRecord, to_dicts, to_frame
+from profiler import profiled
+
+# Типы Python полей записей -> типы колонок Parquet. Целые поля (humidity,
+# cloud, wind_degree) тоже float64: API и синтетика присылают дробные значения,
+# а int64 в схеме обрывал бы запись всей пачки на первом же 55.5
+_ARROW_TYPES = {float: 'float64', int: 'float64', str: 'string', bool: 'bool'}
+
+
+def _field_arrow_types() -> Dict[str, str]:
+    """Тип Parquet для каждого поля WeatherRecord и ForecastDay"""
+    types = {'collection_date': 'string'}
+    for record_type in (WeatherRecord, ForecastDay):
+        for name, hint in get_type_hints(record_type).items():
+            base = next((arg for arg in get_args(hint) if arg is not type(None)), hint)
+            if base in _ARROW_TYPES:
+                types.setdefault(name, _ARROW_TYPES[base])
+    return types
+
+
+def parquet_schema(df):
+    """
+    Явная схема pyarrow для DataFrame
+    
+    Колонки полей WeatherRecord/ForecastDay получают тип из описания записи,
+    а не из данных: колонка, пустая во всей пачке (например gust_kph), не
+    становится null-типом и не расходится со схемой других файлов датасета.
+    Остальные колонки (например данные VK) выводятся из данных.
+    """
+    import pyarrow as pa
+    
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    known = _field_arrow_types()
+    for i, name in enumerate(schema.names):
+        if name in known:
+            schema = schema.set(i, pa.field(name, pa.type_for_alias(known[name])))
+    return schema
+
+
+def _prepare_partitions(df, partition_cols: Optional[List[str]]) -> List[str]:
+    """Колонка collection_date из scraped_at и список колонок партиционирования"""
+    if 'collection_date' not in df.columns:
+        if 'scraped_at' in df.columns:
+            df['collection_date'] = df['scraped_at'].astype(str).str[:10]
+        else:
+            df['collection_date'] = datetime.now().strftime('%Y-%m-%d')
+    if partition_cols is None:
+        partition_cols = ['collection_date'] + [
+            col for col in ('country', 'region') if col in df.columns
+        ][:1]
+    for col in partition_cols:
+        df[col] = df[col].fillna('unknown').astype(str).replace('', 'unknown')
+    return partition_cols
+
+
+def write_parquet_dataset(df, root_dir: str, partition_cols: Optional[List[str]] = None,
+                          compression: str = 'zstd') -> List[str]:
+    """
+    Дозапись DataFrame в партиционированный Parquet датасет
+    
+    Каждый вызов добавляет новые файлы в партиции collection_date=<дата>
+    (и country или region, если такая колонка есть), старые файлы не
+    переписываются. DataFrame не изменяется.
+    
+    Args:
+        df: Данные
+        root_dir: Корневая папка датасета
+        partition_cols: Колонки партиционирования
+        compression: Кодек сжатия (zstd, snappy, gzip)
+        
+    Returns:
+        Использованные колонки партиционирования
+    """
+    df = df.copy()
+    partition_cols = _prepare_partitions(df, partition_cols)
+    os.makedirs(root_dir, exist_ok=True)
+    df.to_parquet(root_dir, engine='pyarrow', compression=compression,
+                  partition_cols=partition_cols, index=False, schema=parquet_schema(df))
+    return partition_cols
+
+
+class RecordStream:
+    """
+    Потоковая запись данных в CSV или JSON Lines по мере поступления
+    
+    Записи пишутся во временный файл <имя>.part с буферизацией и
+    периодическим сбросом на диск; при успешном закрытии файл атомарно
+    переименовывается в итоговый. Если сбор прервался, .part остается
+    на диске и содержит все записанные строки. Пустой поток итоговый
+    файл не создает.
+    
+    Заголовок CSV - полная схема типа записи (WeatherRecord.field_names()),
+    а не ключи первой записи: колонки, которые есть не у всех записей
+    (demo_mode), не теряются. Для словарей заголовок берется из первой
+    записи, а незнакомый ключ в следующих - ошибка.
+    """
+    
+    def __init__(self, filename: str, fmt: Optional[str] = None,
+                 flush_every: int = 50, encoding: str = 'utf-8-sig',
+                 fieldnames: Optional[List[str]] = None):
+        """
+        Открытие потока
+        
+        Args:
+            filename: Итоговый путь к файлу
+            fmt: 'csv' или 'jsonl' (по умолчанию по расширению файла)
+            flush_every: Сбрасывать буфер на диск каждые N записей
+            encoding: Кодировка CSV файла
+            fieldnames: Колонки CSV (по умолчанию по типу первой записи)
+        """
+        self.filename = filename
+        self.fmt = fmt or ('jsonl' if filename.endswith(('.jsonl', '.json')) else 'csv')
+        self.flush_every = max(1, flush_every)
+        self.part_filename = f"{filename}.part"
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.count = 0
+        self._writer = None
+        
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.part_filename, 'w', newline='',
+                          encoding=encoding if self.fmt == 'csv' else 'utf-8')
+    
+    def write(self, record: Record):
+        """Добавить одну запись"""
+        row = to_dicts([record])[0]
+        if self.fmt == 'csv':
+            if self._writer is None:
+                if self.fieldnames is None:
+                    self.fieldnames = (list(type(record).field_names())
+                                       if isinstance(record, (WeatherRecord, ForecastDay)) else list(row))
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames,
+                                              extrasaction='raise')
+                self._writer.writeheader()
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write('\n')
+        
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+    
+    def write_many(self, records: List[Record]):
+        for record in records:
+            self.write(record)
+    
+    @profiled('save')
+    def flush(self):
+        """Сброс буфера на диск"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def close(self, commit: bool = True):
+        """
+        Закрытие потока
+        
+        Args:
+            commit: Переименовать .part в итоговый файл
+        """
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        if commit and not self.count:
+            os.remove(self.part_filename)
+            print(f"⚠️  Нет записей, файл не создан: {self.filename}")
+        elif commit:
+            os.replace(self.part_filename, self.filename)
+            print(f"✅ Данные сохранены: {self.filename} (записей: {self.count})")
+        else:
+            print(f"⚠️  Сбор прерван, частичные данные: {self.part_filename} (записей: {self.count})")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(commit=exc_type is None)
+
 
 class DataSaver:
     """Класс для сохранения данных в различные форматы"""
     
     @staticmethod
-    def save_to_csv(data: List[Dict], filename: str, encoding: str = 'utf-8-sig'):
+    @profiled('save')
+    def save_to_csv(data: List[Record], filename: str, encoding: str = 'utf-8-sig'):
         """
         Сохранение данных в CSV
         
@@ -23,7 +205,7 @@ class DataSaver:
         try:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
-            df = pd.DataFrame(data)
+            df = to_frame(data)
             df.to_csv(filename, index=False, encoding=encoding)
             
             print(f"✅ Данные сохранены: {filename}")
@@ -39,11 +221,12 @@ class DataSaver:
             return False
     
     @staticmethod
-    def save_to_json(data: List[Dict], filename: str):
+    @profiled('save')
+    def save_to_json(data: List[Record], filename: str):
         """Сохранение данных в JSON"""
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                json.dump(to_dicts(data), f, ensure_ascii=False, indent=2)
             print(f"✅ JSON сохранен: {filename}")
             return True
         except Exception as e:
@@ -51,18 +234,109 @@ class DataSaver:
             return False
     
     @staticmethod
-    def print_data_summary(data: List[Dict], name: str = "данных"):
-        """Печать сводки по данным"""
+    def save_to_parquet(data: List[Record], root_dir: str,
+                        partition_cols: Optional[List[str]] = None,
+                        compression: str = 'zstd'):
+        """
+        Сохранение данных в партиционированный Parquet датасет
+        
+        Каждый вызов дописывает новые файлы в партиции
+        collection_date=<дата>/country=<страна>, старые файлы не переписываются.
+        
+        Args:
+            data: Список записей
+            root_dir: Корневая папка датасета
+            partition_cols: Колонки партиционирования
+            compression: Кодек сжатия (zstd, snappy, gzip)
+        """
+        if not data:
+            print("Нет данных для сохранения")
+            return False
+        return DataSaver.save_frame_to_parquet(to_frame(data), root_dir, partition_cols, compression)
+    
+    @staticmethod
+    @profiled('save')
+    def save_frame_to_parquet(df, root_dir: str, partition_cols: Optional[List[str]] = None,
+                              compression: str = 'zstd'):
+        """
+        Сохранение готового DataFrame в партиционированный Parquet датасет
+        
+        Args:
+            df: DataFrame с колонками WeatherRecord (например, collect_frame)
+            root_dir: Корневая папка датасета
+            partition_cols: Колонки партиционирования
+            compression: Кодек сжатия (zstd, snappy, gzip)
+        """
+        if not len(df):
+            print("Нет данных для сохранения")
+            return False
+        
+        try:
+            partition_cols = write_parquet_dataset(df, root_dir, partition_cols, compression)
+            
+            print(f"✅ Parquet сохранен: {root_dir}")
+            print(f"   Записей: {len(df)} | Партиции: {', '.join(partition_cols)}")
+            return True
+            
+        except ImportError:
+            print("❌ Для Parquet нужен pyarrow: pip install pyarrow")
+            return False
+        except Exception as e:
+            print(f"❌ Ошибка при сохранении Parquet: {e}")
+            return False
+    
+    @staticmethod
+    def load_parquet(root_dir: str, columns: Optional[List[str]] = None,
+                     filters: Optional[List] = None):
+        """
+        Чтение Parquet датасета с выбором колонок и фильтром по партициям
+        
+        Args:
+            root_dir: Корневая папка датасета
+            columns: Читать только эти колонки
+            filters: Фильтры pyarrow, например [('collection_date', '>=', '2024-01-01')]
+            
+        Returns:
+            DataFrame
+        """
+        import pandas as pd
+        return pd.read_parquet(root_dir, engine='pyarrow', columns=columns, filters=filters)
+    
+    @staticmethod
+    def open_stream(filename: str, fmt: Optional[str] = None, flush_every: int = 50) -> RecordStream:
+        """
+        Открыть потоковую запись (CSV или JSON Lines) с атомарной фиксацией
+        
+        Args:
+            filename: Итоговый путь к файлу
+            fmt: 'csv' или 'jsonl' (по умолчанию по расширению)
+            flush_every: Сбрасывать буфер на диск каждые N записей
+            
+        Returns:
+            RecordStream, который можно использовать в with
+        """
+        return RecordStream(filename, fmt, flush_every)
+    
+    @staticmethod
+    def print_data_summary(data: List[Record], name: str = "данных", total: Optional[int] = None):
+        """
+        Печать сводки по данным
+        
+        Args:
+            data: Записи (при потоковом сборе - только первые, для примера)
+            name: Название данных в заголовке
+            total: Сколько всего записей (по умолчанию len(data))
+        """
         if not data:
             print(f"Нет {name} для анализа")
             return
         
-        df = pd.DataFrame(data)
+        df = to_frame(data)
         
         print(f"\n{'='*50}")
         print(f"СВОДКА ПО {name.upper()}:")
         print(f"{'='*50}")
-        print(f"Всего записей: {len(df)}")
+        print(f"Всего записей: {total if total is not None else len(df)}")
         print(f"Колонки: {', '.join(df.columns.tolist())}")
         
         print("\nПервые 3 записи:")
@@ -0,0 +1,403 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+from shared import Shared
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+LEAF_SIZE = 16
+
+# Поля записи справочника (numpy dtype); numpy импортируется только при
+# работе со справочником: config.find_city без справочника его не грузит
+RECORD_FIELDS = [
+    ('geonameid', '<u4'),
+    ('lat', '<f4'),
+    ('lon', '<f4'),
+    ('population', '<u4'),
+    ('country', 'S2'),
+    ('name_len', '<u2'),
+    ('name_off', '<u4'),
+    ('ru_off', '<u4'),
+    ('ru_len', '<u2'),
+]
+
+# Коды стран по частям света (Россия выделена в отдельный регион)
+EUROPE = {
+    'AD', 'AL', 'AT', 'BA', 'BE', 'BG', 'BY', 'CH', 'CY', 'CZ', 'DE', 'DK', 'EE',
+    'ES', 'FI', 'FO', 'FR', 'GB', 'GI', 'GR', 'HR', 'HU', 'IE', 'IS', 'IT', 'LI',
+    'LT', 'LU', 'LV', 'MC', 'MD', 'ME', 'MK', 'MT', 'NL', 'NO', 'PL', 'PT', 'RO',
+    'RS', 'SE', 'SI', 'SK', 'SM', 'UA', 'VA', 'XK',
+}
+ASIA = {
+    'AE', 'AF', 'AM', 'AZ', 'BD', 'BH', 'BN', 'BT', 'CN', 'GE', 'HK', 'ID', 'IL',
+    'IN', 'IQ', 'IR', 'JO', 'JP', 'KG', 'KH', 'KP', 'KR', 'KW', 'KZ', 'LA', 'LB',
+    'LK', 'MM', 'MN', 'MO', 'MV', 'MY', 'NP', 'OM', 'PH', 'PK', 'PS', 'QA', 'SA',
+    'SG', 'SY', 'TH', 'TJ', 'TL', 'TM', 'TR', 'TW', 'UZ', 'VN', 'YE',
+}
+REGIONS = {
+    'russia': {'RU'},
+    'europe': EUROPE,
+    'asia': ASIA,
+}
+
+
+def _unit_vectors(lat: 'np.ndarray', lon: 'np.ndarray') -> 'np.ndarray':
+    """Точки на единичной сфере: евклидово расстояние между ними монотонно по дуге"""
+    import numpy as np
+
+    lat = np.radians(lat.astype(np.float64))
+    lon = np.radians(lon.astype(np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat))).astype(np.float32)
+
+
+def _chord_to_km(chord):
+    import numpy as np
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def _kd_order(coords: 'np.ndarray') -> 'np.ndarray':
+    """
+    Перестановка точек в неявное k-d дерево
+
+    Для диапазона [lo, hi) средний элемент - узел разбиения по оси
+    depth % 3, левая половина - меньшие значения, правая - большие.
+    Дерево хранится самим порядком записей, без отдельных узлов.
+    """
+    import numpy as np
+
+    order = np.arange(len(coords))
+    stack = [(0, len(coords), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= LEAF_SIZE:
+            continue
+        mid = (lo + hi) // 2
+        axis = depth % 3
+        part = np.argpartition(coords[order[lo:hi], axis], mid - lo)
+        order[lo:hi] = order[lo:hi][part]
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return order
+
+
+def _has_cyrillic(text: str) -> bool:
+    return any('а' <= c <= 'я' or 'А' <= c <= 'Я' or c in 'ёЁ' for c in text)
+
+
+def iter_geonames(dump_path: str, min_population: int = 0) -> Iterator[Dict]:
+    """
+    Чтение выгрузки GeoNames (cities500.txt, cities15000.txt и т.п.)
+
+    Формат: строки с табуляцией, 19 колонок (geonameid, name, asciiname,
+    alternatenames, latitude, longitude, ..., country code, ..., population, ...).
+    """
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 15 or not parts[0].isdigit():
+                continue
+            population = int(parts[14] or 0)
+            if population < min_population:
+                continue
+            russian = next((alt for alt in parts[3].split(',') if _has_cyrillic(alt)), '')
+            yield {
+                'geonameid': int(parts[0]),
+                'name': parts[2] or parts[1],
+                'russian_name': russian,
+                'lat': float(parts[4]),
+                'lon': float(parts[5]),
+                'country': parts[8],
+                'population': population,
+            }
+
+
+def build_gazetteer(dump_path: str, out_dir: str = 'data/gazetteer',
+                    min_population: int = 0) -> 'Gazetteer':
+    """
+    Построение бинарного справочника из выгрузки GeoNames
+
+    Args:
+        dump_path: Путь к файлу выгрузки
+        out_dir: Каталог справочника (records.npy, coords.npy, names.npy, ...)
+        min_population: Пропускать места с меньшим населением
+
+    Returns:
+        Открытый Gazetteer
+    """
+    import numpy as np
+
+    places = list(iter_geonames(dump_path, min_population))
+    if not places:
+        raise ValueError(f"В {dump_path} нет мест в формате GeoNames")
+
+    records = np.zeros(len(places), dtype=np.dtype(RECORD_FIELDS))
+    records['geonameid'] = [p['geonameid'] for p in places]
+    records['lat'] = [p['lat'] for p in places]
+    records['lon'] = [p['lon'] for p in places]
+    records['population'] = [p['population'] for p in places]
+    records['country'] = [p['country'].encode('ascii', 'replace')[:2] for p in places]
+
+    coords = _unit_vectors(records['lat'], records['lon'])
+    order = _kd_order(coords)
+    records = records[order]
+    coords = coords[order]
+    places = [places[i] for i in order]
+
+    # Названия - один UTF-8 блоб, в записях только смещения и длины
+    encoded = ([p['name'].encode('utf-8')[:0xFFFF] for p in places]
+               + [p['russian_name'].encode('utf-8')[:0xFFFF] for p in places])
+    lengths = np.array([len(item) for item in encoded], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    records['name_off'], records['ru_off'] = offsets[:len(places)], offsets[len(places):]
+    records['name_len'], records['ru_len'] = lengths[:len(places)], lengths[len(places):]
+    blob = b''.join(encoded)
+
+    by_population = np.argsort(-records['population'].astype(np.int64), kind='stable').astype('<u4')
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'records.npy'), records)
+    np.save(os.path.join(out_dir, 'coords.npy'), coords)
+    np.save(os.path.join(out_dir, 'names.npy'), np.frombuffer(blob, dtype=np.uint8))
+    np.save(os.path.join(out_dir, 'by_population.npy'), by_population)
+    with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': os.path.basename(dump_path),
+            'count': len(records),
+            'min_population': min_population,
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Справочник: {len(records)} мест сохранено в {out_dir}")
+    return Gazetteer(out_dir)
+
+
+class Gazetteer:
+    """
+    Офлайн-справочник мест, отображенный в память
+
+    Записи фиксированного размера лежат в порядке неявного k-d дерева
+    по точкам на единичной сфере, поэтому поиск ближайших и в радиусе
+    не требует отдельного индекса. Файлы открываются через mmap: в
+    память процесса попадают только прочитанные страницы, объекты Python
+    создаются только для возвращаемых результатов.
+    """
+
+    def __init__(self, path: str = 'data/gazetteer'):
+        """
+        Открытие справочника
+
+        Args:
+            path: Каталог, созданный build_gazetteer
+        """
+        import numpy as np
+
+        self.path = path
+        self.records = np.load(os.path.join(path, 'records.npy'), mmap_mode='r')
+        self.coords = np.load(os.path.join(path, 'coords.npy'), mmap_mode='r')
+        self.names = np.load(os.path.join(path, 'names.npy'), mmap_mode='r')
+        self.by_population = np.load(os.path.join(path, 'by_population.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self._by_name: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _text(self, offset: int, length: int) -> str:
+        return bytes(self.names[offset:offset + length]).decode('utf-8')
+
+    def place(self, i: int, distance_km: Optional[float] = None) -> Dict:
+        """Запись справочника в виде словаря"""
+        rec = self.records[i]
+        place = {
+            'geonameid': int(rec['geonameid']),
+            'name': self._text(int(rec['name_off']), int(rec['name_len'])),
+            'russian_name': self._text(int(rec['ru_off']), int(rec['ru_len'])) or None,
+            'country': rec['country'].decode('ascii'),
+            'lat': round(float(rec['lat']), 5),
+            'lon': round(float(rec['lon']), 5),
+            'population': int(rec['population']),
+        }
+        if distance_km is not None:
+            place['distance_km'] = round(float(distance_km), 2)
+        return place
+
+    def find(self, name: str) -> Optional[Dict]:
+        """
+        Место по названию (английскому или русскому, без учета регистра)
+
+        Из одноименных мест выбирается самое населенное. Индекс названий
+        строится при первом вызове.
+
+        Returns:
+            Запись справочника или None, если такого названия нет
+        """
+        import numpy as np
+
+        with self._lock:
+            if self._by_name is None:
+                by_name: Dict[str, int] = {}
+                for i in np.asarray(self.by_population).tolist():
+                    rec = self.records[i]
+                    for offset, length in ((rec['name_off'], rec['name_len']), (rec['ru_off'], rec['ru_len'])):
+                        if length:
+                            by_name.setdefault(self._text(int(offset), int(length)).lower(), i)
+                self._by_name = by_name
+        i = self._by_name.get(' '.join(name.split()).lower())
+        return self.place(i) if i is not None else None
+
+    def _search(self, target: 'np.ndarray', visit):
+        """
+        Обход k-d дерева с отсечением
+
+        visit(lo, hi) обрабатывает лист или узел и возвращает текущий
+        радиус поиска (хорду); поддеревья дальше радиуса пропускаются.
+        """
+        radius = math.inf
+        stack = [(0, len(self.coords), 0, 0.0)]
+        while stack:
+            lo, hi, depth, bound = stack.pop()
+            if bound > radius:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                radius = visit(lo, hi)
+                continue
+            mid = (lo + hi) // 2
+            radius = visit(mid, mid + 1)
+            diff = float(target[depth % 3]) - float(self.coords[mid, depth % 3])
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((far[0], far[1], depth + 1, max(bound, abs(diff))))
+            stack.append((near[0], near[1], depth + 1, bound))
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                min_population: int = 0) -> List[Dict]:
+        """
+        Ближайшие места к точке
+
+        Args:
+            lat, lon: Координаты
+            k: Число мест
+            min_population: Учитывать только места с населением не меньше
+
+        Returns:
+            Список мест по возрастанию расстояния (с distance_km)
+        """
+        import numpy as np
+
+        target = _unit_vectors(np.array([lat]), np.array([lon]))[0]
+        best: List = []  # (хорда, индекс), отсортировано
+
+        def visit(lo, hi):
+            chords = np.linalg.norm(self.coords[lo:hi] - target, axis=1)
+            if min_population:
+                chords[self.records['population'][lo:hi] < min_population] = np.inf
+            for offset in np.argsort(chords)[:k]:
+                chord = float(chords[offset])
+                if len(best) < k or chord < best[-1][0]:
+                    best.append((chord, lo + int(offset)))
+                    best.sort()
+                    del best[k:]
+            return best[-1][0] if len(best) == k else math.inf
+
+        self._search(target, visit)
+        return [self.place(i, _chord_to_km(chord)) for chord, i in best if chord < math.inf]
+
+    def within(self, lat: float, lon: float, radius_km: float,
+               limit: Optional[int] = None) -> List[Dict]:
+        """
+        Места в радиусе от точки
+
+        Args:
+            lat, lon: Координаты
+            radius_km: Радиус в километрах
+            limit: Вернуть не больше стольких ближайших
+
+        Returns:
+            Список мест по возрастанию расстояния (с distance_km)
+        """
+        import numpy as np
+
+        target = _unit_vectors(np.array([lat]), np.array([lon]))[0]
+        radius = _km_to_chord(radius_km)
+        found: List = []
+
+        def visit(lo, hi):
+            chords = np.linalg.norm(self.coords[lo:hi] - target, axis=1)
+            for offset in np.nonzero(chords <= radius)[0]:
+                found.append((float(chords[offset]), lo + int(offset)))
+            return radius
+
+        self._search(target, visit)
+        found.sort()
+        if limit is not None:
+            found = found[:limit]
+        return [self.place(i, _chord_to_km(chord)) for chord, i in found]
+
+    def region_indices(self, region: Optional[str] = None,
+                       limit: Optional[int] = None) -> 'np.ndarray':
+        """Индексы мест региона по убыванию населения"""
+        import numpy as np
+
+        order = np.asarray(self.by_population)
+        if region:
+            codes = REGIONS.get(region.lower(), {region.upper()})
+            countries = self.records['country'][order]
+            order = order[np.isin(countries, [code.encode('ascii') for code in codes])]
+        return order[:limit] if limit is not None else order
+
+    def cities(self, region: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Названия мест региона по убыванию населения
+
+        Args:
+            region: 'russia', 'europe', 'asia' или код страны ('DE'); None - все
+            limit: Максимальное число названий
+        """
+        return [self._text(int(self.records[i]['name_off']), int(self.records[i]['name_len']))
+                for i in self.region_indices(region, limit)]
+
+    def iter_names(self) -> Iterator[tuple]:
+        """(название, русское название или None, население) для всех мест"""
+        for i in range(len(self.records)):
+            rec = self.records[i]
+            yield (self._text(int(rec['name_off']), int(rec['name_len'])),
+                   self._text(int(rec['ru_off']), int(rec['ru_len'])) or None,
+                   int(rec['population']))
+
+
+_shared_gazetteer: Shared[Gazetteer] = Shared()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Общий для процесса справочник
+
+    Каталог задается GAZETTEER_PATH (по умолчанию data/gazetteer);
+    None, если справочник еще не построен.
+    """
+    path = os.getenv('GAZETTEER_PATH', 'data/gazetteer')
+    if not path or not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    return _shared_gazetteer.get(lambda: Gazetteer(path))
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Использование: python gazetteer.py <cities15000.txt> [мин_население]")
+    else:
+        build_gazetteer(sys.argv[1], min_population=int(sys.argv[2]) if len(sys.argv) > 2 else 0)
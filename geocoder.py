@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from config import CITIES_RU
+from shared import Shared, ThreadConnections
+
+_RU_TO_EN = {ru_name.lower(): en_name for ru_name, en_name in CITIES_RU.items()}
+
+
+class LocationResolver:
+    """
+    Постоянный индекс соответствия запросов городам WeatherAPI
+
+    Любое написание города ('Москва', 'moscow', ' Moscow ') один раз
+    разрешается через /search.json в каноническую локацию (id, lat/lon).
+    Соответствие сохраняется в SQLite, дальше запросы идут по id:<id>,
+    поэтому разные написания дают один запрос и один ключ кэша.
+    """
+
+    def __init__(self, db_path: Optional[str] = 'data/cache/locations.sqlite',
+                 negative_ttl: float = 3600):
+        """
+        Инициализация индекса
+
+        Args:
+            db_path: Путь к SQLite файлу (None - только память)
+            negative_ttl: Сколько секунд помнить запросы без результата
+        """
+        self.db_path = db_path
+        self.negative_ttl = negative_ttl
+        self._aliases: Dict[str, Dict] = {}
+        self._misses: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._connections = ThreadConnections(db_path) if db_path else None
+
+        if self.db_path:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS locations ("
+                "id INTEGER PRIMARY KEY, name TEXT, region TEXT, country TEXT, "
+                "lat REAL, lon REAL, url TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "alias TEXT PRIMARY KEY, location_id INTEGER NOT NULL, "
+                "resolved_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение SQLite текущего потока"""
+        return self._connections.get()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Нормализация запроса; русские названия из CITIES_RU переводятся"""
+        query = ' '.join(str(query).split()).lower()
+        return _RU_TO_EN.get(query, query).lower()
+
+    @staticmethod
+    def canonical_query(location: Dict) -> str:
+        """Строка q для запросов к API по разрешенной локации"""
+        if location.get('id') is not None:
+            return f"id:{location['id']}"
+        return f"{location['lat']},{location['lon']}"
+
+    def lookup(self, query: str) -> Optional[Dict]:
+        """Найти уже разрешенную локацию без обращения к API"""
+        alias = self.normalize(query)
+        with self._lock:
+            if alias in self._aliases:
+                return self._aliases[alias]
+
+        if not self.db_path:
+            return None
+        row = self._connection().execute(
+            "SELECT l.id, l.name, l.region, l.country, l.lat, l.lon, l.url "
+            "FROM aliases a JOIN locations l ON l.id = a.location_id WHERE a.alias = ?",
+            (alias,)
+        ).fetchone()
+        if row is None:
+            return None
+        location = dict(zip(('id', 'name', 'region', 'country', 'lat', 'lon', 'url'), row))
+        with self._lock:
+            self._aliases[alias] = location
+        return location
+
+    def resolve(self, query: str, search: Callable[[str], List[Dict]]) -> Optional[Dict]:
+        """
+        Разрешить запрос в каноническую локацию
+
+        Args:
+            query: Название города в любом написании
+            search: Функция поиска локаций (обычно запрос к /search.json);
+                None означает ошибку запроса, [] - что провайдер ничего не нашел
+
+        Returns:
+            Словарь локации (id, name, region, country, lat, lon) или None
+        """
+        location = self.lookup(query)
+        if location is not None:
+            return location
+
+        alias = self.normalize(query)
+        with self._lock:
+            missed_at = self._misses.get(alias)
+        if missed_at is not None and time.time() - missed_at < self.negative_ttl:
+            return None
+
+        candidates = search(alias)
+        if candidates is None:
+            # Сбой сети или 5xx - не повод считать город несуществующим
+            return None
+        if not isinstance(candidates, list) or not candidates:
+            with self._lock:
+                self._misses[alias] = time.time()
+            return None
+
+        best = candidates[0]
+        location = {
+            'id': best.get('id'),
+            'name': best.get('name', ''),
+            'region': best.get('region', ''),
+            'country': best.get('country', ''),
+            'lat': best.get('lat'),
+            'lon': best.get('lon'),
+            'url': best.get('url', '')
+        }
+        self.remember(query, location)
+        return location
+
+    def remember(self, query: str, location: Dict):
+        """Сохранить соответствие запроса и локации"""
+        alias = self.normalize(query)
+        with self._lock:
+            self._aliases[alias] = location
+            self._misses.pop(alias, None)
+
+        if self.db_path and location.get('id') is not None:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO locations (id, name, region, country, lat, lon, url) "
+                "VALUES (:id, :name, :region, :country, :lat, :lon, :url)",
+                location
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO aliases (alias, location_id, resolved_at) VALUES (?, ?, ?)",
+                (alias, location['id'], time.time())
+            )
+
+    def stats(self) -> Dict:
+        """Размер индекса"""
+        with self._lock:
+            stats = {'memory_aliases': len(self._aliases), 'negative': len(self._misses)}
+        if self.db_path:
+            conn = self._connection()
+            stats['aliases'] = conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+            stats['locations'] = conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+        return stats
+
+
+_shared_resolver: Shared[LocationResolver] = Shared()
+
+
+def get_location_resolver() -> Optional[LocationResolver]:
+    """
+    Общий для процесса индекс локаций
+
+    Путь задается WEATHERAPI_LOCATIONS_PATH (пустое значение - только
+    память), WEATHERAPI_RESOLVE=0 отключает разрешение запросов.
+    """
+    if os.getenv('WEATHERAPI_RESOLVE', '1') == '0':
+        return None
+    return _shared_resolver.get(lambda: LocationResolver(
+        db_path=os.getenv('WEATHERAPI_LOCATIONS_PATH', 'data/cache/locations.sqlite') or None
+    ))
@@ -0,0 +1,154 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Точки входа и бюджет времени импорта (мс) для каждой
+ENTRY_POINTS = {
+    'city_search': 100,
+    'weather_cli': 100,
+    'run_api_weatherapi': 150,
+    'run_regions': 100,
+    'run_poller': 100,
+    'run_service': 150,
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'requests', 'selenium', 'bs4', 'webdriver_manager')
+
+# Первый типичный вызов точки входа (без сети): ленивые импорты должны
+# пережить не только import, но и первое действие пользователя
+FIRST_CALLS = {
+    'weather_cli': "import config; config.find_city('mos')",
+    'run_regions': "import config; config.get_cities_list('europe', 10)",
+}
+
+
+def measure_import(module: str, top: int = 5, call: Optional[str] = None) -> Dict:
+    """
+    Время импорта модуля в отдельном процессе через python -X importtime
+
+    Args:
+        module: Имя модуля
+        top: Сколько самых тяжелых зависимостей показать
+        call: Код первого вызова после импорта (по умолчанию из FIRST_CALLS)
+
+    Returns:
+        Словарь с общим временем импорта, временем процесса, зависимостями,
+        временем первого вызова и тяжелыми модулями, загруженными к его концу
+    """
+    call = call if call is not None else FIRST_CALLS.get(module)
+    code = f'import {module}'
+    if call:
+        code += ("\nimport sys, time\n_started = time.perf_counter()\n" + call + "\n"
+                 "print('FIRST_CALL', round((time.perf_counter() - _started) * 1000, 1), "
+                 "' '.join(sorted({name.split('.')[0] for name in sys.modules})))")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        imports.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+
+    # Строка самого модуля идет после всех его зависимостей; до нее - импорты
+    # интерпретатора (site), которые к модулю не относятся
+    end = next((i for i in range(len(imports) - 1, -1, -1) if imports[i][0] == module), None)
+    total = imports[end][2] if end is not None else None
+    start = end or 0
+    while start > 0 and imports[start - 1][0].startswith(' '):
+        start -= 1
+    top_level = [(name.strip(), cumulative) for name, _, cumulative in imports[start:end]
+                 if name.startswith('  ') and not name.startswith('   ')]
+    loaded = {name.strip().split('.')[0] for name, _, _ in imports[start:end]}
+
+    call_ms, after_call = None, set()
+    for line in result.stdout.splitlines():
+        if line.startswith('FIRST_CALL '):
+            _, call_ms, *after_call = line.split()
+            call_ms, after_call = float(call_ms), set(after_call)
+
+    return {
+        'module': module,
+        'ok': result.returncode == 0,
+        'import_ms': round(total / 1000, 1) if total is not None else None,
+        'process_ms': round(wall_ms, 1),
+        'heavy': sorted(loaded.intersection(HEAVY_MODULES)),
+        'top': [{'module': name, 'ms': round(cumulative / 1000, 1)}
+                for name, cumulative in sorted(top_level, key=lambda item: -item[1])[:top]],
+        'call': call,
+        'call_ms': call_ms,
+        'heavy_after_call': sorted(after_call.intersection(HEAVY_MODULES)),
+        'error': result.stderr.strip().splitlines()[-1] if result.returncode else None,
+    }
+
+
+def import_report(entry_points: Optional[Dict[str, float]] = None,
+                  output: Optional[str] = 'data/reports/import_times.json') -> List[Dict]:
+    """
+    Отчет о времени запуска точек входа с проверкой бюджета
+
+    Args:
+        entry_points: Модули и бюджеты в мс (по умолчанию ENTRY_POINTS)
+        output: Путь к JSON отчету (None - не сохранять)
+
+    Returns:
+        Список результатов по модулям
+    """
+    rows = []
+    for module, budget in (entry_points or ENTRY_POINTS).items():
+        row = measure_import(module)
+        row['budget_ms'] = budget
+        row['within_budget'] = row['ok'] and row['import_ms'] is not None and row['import_ms'] <= budget
+        rows.append(row)
+
+    if output:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': datetime.now().isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0], 'entry_points': rows},
+                      f, ensure_ascii=False, indent=2)
+    return rows
+
+
+def main():
+    """Замер времени импорта точек входа: python import_report.py [модуль ...]"""
+
+    modules = sys.argv[1:]
+    entry_points = {module: ENTRY_POINTS.get(module, 100) for module in modules} or None
+
+    print("=" * 70)
+    print("ВРЕМЯ ЗАПУСКА ТОЧЕК ВХОДА")
+    print("=" * 70)
+
+    rows = import_report(entry_points)
+    print(f"{'Модуль':<22}{'Импорт, мс':>12}{'Процесс, мс':>14}{'Бюджет':>9}  Тяжелые зависимости")
+    for row in rows:
+        mark = '✅' if row['within_budget'] else '❌'
+        import_ms = row['import_ms'] if row['import_ms'] is not None else '-'
+        print(f"{row['module']:<22}{import_ms:>12}{row['process_ms']:>14}{row['budget_ms']:>9}  "
+              f"{mark} {', '.join(row['heavy']) or '-'}")
+        if row['error']:
+            print(f"   ❌ {row['error']}")
+        if row['call_ms'] is not None:
+            print(f"   первый вызов: {row['call_ms']} мс, тяжелые после него: "
+                  f"{', '.join(row['heavy_after_call']) or '-'}")
+        for item in row['top'][:3]:
+            print(f"   {item['module']:<30}{item['ms']:>8} мс")
+
+    print("\n💾 Отчет: data/reports/import_times.json")
+    if not all(row['within_budget'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from shared import Shared
+
+# Границы корзин гистограмм в секундах (как у клиентов Prometheus)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DESCRIPTIONS = {
+    'weather_http_requests_total': ('counter', 'HTTP запросы к API по endpoint и коду ответа'),
+    'weather_http_request_duration_seconds': ('histogram', 'Длительность HTTP запросов к API'),
+    'weather_http_response_bytes_total': ('counter', 'Получено байт от API'),
+    'weather_http_retries_total': ('counter', 'Повторы запросов к API'),
+    'weather_cache_requests_total': ('counter', 'Обращения к кэшу ответов (hit/miss)'),
+    'weather_rate_limit_wait_seconds': ('histogram', 'Ожидание в ограничителе частоты перед запросом'),
+    'weather_service_events_total': ('counter', 'События сервиса погоды: fresh, stale, miss, upstream, errors'),
+    'parser_page_loads_total': ('counter', 'Загрузки страниц браузером по домену'),
+    'parser_page_load_duration_seconds': ('histogram', 'Длительность загрузки страниц браузером'),
+    'parser_page_bytes_total': ('counter', 'Объем HTML страниц, полученных из браузера'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, сумма и число наблюдений"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля по верхней границе корзины (не больше последней границы)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[min(i, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def cumulative(self):
+        """Пары (граница, накопленное число) включая +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """
+    Счетчики и гистограммы запросов, общие для всех сборщиков процесса
+
+    Метрика идентифицируется именем и набором меток (endpoint, domain,
+    status и т.п.). Снимок выгружается в текстовом формате Prometheus
+    и в JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _labels(labels: Dict) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Увеличить счетчик name с метками labels"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Добавить наблюдение в гистограмму name с метками labels"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def record_request(self, endpoint: str, status, seconds: Optional[float] = None,
+                       size: int = 0, retry: bool = False):
+        """Один HTTP запрос к API: код ответа (или тип ошибки), длительность, объем"""
+        self.inc('weather_http_requests_total', endpoint=endpoint, status=status)
+        if seconds is not None:
+            self.observe('weather_http_request_duration_seconds', seconds, endpoint=endpoint)
+        if size:
+            self.inc('weather_http_response_bytes_total', size, endpoint=endpoint)
+        if retry:
+            self.inc('weather_http_retries_total', endpoint=endpoint)
+
+    def record_page_load(self, domain: str, seconds: float, ok: bool = True):
+        """Одна загрузка страницы браузером"""
+        self.inc('parser_page_loads_total', domain=domain, result='ok' if ok else 'error')
+        self.observe('parser_page_load_duration_seconds', seconds, domain=domain)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict:
+        """Снимок всех метрик в виде словаря (для JSON)"""
+        with self._lock:
+            counters = {name: [dict(labels, value=value) for labels, value in series.items()]
+                        for name, series in self.counters.items()}
+            histograms = {
+                name: [dict(labels, count=h.count, sum=round(h.sum, 6),
+                            p50=h.quantile(0.5), p90=h.quantile(0.9), p99=h.quantile(0.99),
+                            buckets={str(bound): total for bound, total in h.cumulative()})
+                       for labels, h in series.items()]
+                for name, series in self.histograms.items()
+            }
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'uptime_s': round(time.time() - self.started_at, 3),
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def to_prometheus(self) -> str:
+        """Снимок в текстовом формате экспозиции Prometheus"""
+        def render(labels: Labels, extra: Tuple = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ''
+            escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"')
+                       .replace('\n', '\\n') + '"' for key, value in pairs)
+            return '{' + ','.join(escaped) + '}'
+
+        def header(name: str, kind: str):
+            description = DESCRIPTIONS.get(name, (kind, name))[1]
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        lines = []
+        with self._lock:
+            for name in sorted(self.counters):
+                header(name, 'counter')
+                for labels, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{render(labels)} {value:.0f}" if float(value).is_integer()
+                                 else f"{name}{render(labels)} {value!r}")
+            for name in sorted(self.histograms):
+                header(name, 'histogram')
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    for bound, total in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                        lines.append(f"{name}_bucket{render(labels, (('le', le),))} {total}")
+                    lines.append(f"{name}_sum{render(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{render(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, directory: str = 'data/metrics', name: str = 'metrics') -> Tuple[str, str]:
+        """
+        Запись снимка в <directory>/<name>.prom и <directory>/<name>.json
+
+        Returns:
+            Пути к файлам Prometheus и JSON
+        """
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, f"{name}.prom")
+        json_path = os.path.join(directory, f"{name}.json")
+        # Через временный файл: сборщик node_exporter не увидит недописанный снимок
+        for path, content in ((prom_path, self.to_prometheus()),
+                              (json_path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return prom_path, json_path
+
+    def summary(self) -> Dict[str, Dict]:
+        """Краткая сводка по endpoint: запросы, ошибки, повторы, байты, попадания в кэш, p50/p99"""
+        snapshot = self.snapshot()
+        result: Dict[str, Dict] = {}
+
+        def entry(endpoint: str) -> Dict:
+            return result.setdefault(endpoint, {'requests': 0, 'errors': 0, 'retries': 0,
+                                                'bytes': 0, 'cache_hits': 0})
+
+        for row in snapshot['counters'].get('weather_http_requests_total', []):
+            entry(row['endpoint'])['requests'] += row['value']
+            if not row['status'].startswith('2'):
+                entry(row['endpoint'])['errors'] += row['value']
+        for row in snapshot['counters'].get('weather_http_retries_total', []):
+            entry(row['endpoint'])['retries'] += row['value']
+        for row in snapshot['counters'].get('weather_http_response_bytes_total', []):
+            entry(row['endpoint'])['bytes'] += row['value']
+        for row in snapshot['counters'].get('weather_cache_requests_total', []):
+            if row['result'] == 'hit':
+                entry(row['endpoint'])['cache_hits'] += row['value']
+        for row in snapshot['histograms'].get('weather_http_request_duration_seconds', []):
+            entry(row['endpoint']).update(p50_s=row['p50'], p99_s=row['p99'])
+        return result
+
+
+_shared_registry: Shared[MetricsRegistry] = Shared()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Общий для процесса реестр метрик"""
+    return _shared_registry.get(MetricsRegistry)
+
+
+def export_metrics(name: str = 'metrics') -> Optional[Tuple[str, str]]:
+    """
+    Выгрузка метрик процесса в папку WEATHER_METRICS_DIR (по умолчанию data/metrics)
+
+    Пустое значение переменной отключает выгрузку.
+
+    Returns:
+        Пути к файлам Prometheus и JSON или None
+    """
+    directory = os.getenv('WEATHER_METRICS_DIR', 'data/metrics')
+    if not directory:
+        return None
+    return get_metrics().export(directory, name)
+
+
+def report_metrics(name: str = 'metrics'):
+    """Краткая сводка запросов по endpoint в консоль и выгрузка метрик в файлы"""
+    summary = get_metrics().summary()
+    if not summary:
+        return
+    print("\n📡 ЗАПРОСЫ К API:")
+    for endpoint, stats in sorted(summary.items()):
+        latency = ''
+        if stats.get('p50_s') is not None:
+            latency = f", p50 ≤ {stats['p50_s'] * 1000:.0f} мс, p99 ≤ {stats['p99_s'] * 1000:.0f} мс"
+        print(f"   {endpoint}: {stats['requests']:.0f} запросов, ошибок {stats['errors']:.0f}, "
+              f"повторов {stats['retries']:.0f}, из кэша {stats['cache_hits']:.0f}, "
+              f"{stats['bytes'] / 1024:.0f} КБ{latency}")
+    exported = export_metrics(name)
+    if exported:
+        print(f"💾 Метрики: {exported[0]}, {exported[1]}")
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from shared import Shared, ThreadConnections
+from weather_record import Record, WeatherRecord, to_dicts
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_COLUMNS = [name for name in WeatherRecord.field_names() if name != 'demo_mode']
+
+
+class ObservationStore:
+    """
+    Хранилище истории наблюдений (только добавление) на SQLite
+
+    Наблюдение однозначно определяется локацией (city_name, region, country
+    из ответа API) и current.last_updated: повторный опрос до обновления
+    данных у провайдера не создает дубликатов. Индекс по (location_key,
+    last_updated) дает быстрые выборки по городу и интервалу времени.
+    """
+
+    def __init__(self, db_path: str = 'data/history/observations.sqlite'):
+        """
+        Открытие хранилища
+
+        Args:
+            db_path: Путь к SQLite файлу
+        """
+        self.db_path = db_path
+        self._connections = ThreadConnections(db_path, timeout=30, synchronous='NORMAL')
+
+        columns_sql = ', '.join(f"{name} {self._sql_type(name)}" for name in _COLUMNS)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            "id INTEGER PRIMARY KEY, location_key TEXT NOT NULL, "
+            f"{columns_sql}, "
+            "UNIQUE (location_key, last_updated))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_observations_city_time "
+            "ON observations (city COLLATE NOCASE, last_updated)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_observations_city_name_time "
+            "ON observations (city_name COLLATE NOCASE, last_updated)"
+        )
+
+    @staticmethod
+    def _sql_type(name: str) -> str:
+        field_type = WeatherRecord.__dataclass_fields__[name].type
+        if field_type in (str, 'str'):
+            return 'TEXT'
+        if 'int' in str(field_type):
+            return 'INTEGER'
+        return 'REAL'
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение SQLite текущего потока"""
+        return self._connections.get()
+
+    @staticmethod
+    def location_key(row: Dict) -> str:
+        """Ключ локации по данным ответа API"""
+        parts = (row.get('city_name') or row.get('city') or '',
+                 row.get('region') or '', row.get('country') or '')
+        return '|'.join(str(part).strip().lower() for part in parts)
+
+    def add_many(self, records: Iterable[Record]) -> int:
+        """
+        Добавить наблюдения одной транзакцией
+
+        Returns:
+            Число новых (не дублирующих) наблюдений
+        """
+        rows = []
+        for row in to_dicts(records):
+            if row.get('demo_mode') or not row.get('last_updated'):
+                continue
+            rows.append([self.location_key(row)] + [row.get(name) for name in _COLUMNS])
+        if not rows:
+            return 0
+
+        placeholders = ', '.join('?' * (len(_COLUMNS) + 1))
+        conn = self._connection()
+        before = conn.total_changes
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR IGNORE INTO observations (location_key, {', '.join(_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                rows
+            )
+        return conn.total_changes - before
+
+    def add(self, record: Record) -> bool:
+        """Добавить одно наблюдение; False, если оно уже есть"""
+        return self.add_many([record]) == 1
+
+    def add_frame(self, df: 'pd.DataFrame') -> int:
+        """Добавить наблюдения из DataFrame с колонками WeatherRecord"""
+        subset = df[[name for name in _COLUMNS if name in df.columns]]
+        subset = subset.astype(object).where(subset.notna(), None)
+        return self.add_many(subset.to_dict('records'))
+
+    def _where(self, city: Optional[str], start: Optional[str], end: Optional[str]):
+        clauses, params = [], []
+        if city:
+            clauses.append("(city = ? COLLATE NOCASE OR city_name = ? COLLATE NOCASE)")
+            params += [city, city]
+        if start:
+            clauses.append("last_updated >= ?")
+            params.append(start)
+        if end:
+            clauses.append("last_updated <= ?")
+            params.append(end)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def history(self, city: Optional[str] = None, start: Optional[str] = None,
+                end: Optional[str] = None, limit: Optional[int] = None) -> List[WeatherRecord]:
+        """
+        Наблюдения по городу и интервалу времени
+
+        Args:
+            city: Город (исходный запрос или название из API)
+            start: Начало интервала last_updated ('YYYY-MM-DD HH:MM')
+            end: Конец интервала last_updated
+            limit: Максимальное число записей
+
+        Returns:
+            Список WeatherRecord, упорядоченный по last_updated
+        """
+        where, params = self._where(city, start, end)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM observations{where} ORDER BY last_updated"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [WeatherRecord(*row) for row in self._connection().execute(sql, params)]
+
+    def history_frame(self, city: Optional[str] = None, start: Optional[str] = None,
+                      end: Optional[str] = None,
+                      columns: Optional[List[str]] = None) -> 'pd.DataFrame':
+        """То же, что history, но сразу в DataFrame и только нужные колонки"""
+        import pandas as pd
+
+        columns = [c for c in (columns or _COLUMNS) if c in _COLUMNS]
+        where, params = self._where(city, start, end)
+        return pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM observations{where} ORDER BY last_updated",
+            self._connection(), params=params
+        )
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+    def cities(self) -> List[str]:
+        """Список городов, по которым есть история"""
+        return [row[0] for row in self._connection().execute(
+            "SELECT DISTINCT city_name FROM observations ORDER BY city_name"
+        )]
+
+
+_shared_store: Shared[ObservationStore] = Shared()
+
+
+def get_observation_store() -> Optional[ObservationStore]:
+    """
+    Общее для процесса хранилище истории
+
+    Путь задается WEATHERAPI_HISTORY_PATH, пустое значение отключает запись.
+    """
+    path = os.getenv('WEATHERAPI_HISTORY_PATH', 'data/history/observations.sqlite')
+    if not path:
+        return None
+    return _shared_store.get(lambda: ObservationStore(path))
@@ -1,19 +1,12 @@
 import time
 import re
-import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import logging
 import os
+from urllib.parse import urlparse
+from metrics import get_metrics
+from profiler import profiled
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,6 +28,11 @@ class DynamicWebParser:
     
     def setup_driver(self):
         """Настройка драйвера браузера"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        
         chrome_options = Options()
         
         if self.headless:
@@ -61,8 +59,11 @@ class DynamicWebParser:
         
         logger.info("Браузер успешно запущен")
     
-    def wait_for_element(self, by: By, selector: str, timeout: int = 10):
+    def wait_for_element(self, by: str, selector: str, timeout: int = 10):
         """Ожидание появления элемента"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
         return WebDriverWait(self.driver, timeout).until(
             EC.presence_of_element_located((by, selector))
         )
@@ -80,9 +81,27 @@ class DynamicWebParser:
                 break
             last_height = new_height
     
+    @profiled('fetch')
+    def load_page(self, url: str):
+        """
+        Загрузка страницы в браузере с записью метрик
+
+        Длительность и результат загрузки попадают в метрики по домену.
+        """
+        started = time.monotonic()
+        try:
+            self.driver.get(url)
+        except Exception:
+            get_metrics().record_page_load(urlparse(url).netloc, time.monotonic() - started, ok=False)
+            raise
+        get_metrics().record_page_load(urlparse(url).netloc, time.monotonic() - started)
+    
     def get_page_source(self) -> str:
         """Получение HTML кода страницы"""
-        return self.driver.page_source
+        html = self.driver.page_source
+        get_metrics().inc('parser_page_bytes_total', len(html.encode('utf-8')),
+                          domain=urlparse(self.driver.current_url).netloc)
+        return html
     
     def close(self):
         """Закрытие браузера"""
@@ -114,6 +133,8 @@ class HabrParser(DynamicWebParser):
         Returns:
             Список словарей с данными статей
         """
+        from selenium.webdriver.common.by import By
+        
         all_articles = []
         
         logger.info("Начинаем парсинг статей с Habr...")
@@ -122,7 +143,7 @@ class HabrParser(DynamicWebParser):
             logger.info(f" Страница {page_num}/{page_count}...")
             
             url = f"{self.base_url}/ru/all/page{page_num}/"
-            self.driver.get(url)
+            self.load_page(url)
             
             self.wait_for_element(By.CLASS_NAME, "tm-articles-list")
             
@@ -141,8 +162,11 @@ class HabrParser(DynamicWebParser):
         logger.info(f"\nВсего собрано {len(all_articles)} статей")
         return all_articles
     
+    @profiled('parse')
     def _extract_articles_from_html(self, html: str) -> List[Dict]:
         """Извлечение данных статей из HTML"""
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(html, 'html.parser')
         articles = []
         
@@ -223,6 +247,8 @@ class VKParser(DynamicWebParser):
         Returns:
             bool: Успешность входа
         """
+        from selenium.webdriver.common.by import By
+        
         if not self.login_required:
             logger.info("Вход не требуется, используем публичный доступ")
             return True
@@ -230,7 +256,7 @@ class VKParser(DynamicWebParser):
         try:
             logger.info("Начинаем процесс входа в ВКонтакте...")
             
-            self.driver.get(self.base_url)
+            self.load_page(self.base_url)
             time.sleep(3)
             email_input = self.wait_for_element(By.NAME, 'email', timeout=10)
             email_input.clear()
@@ -266,6 +292,8 @@ class VKParser(DynamicWebParser):
         Returns:
             List[Dict]: Список постов
         """
+        from selenium.webdriver.common.by import By
+        
         try:
             logger.info(f"Начинаем поиск постов по запросу: '{search_query}'")
             
@@ -273,7 +301,7 @@ class VKParser(DynamicWebParser):
             encoded_query = quote(search_query)
         
             search_url = f"{self.base_url}/search?c[q]={encoded_query}&c[section]=all"
-            self.driver.get(search_url)
+            self.load_page(search_url)
             time.sleep(3)
             try:
                 posts_tab = self.wait_for_element(
@@ -340,12 +368,14 @@ class VKParser(DynamicWebParser):
         Returns:
             List[Dict]: Список постов
         """
+        from selenium.webdriver.common.by import By
+        
         try:
             logger.info(f"Получаем посты с публичной страницы: {page_id}")
             
             page_url = f"{self.base_url}/{page_id}"
             
-            self.driver.get(page_url)
+            self.load_page(page_url)
             time.sleep(3)
             try:
                 self.wait_for_element(
@@ -385,8 +415,11 @@ class VKParser(DynamicWebParser):
             logger.error(f"Ошибка при получении постов с страницы: {e}")
             return []
     
+    @profiled('parse')
     def _extract_posts_from_html(self, html: str, search_query: str) -> List[Dict]:
         """Извлечение постов из HTML страницы поиска"""
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(html, 'html.parser')
         posts = []
         result_blocks = soup.find_all('div', class_=re.compile(r'result.*wrapper'))
@@ -417,8 +450,11 @@ class VKParser(DynamicWebParser):
         
         return posts
     
+    @profiled('parse')
     def _extract_page_posts_from_html(self, html: str, page_id: str) -> List[Dict]:
         """Извлечение постов со страницы сообщества"""
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(html, 'html.parser')
         posts = []
         
@@ -593,6 +629,8 @@ class VKParser(DynamicWebParser):
         Returns:
             List[Dict]: Список популярных постов
         """
+        from bs4 import BeautifulSoup
+        
         logger.info(f"Получение популярных постов из категории: {category}")
         
         try:
@@ -600,7 +638,7 @@ class VKParser(DynamicWebParser):
             if category != "all":
                 discover_url += f"?c[section]={category}"
             
-            self.driver.get(discover_url)
+            self.load_page(discover_url)
             time.sleep(3)
             
             self.scroll_to_bottom(pause_time=1.5)
@@ -0,0 +1,195 @@
+import heapq
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from shared import connect_sqlite
+from weather_record import WeatherRecord
+
+# Бесплатный тариф WeatherAPI: 1 000 000 запросов в месяц
+DEFAULT_MONTHLY_QUOTA = 1_000_000
+SECONDS_PER_MONTH = 30 * 24 * 3600
+
+
+def _parse_local(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return None
+
+
+class PollScheduler:
+    """
+    Планировщик опроса городов по их собственному расписанию
+
+    Для каждого города отслеживается реальный период обновления данных
+    у провайдера (по смене current.last_updated) и скорость изменения
+    температуры. Следующий опрос назначается на момент, когда могло
+    появиться новое наблюдение; месячная квота распределяется между
+    городами пропорционально тому, насколько быстро меняются их показания.
+    Состояние хранится в SQLite и переживает перезапуск.
+    """
+
+    def __init__(self, collector, cities: List[str],
+                 db_path: str = 'data/runs/scheduler.sqlite',
+                 monthly_quota: Optional[int] = None,
+                 default_cadence: float = 900, lag: float = 60,
+                 min_interval: float = 300, max_interval: float = 6 * 3600):
+        """
+        Инициализация планировщика
+
+        Args:
+            collector: WeatherAPIDataCollector для запросов
+            cities: Список городов
+            db_path: Путь к SQLite файлу состояния
+            monthly_quota: Месячная квота запросов (WEATHERAPI_MONTHLY_QUOTA)
+            default_cadence: Период обновления до первых наблюдений (секунды)
+            lag: Запас после ожидаемого обновления у провайдера
+            min_interval: Минимальный интервал опроса одного города
+            max_interval: Максимальный интервал опроса одного города
+        """
+        self.collector = collector
+        self.cities = list(dict.fromkeys(cities))
+        self.monthly_quota = monthly_quota or int(
+            os.getenv('WEATHERAPI_MONTHLY_QUOTA', DEFAULT_MONTHLY_QUOTA)
+        )
+        self.default_cadence = default_cadence
+        self.lag = lag
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.conn = connect_sqlite(db_path, timeout=10)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS schedule ("
+            "city TEXT PRIMARY KEY, next_due REAL NOT NULL, cadence REAL NOT NULL, "
+            "change_rate REAL NOT NULL, last_updated TEXT, last_temp REAL, "
+            "polls INTEGER NOT NULL DEFAULT 0, new_observations INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.state: Dict[str, Dict] = {}
+        self._load_state()
+
+    def _load_state(self):
+        """Загрузка состояния; новые города получают смещенный старт"""
+        columns = ('city', 'next_due', 'cadence', 'change_rate', 'last_updated',
+                   'last_temp', 'polls', 'new_observations')
+        for row in self.conn.execute(f"SELECT {', '.join(columns)} FROM schedule"):
+            self.state[row[0]] = dict(zip(columns, row))
+
+        now = time.time()
+        for city in self.cities:
+            if city not in self.state:
+                # Детерминированное смещение, чтобы города не опрашивались пачкой
+                offset = (zlib.crc32(city.encode('utf-8')) % 10_000) / 10_000
+                self.state[city] = {
+                    'city': city, 'next_due': now + offset * self.min_interval,
+                    'cadence': self.default_cadence, 'change_rate': 1.0,
+                    'last_updated': None, 'last_temp': None,
+                    'polls': 0, 'new_observations': 0
+                }
+                self._save(city)
+
+    def _save(self, city: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO schedule (city, next_due, cadence, change_rate, "
+            "last_updated, last_temp, polls, new_observations) "
+            "VALUES (:city, :next_due, :cadence, :change_rate, :last_updated, "
+            ":last_temp, :polls, :new_observations)",
+            self.state[city]
+        )
+
+    def budget_interval(self, city: str) -> float:
+        """
+        Интервал опроса города по квоте
+
+        Квота в запросах в секунду делится между городами пропорционально
+        скорости изменения их показаний (change_rate).
+        """
+        rate = self.monthly_quota / SECONDS_PER_MONTH
+        weights = sum(self.state[c]['change_rate'] for c in self.cities)
+        share = self.state[city]['change_rate'] / weights if weights else 1 / len(self.cities)
+        return 1 / (rate * share) if rate * share > 0 else self.max_interval
+
+    def _update(self, city: str, record: WeatherRecord, now: float):
+        """Учет результата опроса и назначение следующего"""
+        st = self.state[city]
+        st['polls'] += 1
+
+        if not record:
+            st['next_due'] = now + min(self.max_interval, max(self.min_interval, st['cadence']))
+            return
+
+        updated = _parse_local(record.get('last_updated'))
+        local_now = _parse_local(record.get('local_time'))
+        previous = _parse_local(st['last_updated'])
+        changed = record.get('last_updated') != st['last_updated']
+
+        if changed and updated and previous:
+            delta = (updated - previous).total_seconds()
+            if delta > 0:
+                # Период обновления: сглаженное время между сменами last_updated
+                st['cadence'] = 0.7 * st['cadence'] + 0.3 * min(delta, self.max_interval)
+                temp = record.get('temperature_c')
+                if temp is not None and st['last_temp'] is not None:
+                    per_hour = abs(temp - st['last_temp']) / (delta / 3600)
+                    st['change_rate'] = 0.8 * st['change_rate'] + 0.2 * max(per_hour, 0.05)
+
+        if changed:
+            st['new_observations'] += 1
+            st['last_updated'] = record.get('last_updated')
+            st['last_temp'] = record.get('temperature_c')
+
+        age = (local_now - updated).total_seconds() if updated and local_now else 0
+        until_update = st['cadence'] - max(0.0, age) + self.lag
+        if not changed:
+            until_update = max(until_update, st['cadence'] / 4)
+        interval = max(until_update, self.budget_interval(city), self.min_interval)
+        st['next_due'] = now + min(interval, self.max_interval)
+
+    def poll(self, city: str) -> WeatherRecord:
+        """Опросить один город и назначить следующий опрос"""
+        record = self.collector.get_current_weather(city)
+        self._update(city, record, time.time())
+        self._save(city)
+        return record
+
+    def run(self, max_polls: Optional[int] = None,
+            on_record: Optional[Callable[[WeatherRecord], None]] = None,
+            sleep: Callable[[float], None] = time.sleep):
+        """
+        Основной цикл опроса
+
+        Args:
+            max_polls: Остановиться после стольких опросов (None - бесконечно)
+            on_record: Вызывается для каждой полученной записи
+            sleep: Функция ожидания (для тестов и внешних циклов событий)
+        """
+        queue = [(self.state[city]['next_due'], city) for city in self.cities]
+        heapq.heapify(queue)
+        polls = 0
+
+        print(f"⏱️  Планировщик: {len(self.cities)} городов, квота "
+              f"{self.monthly_quota} запросов в месяц")
+
+        while queue and (max_polls is None or polls < max_polls):
+            due, city = heapq.heappop(queue)
+            wait = due - time.time()
+            if wait > 0:
+                sleep(wait)
+
+            record = self.poll(city)
+            polls += 1
+            if record and on_record:
+                on_record(record)
+
+            st = self.state[city]
+            print(f"   {city}: last_updated={st['last_updated']}, "
+                  f"следующий опрос через {st['next_due'] - time.time():.0f} с")
+            heapq.heappush(queue, (st['next_due'], city))
+
+    def stats(self) -> List[Dict]:
+        """Состояние расписания по городам"""
+        return [dict(self.state[city]) for city in self.cities]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,393 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Сколько первых вызовов каждого этапа снимать tracemalloc-снимками
+# (снимок дорогой, на тысячах вызовов он исказил бы сами замеры)
+SNAPSHOT_LIMIT = 3
+TOP_ALLOCATORS = 10
+TOP_FUNCTIONS = 30
+TIMELINE_LIMIT = 1000
+# Ветки дешевле этой доли общего времени в collapsed-стеки не раскрываются,
+# а обход графа вызовов ограничен MAX_STACK_NODES узлами: число путей в
+# графе (импорты, pandas) растет экспоненциально
+MIN_STACK_SHARE = 0.0005
+MAX_STACK_NODES = 200000
+
+
+def _label(func: tuple) -> str:
+    """Имя функции pstats для стека: func (file.py:line)"""
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ',')
+
+
+class _Frame:
+    """Открытый этап в стеке потока"""
+
+    __slots__ = ('path', 'started', 'peak', 'before')
+
+    def __init__(self, path: str, peak: int, before):
+        self.path = path
+        self.started = time.perf_counter()
+        self.peak = peak
+        self.before = before
+
+
+class Profiler:
+    """
+    Профилирование запуска: этапы, cProfile и tracemalloc в одном отчете
+
+    Этапы (fetch, parse, dataframe, save) отмечаются через stage() и
+    агрегируются по пути вложенности: save/dataframe - построение
+    DataFrame внутри сохранения. Для каждого этапа считаются число
+    вызовов, суммарное и максимальное время, пик памяти tracemalloc и
+    главные места выделения памяти (по первым SNAPSHOT_LIMIT вызовам).
+
+    cProfile видит только поток, в котором запущен профилировщик;
+    пик памяти tracemalloc общий для процесса, поэтому при параллельных
+    этапах в потоках он приблизительный.
+    """
+
+    def __init__(self, name: str, output: Optional[str] = None, frames: int = 1):
+        """
+        Args:
+            name: Имя запуска (скрипт), используется в имени отчета
+            output: Путь к JSON отчету (по умолчанию data/profiles/<name>_<время>.json)
+            frames: Глубина стека, сохраняемая tracemalloc (для мест выделения
+                достаточно одного кадра, глубже - заметно медленнее)
+        """
+        self.name = name
+        self.output = output
+        self.frames = frames
+        self.stages: Dict[str, Dict] = {}
+        self.timeline: List[Dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profile = None
+        self._started = None
+        self._duration = None
+        self._baseline = None
+        self._final = None
+        self._peak = 0
+        self._thread = None
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._baseline = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        import tracemalloc
+
+        if self._profile is None or self._duration is not None:
+            return
+        self._profile.disable()
+        self._duration = time.perf_counter() - self._started
+        self._final = tracemalloc.take_snapshot()
+        self._peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    @staticmethod
+    def _allocators(after, before) -> List[tuple]:
+        """
+        Места выделения памяти между снимками без самого профилировщика
+
+        Фильтруется готовая статистика, а не трассы снимка: filter_traces
+        на сотнях тысяч трасс (после импорта pandas) работает минутами.
+        """
+        import tracemalloc
+
+        skip = (tracemalloc.__file__, __file__)
+        top = []
+        for item in after.compare_to(before, 'lineno'):
+            if item.size_diff <= 0 or item.traceback[0].filename in skip:
+                continue
+            top.append((str(item.traceback[0]), item.size_diff))
+            if len(top) == TOP_ALLOCATORS:
+                break
+        return top
+
+    @contextmanager
+    def _paused(self):
+        """Пауза cProfile на время снимка (только в профилируемом потоке)"""
+        own_thread = threading.get_ident() == self._thread
+        if own_thread:
+            self._profile.disable()
+        try:
+            yield
+        finally:
+            if own_thread:
+                self._profile.enable()
+
+    def _stack(self) -> List[_Frame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name: str):
+        """Этап запуска: время, пик памяти и места выделения памяти"""
+        import tracemalloc
+
+        stack = self._stack()
+        path = f"{stack[-1].path}/{name}" if stack else name
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        with self._lock:
+            stats = self.stages.setdefault(path, {
+                'count': 0, 'total_s': 0.0, 'max_s': 0.0, 'peak_kb': 0.0,
+                'allocated_kb': 0.0, 'snapshots': 0, 'top': {},
+            })
+            take_snapshot = stats['snapshots'] < SNAPSHOT_LIMIT
+            if take_snapshot:
+                stats['snapshots'] += 1
+        before = None
+        if take_snapshot:
+            with self._paused():
+                before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        frame = _Frame(path, current, before)
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame.started
+            after_current, after_peak = tracemalloc.get_traced_memory()
+            peak = max(frame.peak, after_peak)
+            top = []
+            if frame.before is not None:
+                with self._paused():
+                    top = self._allocators(tracemalloc.take_snapshot(), frame.before)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            with self._lock:
+                stats['count'] += 1
+                stats['total_s'] += elapsed
+                stats['max_s'] = max(stats['max_s'], elapsed)
+                stats['peak_kb'] = max(stats['peak_kb'], peak / 1024)
+                stats['allocated_kb'] += (after_current - current) / 1024
+                for where, size in top:
+                    stats['top'][where] = stats['top'].get(where, 0) + size
+                if len(self.timeline) < TIMELINE_LIMIT:
+                    self.timeline.append({
+                        'stage': path,
+                        'thread': threading.current_thread().name,
+                        'start_ms': round((frame.started - self._started) * 1000, 3),
+                        'duration_ms': round(elapsed * 1000, 3),
+                    })
+
+    def collapsed_stacks(self) -> List[str]:
+        """
+        Стеки cProfile в collapsed-формате (a;b;c <мкс>) для flamegraph.pl и speedscope
+
+        cProfile хранит только пары вызывающий -> вызываемый, поэтому время
+        функции делится между ее стеками пропорционально времени по каждому
+        ребру графа вызовов.
+        """
+        import pstats
+
+        stats = pstats.Stats(self._profile).stats
+        callees: Dict[tuple, Dict[tuple, float]] = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, {})[func] = edge[3]
+        roots = [func for func, row in stats.items()
+                 if not any(caller in stats for caller in row[4])]
+
+        total = sum(row[2] for row in stats.values())
+        threshold = total * MIN_STACK_SHARE
+        lines: Dict[str, float] = {}
+        visited = [0]
+
+        def walk(func: tuple, share: float, stack: List[str], seen: set):
+            visited[0] += 1
+            _, _, tottime, cumtime, _ = stats[func]
+            fraction = min(share / cumtime, 1.0) if cumtime else 1.0
+            stack.append(_label(func))
+            seen.add(func)
+            key = ';'.join(stack)
+            lines[key] = lines.get(key, 0.0) + tottime * fraction
+            for callee, edge in callees.get(func, {}).items():
+                child_share = edge * fraction
+                if (callee not in seen and child_share >= threshold
+                        and len(stack) < 128 and visited[0] < MAX_STACK_NODES):
+                    walk(callee, child_share, stack, seen)
+                else:
+                    # Рекурсия и мелкие ветки: время остается у текущего кадра
+                    lines[key] += child_share
+            seen.discard(func)
+            stack.pop()
+
+        for root in roots:
+            walk(root, stats[root][3], [], set())
+        return [f"{key} {round(seconds * 1e6)}" for key, seconds in lines.items()
+                if round(seconds * 1e6) > 0]
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> List[Dict]:
+        """Самые дорогие функции по собственному времени"""
+        import pstats
+
+        stats = pstats.Stats(self._profile).stats
+        rows = sorted(stats.items(), key=lambda item: -item[1][2])[:limit]
+        return [{'function': _label(func), 'calls': nc, 'primitive_calls': cc,
+                 'tottime_s': round(tottime, 6), 'cumtime_s': round(cumtime, 6)}
+                for func, (cc, nc, tottime, cumtime, _) in rows]
+
+    def report(self) -> Dict:
+        """Отчет запуска: этапы, память, функции, collapsed-стеки"""
+        stages = []
+        for path, stats in sorted(self.stages.items(), key=lambda item: -item[1]['total_s']):
+            stages.append({
+                'stage': path,
+                'count': stats['count'],
+                'total_s': round(stats['total_s'], 6),
+                'mean_ms': round(stats['total_s'] / stats['count'] * 1000, 3) if stats['count'] else None,
+                'max_ms': round(stats['max_s'] * 1000, 3),
+                'peak_kb': round(stats['peak_kb'], 1),
+                'allocated_kb': round(stats['allocated_kb'], 1),
+                'top_allocators': [{'where': where, 'size_kb': round(size / 1024, 1)}
+                                   for where, size in sorted(stats['top'].items(),
+                                                             key=lambda item: -item[1])[:TOP_ALLOCATORS]],
+            })
+        return {
+            'name': self.name,
+            'argv': sys.argv,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'duration_s': round(self._duration, 6),
+            'stages': stages,
+            'memory': {
+                'peak_kb': round(self._peak / 1024, 1),
+                'retained': [{'where': where, 'size_kb': round(size / 1024, 1)}
+                             for where, size in self._allocators(self._final, self._baseline)],
+            },
+            'functions': self.top_functions(),
+            'collapsed': self.collapsed_stacks(),
+            'timeline': self.timeline,
+        }
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        Остановка профилирования и запись отчета в JSON
+
+        Returns:
+            Путь к отчету
+        """
+        self.stop()
+        path = path or self.output or os.path.join(
+            'data/profiles', f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self._print_summary(report, path)
+        return path
+
+    @staticmethod
+    def _print_summary(report: Dict, path: str):
+        print("\n🔬 ПРОФИЛЬ ЗАПУСКА:")
+        print(f"   Время: {report['duration_s']:.2f} с, пик памяти: {report['memory']['peak_kb'] / 1024:.1f} МБ")
+        for row in report['stages']:
+            print(f"   {row['stage']:<28}{row['count']:>7} x {row['mean_ms']:>9.2f} мс"
+                  f" = {row['total_s']:>8.3f} с, пик {row['peak_kb'] / 1024:.1f} МБ")
+        for row in report['functions'][:5]:
+            print(f"   {row['tottime_s']:>8.3f} с  {row['function']}")
+        print(f"💾 Профиль: {path} (collapsed-стеки: python profiler.py {path})")
+
+
+_active: Optional[Profiler] = None
+_NULL_STAGE = nullcontext()
+
+
+def stage(name: str):
+    """Этап запуска для профилировщика; без --profile ничего не делает"""
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+def profiled(name: str):
+    """Декоратор: весь вызов функции - этап name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with _active.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_profiling(name: str, output: Optional[str] = None) -> Profiler:
+    """Запуск общего для процесса профилировщика"""
+    global _active
+    if _active is None:
+        _active = Profiler(name, output)
+        _active.start()
+    return _active
+
+
+def stop_profiling() -> Optional[str]:
+    """
+    Остановка профилировщика и запись отчета
+
+    Returns:
+        Путь к отчету или None, если профилирование не запускалось
+    """
+    global _active
+    profiler, _active = _active, None
+    if profiler is None:
+        return None
+    return profiler.save()
+
+
+def profile_from_argv(name: str) -> Optional[Profiler]:
+    """
+    Флаг --profile[=путь] в sys.argv: профилирование до завершения процесса
+
+    Флаг удаляется из sys.argv, чтобы не мешать разбору аргументов
+    скрипта; отчет пишется при выходе из процесса (в т.ч. по sys.exit).
+    """
+    for arg in sys.argv[1:]:
+        if arg == '--profile' or arg.startswith('--profile='):
+            sys.argv.remove(arg)
+            profiler = start_profiling(name, arg.partition('=')[2] or None)
+            atexit.register(stop_profiling)
+            return profiler
+    return None
+
+
+def main():
+    """Вывод collapsed-стеков из отчета: python profiler.py <отчет.json> > out.folded"""
+    if len(sys.argv) != 2:
+        print("Использование: python profiler.py <отчет.json> > profile.folded")
+        sys.exit(1)
+    with open(sys.argv[1], encoding='utf-8') as f:
+        report = json.load(f)
+    sys.stdout.write('\n'.join(report['collapsed']) + '\n')
+
+
+if __name__ == "__main__":
+    main()
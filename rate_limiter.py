@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from shared import Shared
+
+
+class RateController:
+    """
+    Адаптивный ограничитель частоты запросов (token bucket + AIMD)
+
+    Скорость пополнения корзины растет аддитивно после успешных ответов
+    и уменьшается мультипликативно при 429/5xx. Заголовок Retry-After
+    приостанавливает выдачу токенов до указанного момента.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 10,
+                 min_rate: float = 0.2, max_rate: float = 50.0,
+                 increase_step: float = 0.1, decrease_factor: float = 0.5):
+        """
+        Инициализация ограничителя
+
+        Args:
+            rate: Начальная скорость (запросов в секунду)
+            burst: Размер корзины (сколько запросов можно выполнить подряд)
+            min_rate: Нижняя граница скорости
+            max_rate: Верхняя граница скорости
+            increase_step: Аддитивный прирост скорости после успешного ответа
+            decrease_factor: Множитель скорости при 429/5xx
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.total_wait = 0.0
+        self.throttled = 0
+
+    @property
+    def current_rate(self) -> float:
+        """Текущая скорость (запросов в секунду)"""
+        return self._rate
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def acquire(self) -> float:
+        """
+        Получить токен на один запрос, при необходимости подождав
+
+        Returns:
+            Время ожидания в секундах
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.total_wait += waited
+                        return waited
+                    delay = (1 - self._tokens) / self._rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        """Аддитивное увеличение скорости после успешного ответа"""
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        Мультипликативное снижение скорости после 429/5xx
+
+        Args:
+            retry_after: Пауза в секундах из заголовка Retry-After
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+            self.throttled += 1
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def update_from_response(self, status_code: int, headers: Optional[Dict] = None):
+        """Подстройка скорости по коду ответа и заголовкам"""
+        if status_code == 429 or status_code >= 500:
+            retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+            self.on_throttle(retry_after)
+        elif status_code < 400:
+            self.on_success()
+
+    def stats(self) -> Dict:
+        """Текущее состояние ограничителя"""
+        return {
+            'rate': round(self._rate, 3),
+            'burst': self.burst,
+            'tokens': round(self._tokens, 3),
+            'throttled': self.throttled,
+            'total_wait_s': round(self.total_wait, 3)
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Разбор заголовка Retry-After
+
+    Args:
+        value: Число секунд или HTTP-дата
+
+    Returns:
+        Пауза в секундах или None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Значения по умолчанию для WEATHERAPI_RATE_LIMIT, WEATHERAPI_RATE_BURST, WEATHERAPI_RATE_MAX
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_RATE = 50.0
+
+_shared_controller: Shared[RateController] = Shared()
+
+
+def get_rate_controller() -> RateController:
+    """
+    Общий для процесса ограничитель частоты запросов
+
+    Параметры берутся из переменных окружения WEATHERAPI_RATE_LIMIT,
+    WEATHERAPI_RATE_BURST и WEATHERAPI_RATE_MAX.
+    """
+    return _shared_controller.get(lambda: RateController(
+        rate=float(os.getenv('WEATHERAPI_RATE_LIMIT') or DEFAULT_RATE),
+        burst=int(os.getenv('WEATHERAPI_RATE_BURST') or DEFAULT_BURST),
+        max_rate=float(os.getenv('WEATHERAPI_RATE_MAX') or DEFAULT_MAX_RATE)
+    ))
@@ -4,6 +4,10 @@ from dotenv import load_dotenv
 from weatherapi_collector import WeatherAPIDataCollector
 from config import CITIES
 from data_saver import DataSaver
+from run_journal import RunJournal
+from aggregates import RollingStats
+from metrics import report_metrics
+from profiler import profile_from_argv
 
 def search_single_city(city_name):
     """Поиск погоды для одного города"""
@@ -28,9 +32,64 @@ def search_single_city(city_name):
         print(f"❌ Не удалось получить данные для {city_name}")
         return False
 
+# Данные из журнала моложе этого (секунды) при повторном запуске не запрашиваются
+RESUME_MAX_AGE = 900
+# Сколько записей копить перед дозаписью в Parquet и сколько показать в сводке
+PARQUET_CHUNK = 5000
+SUMMARY_SAMPLE = 3
+
+async def stream_concurrently(collector, cities, on_record):
+    """Параллельный сбор погоды с общим пулом соединений"""
+    from async_collector import AsyncWeatherAPIDataCollector
+    async with AsyncWeatherAPIDataCollector(collector) as async_collector:
+        return await async_collector.stream_multiple_cities(cities, on_record)
+
+def collect_as_frame(collector, cities, bulk):
+    """
+    Разовый сбор сразу в DataFrame (--frame)
+    
+    Ответы разбираются пачкой в колонки (batch_parser), без записи
+    WeatherRecord на каждый город; журнал запуска не ведется.
+    """
+    df = collector.collect_frame(cities, bulk=bulk)
+    if not len(df):
+        print("❌ Не удалось собрать данные")
+        return
+    
+    os.makedirs('data', exist_ok=True)
+    filename = 'data/weatherapi_weather.csv'
+    df.to_csv(filename, index=False, encoding='utf-8-sig')
+    print(f"✅ Данные сохранены: {filename} (записей: {len(df)})")
+    DataSaver.save_frame_to_parquet(df, 'data/parquet/weather')
+    
+    temperature = df['temperature_c'].dropna()
+    if len(temperature):
+        print(f"\n📈 СТАТИСТИКА ПО ТЕМПЕРАТУРАМ:")
+        print(f"   Средняя: {temperature.mean():.1f}°C")
+        print(f"   Минимальная: {temperature.min()}°C")
+        print(f"   Максимальная: {temperature.max()}°C")
+        print(f"   Медиана: {temperature.median()}°C")
+
 def main():
     """Основная функция сбора данных через WeatherAPI"""
 
+    use_bulk = '--bulk' in sys.argv
+    if use_bulk:
+        sys.argv.remove('--bulk')
+    use_frame = '--frame' in sys.argv
+    if use_frame:
+        sys.argv.remove('--frame')
+    
+    run_id = None
+    workers = 0
+    for arg in list(sys.argv[1:]):
+        if arg.startswith('--run-id='):
+            run_id = arg.split('=', 1)[1]
+            sys.argv.remove(arg)
+        elif arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+            sys.argv.remove(arg)
+    
     if len(sys.argv) > 1 and sys.argv[1] == 'search':
         if len(sys.argv) > 2:
             city = ' '.join(sys.argv[2:])
@@ -83,36 +142,110 @@ def main():
     
     collector = WeatherAPIDataCollector()
     
-    weather_data = collector.collect_multiple_cities(cities_to_collect)
+    if use_frame:
+        collect_as_frame(collector, cities_to_collect, use_bulk)
+        report_metrics('weatherapi')
+        return
+    
+    journal = None
+    resumed = []
+    exported = set()
+    to_fetch = cities_to_collect
+    if not collector.demo_mode:
+        journal = RunJournal(run_id)
+        journal.start(cities_to_collect)
+        to_fetch = journal.pending(cities_to_collect, max_age=RESUME_MAX_AGE)
+        resumed = journal.records([c for c in cities_to_collect if c not in to_fetch])
+        exported = journal.exported()
+        if resumed:
+            print(f"♻️  Запуск {journal.run_id}: {len(resumed)} городов уже получены, "
+                  f"запрашиваем {len(to_fetch)}")
     
-    if weather_data:
-        os.makedirs('data', exist_ok=True)
-        collector.save_to_csv(
-            weather_data,
-            'data/weatherapi_weather.csv'
-        )
+    os.makedirs('data', exist_ok=True)
+    temperature = RollingStats.for_metric('temperature_c')
+    # В памяти держатся только первые записи для сводки и пачка для Parquet
+    sample = []
+    parquet_buffer = []
+    written = 0
+    with DataSaver.open_stream('data/weatherapi_weather.csv') as csv_stream, \
+            DataSaver.open_stream('data/weatherapi_weather.jsonl') as jsonl_stream:
+        
+        def write(record):
+            nonlocal written
+            csv_stream.write(record)
+            jsonl_stream.write(record)
+            written += 1
+            if len(sample) < SUMMARY_SAMPLE:
+                sample.append(record)
+            if record.get('temperature_c') is not None:
+                temperature.add(record.get('temperature_c'))
+        
+        def flush_parquet():
+            if parquet_buffer:
+                saved = DataSaver.save_to_parquet(parquet_buffer, 'data/parquet/weather')
+                if saved and journal is not None:
+                    journal.mark_exported([record.get('city') for record in parquet_buffer])
+                parquet_buffer.clear()
+        
+        def export(record):
+            parquet_buffer.append(record)
+            if len(parquet_buffer) >= PARQUET_CHUNK:
+                flush_parquet()
         
-        collector.save_to_json(
-            weather_data,
-            'data/weatherapi_weather.json'
-        )
+        def on_record(record):
+            write(record)
+            if journal is not None:
+                journal.mark_done(record.get('city'), record)
+            export(record)
         
+        # CSV/JSONL пишутся заново целиком, в Parquet (только дозапись) идут
+        # лишь записи, не выгруженные до прерывания
+        for record in resumed:
+            write(record)
+            if record.get('city') not in exported:
+                export(record)
+        # Записи из журнала уже на диске, держать их до конца сбора незачем
+        resumed = None
+        
+        if to_fetch and use_bulk:
+            collector.stream_multiple_cities(to_fetch, on_record, bulk=True)
+        elif to_fetch and workers > 1:
+            from sharded_collector import ShardedCollector
+            sharded = ShardedCollector(workers, run_id=run_id and f"{run_id}_sharded")
+            try:
+                sharded.stream(to_fetch, on_record)
+            finally:
+                sharded.close()
+        elif to_fetch:
+            import asyncio
+            asyncio.run(stream_concurrently(collector, to_fetch, on_record))
+        flush_parquet()
+    
+    if journal is not None:
+        journal.mark_failed(journal.pending(to_fetch), 'нет данных')
+        print(f"📒 Журнал запуска {journal.run_id}: {journal.summary()}")
+        journal.close()
+    
+    if written:
         print(f"\n{'='*70}")
         print("✅ СБОР ДАННЫХ УСПЕШНО ЗАВЕРШЕН!")
         print(f"{'='*70}")
         
-        DataSaver.print_data_summary(weather_data, "данных о погоде")
+        DataSaver.print_data_summary(sample, "данных о погоде", total=written)
         
-        temperatures = [d.get('temperature_c') for d in weather_data if d.get('temperature_c') is not None]
-        if temperatures:
+        if temperature.count:
             print(f"\n📈 СТАТИСТИКА ПО ТЕМПЕРАТУРАМ:")
-            print(f"   Средняя: {sum(temperatures)/len(temperatures):.1f}°C")
-            print(f"   Минимальная: {min(temperatures)}°C")
-            print(f"   Максимальная: {max(temperatures)}°C")
-            print(f"   Разница: {max(temperatures) - min(temperatures):.1f}°C")
+            print(f"   Средняя: {temperature.mean:.1f}°C")
+            print(f"   Минимальная: {temperature.min}°C")
+            print(f"   Максимальная: {temperature.max}°C")
+            print(f"   Разница: {temperature.max - temperature.min:.1f}°C")
+            print(f"   Медиана: {temperature.quantile(0.5)}°C")
         
     else:
         print("❌ Не удалось собрать данные")
+    
+    report_metrics('weatherapi')
 
 if __name__ == "__main__":
+    profile_from_argv('run_api_weatherapi')
     main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json
+import sys
+from benchmark import CASES, DEFAULT_SIZES, StubWeatherAPI, compare_reports, run_benchmark
+
+USAGE = ("Использование: python run_benchmark.py [--sizes=100,1000,10000] [--cases=collect,parse] "
+         "[--latency=мс] [--jitter=мс] [--errors=доля] [--throttle=доля] [--payloads=папка] "
+         "[--repeat=N] [--compare=отчет.json]")
+
+
+def main():
+    """Офлайн бенчмарк сбора, разбора и сохранения погоды на локальном стенде API"""
+
+    options = {}
+    for arg in sys.argv[1:]:
+        name, _, value = arg.partition('=')
+        if not name.startswith('--') or not value:
+            print(USAGE)
+            return
+        options[name[2:]] = value
+
+    try:
+        sizes = [int(size) for size in options.pop('sizes', ','.join(map(str, DEFAULT_SIZES))).split(',')]
+        cases = options.pop('cases', ','.join(CASES)).split(',')
+        repeat = int(options.pop('repeat', 3))
+        stub = StubWeatherAPI(
+            latency_ms=float(options.pop('latency', 0)),
+            jitter_ms=float(options.pop('jitter', 0)),
+            error_rate=float(options.pop('errors', 0)),
+            throttle_rate=float(options.pop('throttle', 0)),
+            payload_dir=options.get('payloads')
+        )
+    except ValueError:
+        print(USAGE)
+        return
+    payload_dir = options.pop('payloads', None)
+    compare_path = options.pop('compare', None)
+    if options:
+        print(f"Неизвестные параметры: {', '.join(options)}")
+        print(USAGE)
+        return
+
+    print("=" * 70)
+    print("БЕНЧМАРК СБОРА ПОГОДЫ (ЛОКАЛЬНЫЙ СТЕНД)")
+    print("=" * 70)
+    print(f"Задержка {stub.latency_ms} мс (+{stub.jitter_ms}), ошибки 5xx {stub.error_rate:.1%}, "
+          f"429 {stub.throttle_rate:.1%}")
+    print(f"   {'Замер':<14}{'Локаций':>7}{'Записей/с':>12}{'p50, мс':>10}{'p99, мс':>10}{'RSS, МБ':>10}")
+
+    try:
+        report = run_benchmark(sizes, cases, stub, payload_dir, repeat=repeat)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    print(f"\n💾 Отчет: {report['path']}")
+
+    if compare_path:
+        with open(compare_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n📊 Сравнение с {compare_path} (commit {baseline.get('commit')}):")
+        print(f"   {'Замер':<14}{'Локаций':>7}{'Скорость':>10}{'p99':>8}{'RSS, МБ':>10}")
+        for row in compare_reports(baseline, report):
+            print(f"   {row['case']:<14}{row['size']:>7}{row['speedup'] or '-':>10}"
+                  f"{row['p99_ratio'] or '-':>8}{row['rss_delta_mb'] if row['rss_delta_mb'] is not None else '-':>10}")
+
+
+if __name__ == "__main__":
+    main()
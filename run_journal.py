@@ -0,0 +1,144 @@
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from shared import connect_sqlite
+from weather_record import Record, WeatherRecord, to_dicts
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class RunJournal:
+    """
+    Журнал пакетного сбора для продолжения прерванных запусков
+
+    Для каждого run_id хранит статус каждого города, время последнего
+    получения данных, саму запись и отметку о выгрузке в Parquet.
+    Повторный запуск с тем же run_id запрашивает только отсутствующие
+    или устаревшие города, остальные берутся из журнала.
+    """
+
+    def __init__(self, run_id: Optional[str] = None,
+                 db_path: str = 'data/runs/journal.sqlite'):
+        """
+        Открытие журнала
+
+        Args:
+            run_id: Идентификатор запуска (по умолчанию weatherapi_<дата>)
+            db_path: Путь к SQLite файлу журнала
+        """
+        self.run_id = run_id or f"weatherapi_{datetime.now().strftime('%Y%m%d')}"
+        self.db_path = db_path
+
+        self.conn = connect_sqlite(db_path, timeout=10)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS run_items ("
+            "run_id TEXT NOT NULL, city TEXT NOT NULL, status TEXT NOT NULL, "
+            "fetched_at REAL, error TEXT, record TEXT, exported INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (run_id, city))"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(run_items)")}
+        if 'exported' not in columns:
+            self.conn.execute("ALTER TABLE run_items ADD COLUMN exported INTEGER NOT NULL DEFAULT 0")
+
+    def start(self, cities: List[str]):
+        """Зарегистрировать запуск и его города (уже известные не сбрасываются)"""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT INTO runs (run_id, created_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (self.run_id, now, now)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO run_items (run_id, city, status) VALUES (?, ?, ?)",
+                [(self.run_id, city, PENDING) for city in cities]
+            )
+
+    def pending(self, cities: List[str], max_age: Optional[float] = None) -> List[str]:
+        """
+        Города, которые нужно запросить
+
+        Args:
+            cities: Полный список городов запуска
+            max_age: Данные старше стольких секунд считаются устаревшими
+
+        Returns:
+            Города без данных или с устаревшими данными, в исходном порядке
+        """
+        fresh_after = time.time() - max_age if max_age is not None else float('-inf')
+        done = {
+            city for city, fetched_at in self.conn.execute(
+                "SELECT city, fetched_at FROM run_items WHERE run_id = ? AND status = ?",
+                (self.run_id, DONE)
+            )
+            if fetched_at is not None and fetched_at >= fresh_after
+        }
+        return [city for city in cities if city not in done]
+
+    def mark_done(self, city: str, record: Record):
+        """Отметить город как полученный и сохранить запись"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO run_items (run_id, city, status, fetched_at, error, record) "
+            "VALUES (?, ?, ?, ?, NULL, ?)",
+            (self.run_id, city, DONE, time.time(),
+             json.dumps(to_dicts([record])[0], ensure_ascii=False))
+        )
+
+    def mark_exported(self, cities: List[str]):
+        """Отметить города, записи которых уже дописаны в Parquet датасет"""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "UPDATE run_items SET exported = 1 WHERE run_id = ? AND city = ? AND status = ?",
+                [(self.run_id, city, DONE) for city in cities]
+            )
+
+    def exported(self) -> set:
+        """Города запуска, записи которых уже есть в Parquet датасете"""
+        return {row[0] for row in self.conn.execute(
+            "SELECT city FROM run_items WHERE run_id = ? AND status = ? AND exported = 1",
+            (self.run_id, DONE)
+        )}
+
+    def mark_failed(self, cities: List[str], error: str = ''):
+        """Отметить города, для которых не удалось получить данные"""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "UPDATE run_items SET status = ?, error = ? "
+                "WHERE run_id = ? AND city = ? AND status != ?",
+                [(FAILED, error, self.run_id, city, DONE) for city in cities]
+            )
+
+    def records(self, cities: Optional[List[str]] = None) -> List[WeatherRecord]:
+        """
+        Сохраненные записи запуска
+
+        Args:
+            cities: Вернуть только эти города (в их порядке)
+        """
+        rows = dict(self.conn.execute(
+            "SELECT city, record FROM run_items WHERE run_id = ? AND status = ? "
+            "AND record IS NOT NULL",
+            (self.run_id, DONE)
+        ).fetchall())
+        order = cities if cities is not None else list(rows)
+        return [WeatherRecord.from_dict(json.loads(rows[city])) for city in order if city in rows]
+
+    def summary(self) -> Dict[str, int]:
+        """Число городов запуска по статусам"""
+        return dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM run_items WHERE run_id = ? GROUP BY status",
+            (self.run_id,)
+        ).fetchall())
+
+    def close(self):
+        self.conn.close()
@@ -9,6 +9,10 @@ print("="*60)
 # Добавляем путь
 sys.path.append(os.getcwd())
 
+# --profile[=путь]: этапы, cProfile и tracemalloc в data/profiles
+from profiler import profile_from_argv, stage
+profile_from_argv('run_parsing_part')
+
 # Пробуем импортировать
 try:
     from parsing.vk_parser import VKParser
@@ -57,7 +61,8 @@ try:
     
     for query in queries:
         print(f"\nПоиск: '{query}'")
-        posts = parser.search_public_posts(query, max_posts=3)
+        with stage('fetch'):
+            posts = parser.search_public_posts(query, max_posts=3)
         
         if posts:
             print(f"Найдено: {len(posts)} постов")
@@ -76,7 +81,8 @@ try:
     # Сохраняем
     if all_posts:
         print(f"\n💾 Сохраняем {len(all_posts)} постов...")
-        DataSaver.save_to_csv(all_posts, 'parsing/data/vk_results.csv')
+        with stage('save'):
+            DataSaver.save_to_csv(all_posts, 'parsing/data/vk_results.csv')
         DataSaver.print_data_summary(all_posts, "постов ВКонтакте")
         
         # Показываем примеры
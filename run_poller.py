@@ -0,0 +1,40 @@
+import sys
+from dotenv import load_dotenv
+from weatherapi_collector import WeatherAPIDataCollector
+from poll_scheduler import PollScheduler
+from config import CITIES
+from metrics import export_metrics, report_metrics
+
+
+def main():
+    """Долгоживущий опрос городов с расписанием по частоте обновления данных"""
+
+    load_dotenv()
+
+    max_polls = None
+    if len(sys.argv) > 1:
+        try:
+            max_polls = int(sys.argv[1])
+        except ValueError:
+            print("Использование: python run_poller.py [число_опросов]")
+            return
+
+    print("=" * 70)
+    print("ОПРОС ПОГОДЫ ПО РАСПИСАНИЮ")
+    print("=" * 70)
+
+    collector = WeatherAPIDataCollector()
+    scheduler = PollScheduler(collector, CITIES)
+
+    try:
+        # Снимок метрик обновляется после каждого опроса (для textfile-коллектора Prometheus)
+        scheduler.run(max_polls=max_polls, on_record=lambda record: export_metrics('poller'))
+    except KeyboardInterrupt:
+        print("\n⏹️  Остановлено пользователем, расписание сохранено")
+    finally:
+        scheduler.close()
+        report_metrics('poller')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,55 @@
 import os
 from dotenv import load_dotenv
 from weatherapi_collector import WeatherAPIDataCollector
-from config import get_cities_list, RUSSIAN_CITIES, EUROPEAN_CITIES, ASIAN_CITIES
+from config import get_cities_list
 from data_saver import DataSaver
+from aggregates import RollingStats, get_aggregate_store
+from metrics import report_metrics
+from profiler import profile_from_argv
 
-def collect_region(region_name, cities, collector):
-    """Сбор данных для региона"""
+# Сколько первых записей показать в сводке (остальные только на диске)
+SUMMARY_SAMPLE = 3
+
+def collect_region(region_name, cities, collector, extra_streams=(), sample=None):
+    """
+    Сбор данных для региона
+    
+    Записи сразу уходят в файлы; в памяти остаются только первые
+    SUMMARY_SAMPLE для сводки (в список sample) и статистика температуры.
+    
+    Returns:
+        Число собранных записей
+    """
     print(f"\n{'='*60}")
     print(f"🌍 РЕГИОН: {region_name.upper()}")
     print(f"{'='*60}")
     
-    weather_data = collector.collect_multiple_cities(cities)
-    
-    if weather_data:
-        filename = f"data/weather_{region_name.lower()}.csv"
-        DataSaver.save_to_csv(weather_data, filename)
+    filename = f"data/weather_{region_name.lower()}.csv"
+    aggregates = None if collector.demo_mode else get_aggregate_store()
+    temperature = RollingStats.for_metric('temperature_c')
+    with DataSaver.open_stream(filename) as region_stream:
+        
+        def on_record(record):
+            region_stream.write(record)
+            for stream in extra_streams:
+                stream.write(record)
+            if record.get('temperature_c') is not None:
+                temperature.add(record.get('temperature_c'))
+            if aggregates is not None:
+                aggregates.ingest(record, region=region_name)
+            if sample is not None and len(sample) < SUMMARY_SAMPLE:
+                sample.append(record)
         
+        count = collector.stream_multiple_cities(cities, on_record)
+    
+    if count and temperature.count:
         print(f"\n📊 Статистика для {region_name}:")
-        temperatures = [d.get('temperature_c') for d in weather_data if d.get('temperature_c')]
-        if temperatures:
-            avg_temp = sum(temperatures) / len(temperatures)
-            min_temp = min(temperatures)
-            max_temp = max(temperatures)
-            print(f"   Средняя температура: {avg_temp:.1f}°C")
-            print(f"   Минимальная: {min_temp}°C")
-            print(f"   Максимальная: {max_temp}°C")
+        print(f"   Средняя температура: {temperature.mean:.1f}°C")
+        print(f"   Минимальная: {temperature.min}°C")
+        print(f"   Максимальная: {temperature.max}°C")
+        print(f"   Медиана: {temperature.quantile(0.5)}°C")
     
-    return weather_data
+    return count
 
 def main():
     """Сбор данных по разным регионам"""
@@ -40,29 +63,31 @@ def main():
     collector = WeatherAPIDataCollector()
     
     os.makedirs('data', exist_ok=True)
-    all_data = []
+    sample = []
+    total = 0
     
-    russian_cities = RUSSIAN_CITIES[:10]
+    russian_cities = get_cities_list('russia', 10)
     if 'Orenburg' not in russian_cities:
         russian_cities.append('Orenburg')
     
-    russia_data = collect_region('Россия', russian_cities, collector)
-    all_data.extend(russia_data)
-    europe_data = collect_region('Европа', EUROPEAN_CITIES[:5], collector)
-    all_data.extend(europe_data)
-    
-    asia_data = collect_region('Азия', ASIAN_CITIES[:5], collector)
-    all_data.extend(asia_data)
-    
-    if all_data:
-        DataSaver.save_to_csv(all_data, 'data/weather_all_regions.csv')
-        DataSaver.save_to_json(all_data, 'data/weather_all_regions.json')
+    with DataSaver.open_stream('data/weather_all_regions.csv') as all_csv, \
+            DataSaver.open_stream('data/weather_all_regions.jsonl') as all_jsonl:
+        all_streams = (all_csv, all_jsonl)
+        
+        total += collect_region('Россия', russian_cities, collector, all_streams, sample)
+        total += collect_region('Европа', get_cities_list('europe', 5), collector, all_streams, sample)
         
+        total += collect_region('Азия', get_cities_list('asia', 5), collector, all_streams, sample)
+    
+    if total:
         print(f"\n{'='*60}")
         print("✅ ВСЕ ДАННЫХ СОБРАНЫ!")
         print(f"{'='*60}")
         
-        DataSaver.print_data_summary(all_data, "всех данных")
+        DataSaver.print_data_summary(sample, "всех данных", total=total)
+    
+    report_metrics('regions')
 
 if __name__ == "__main__":
+    profile_from_argv('run_regions')
     main()
\ No newline at end of file
@@ -0,0 +1,42 @@
+import sys
+from dotenv import load_dotenv
+from weather_service import WeatherService, serve
+
+
+def main():
+    """Локальный HTTP сервис погоды для других инструментов"""
+
+    load_dotenv()
+
+    host, port = '127.0.0.1', 8080
+    if len(sys.argv) > 1:
+        address, _, port_text = sys.argv[1].rpartition(':')
+        host = address or host
+        try:
+            port = int(port_text)
+        except ValueError:
+            print("Использование: python run_service.py [хост:порт | порт]")
+            return
+
+    print("=" * 70)
+    print("СЕРВИС ПОГОДЫ")
+    print("=" * 70)
+
+    service = WeatherService()
+    server = serve(host, port, service)
+    print(f"🌐 http://{host}:{port}/current?q=Moscow")
+    print(f"   http://{host}:{port}/forecast?q=Moscow&days=3")
+    print(f"   http://{host}:{port}/health")
+    print(f"   http://{host}:{port}/metrics")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n⏹️  Остановлено: {service.stats()}")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import glob
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from aggregates import get_aggregate_store
+from data_saver import RecordStream
+from metrics import export_metrics
+from rate_limiter import DEFAULT_BURST, DEFAULT_MAX_RATE, DEFAULT_RATE
+from weather_record import WeatherRecord
+from weatherapi_collector import WeatherAPIDataCollector
+from work_queue import WorkQueue
+
+# Минимальный срок аренды и запас на один город (таймауты чтения с повторами), с
+LEASE_MIN_TIMEOUT = 120
+LEASE_CITY_MARGIN = 90
+
+
+def rate_share(workers: int) -> Dict[str, str]:
+    """
+    Доля общего лимита запросов на один воркер
+
+    Делятся и стартовая частота, и потолок AIMD, и запас токенов:
+    иначе каждый процесс сам разгонится до полного WEATHERAPI_RATE_MAX
+    и N воркеров превысят общую квоту в N раз.
+
+    Returns:
+        Переменные окружения WEATHERAPI_RATE_* для процесса-воркера
+    """
+    rate = float(os.getenv('WEATHERAPI_RATE_LIMIT') or DEFAULT_RATE)
+    burst = int(os.getenv('WEATHERAPI_RATE_BURST') or DEFAULT_BURST)
+    max_rate = float(os.getenv('WEATHERAPI_RATE_MAX') or DEFAULT_MAX_RATE)
+    return {
+        'WEATHERAPI_RATE_LIMIT': str(rate / workers),
+        'WEATHERAPI_RATE_BURST': str(max(1, burst // workers)),
+        'WEATHERAPI_RATE_MAX': str(max(rate, max_rate) / workers),
+    }
+
+
+def _worker_main(shard: int, queue_path: str, queue_name: str, out_dir: str,
+                 batch_size: int, lease_timeout: float, rate_env: Dict[str, str]):
+    """
+    Процесс-воркер: берет города из очереди, собирает и пишет свой шард
+
+    Каждая пачка пишется в отдельный файл атомарно и только потом
+    подтверждается в очереди, поэтому падение воркера теряет не больше
+    одной неподтвержденной пачки, которую доберут после истечения аренды.
+    Аренда продлевается после каждого полученного города, так что ее
+    срок должен покрывать один город, а не всю пачку.
+    """
+    # Сводки ведет координатор: их состояние в памяти не делится между процессами
+    os.environ['WEATHERAPI_AGGREGATES_PATH'] = ''
+    os.environ.update(rate_env)
+
+    queue = WorkQueue(queue_path, queue_name, lease_timeout)
+    collector = WeatherAPIDataCollector()
+    owner = f"shard{shard:02d}-{os.getpid()}"
+    batch_no = 0
+
+    try:
+        while True:
+            cities = queue.lease(owner, batch_size)
+            if not cities:
+                if not queue.unfinished():
+                    break
+                # Остались чужие аренды: ждем, вдруг какая-то истечет
+                time.sleep(1)
+                continue
+
+            fetched = set()
+            filename = os.path.join(out_dir, f"{owner}_{batch_no:05d}.jsonl")
+            with RecordStream(filename, flush_every=batch_size) as stream:
+
+                def on_record(record: WeatherRecord):
+                    stream.write(record)
+                    fetched.add(record.get('city'))
+                    queue.renew(owner)
+
+                collector.stream_multiple_cities(cities, on_record)
+            batch_no += 1
+
+            queue.complete(owner, [city for city in cities if city in fetched])
+            missing = [city for city in cities if city not in fetched]
+            if missing:
+                queue.fail(owner, missing, 'нет данных')
+    finally:
+        queue.close()
+        # Метрики запросов у каждого процесса свои
+        export_metrics(f"shard{shard:02d}")
+
+
+class ShardedCollector:
+    """
+    Сбор погоды несколькими процессами через общую очередь
+
+    Координатор кладет города в WorkQueue, N процессов-воркеров (каждый
+    со своим WeatherAPIDataCollector) берут их пачками в аренду и пишут
+    результаты в свои файлы шардов. Упавший воркер перезапускается, его
+    задания возвращаются в очередь по истечении аренды. В конце шарды
+    сливаются в один список в порядке исходных городов.
+    """
+
+    def __init__(self, workers: Optional[int] = None, run_id: Optional[str] = None,
+                 queue_path: str = 'data/runs/queue.sqlite', out_root: str = 'data/shards',
+                 batch_size: int = 25, lease_timeout: Optional[float] = None,
+                 max_restarts: int = 3):
+        """
+        Инициализация
+
+        Args:
+            workers: Число процессов (по умолчанию число ядер)
+            run_id: Идентификатор запуска; с тем же run_id сбор продолжается
+            queue_path: Путь к SQLite файлу очереди
+            out_root: Каталог для файлов шардов
+            batch_size: Размер пачки городов на одну аренду
+            lease_timeout: Срок аренды в секундах (по умолчанию по размеру
+                пачки и доле лимита запросов на воркер)
+            max_restarts: Сколько раз перезапускать упавший воркер
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.run_id = run_id or f"sharded_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.queue_path = queue_path
+        self.out_dir = os.path.join(out_root, self.run_id)
+        self.batch_size = batch_size
+        self.rate_env = rate_share(self.workers)
+        self.lease_timeout = lease_timeout or self._default_lease_timeout()
+        self.max_restarts = max_restarts
+        self.queue = WorkQueue(queue_path, self.run_id, self.lease_timeout)
+
+    def _default_lease_timeout(self) -> float:
+        """
+        Срок аренды: вдвое больше времени на пачку при стартовой доле
+        лимита плюс запас на таймауты и повторы одного города
+        """
+        rate = float(self.rate_env['WEATHERAPI_RATE_LIMIT'])
+        return max(LEASE_MIN_TIMEOUT, 2 * self.batch_size / rate + LEASE_CITY_MARGIN)
+
+    def _start_worker(self, context, shard: int):
+        process = context.Process(
+            target=_worker_main,
+            args=(shard, self.queue_path, self.run_id, self.out_dir,
+                  self.batch_size, self.lease_timeout, self.rate_env),
+            name=f"weatherapi-shard{shard:02d}"
+        )
+        process.start()
+        return process
+
+    def run(self, cities: List[str],
+            on_record: Optional[Callable[[WeatherRecord], None]] = None) -> List[WeatherRecord]:
+        """
+        Сбор погоды для списка городов
+
+        Args:
+            cities: Список городов
+            on_record: Вызывается для каждой записи после слияния шардов
+
+        Returns:
+            Список WeatherRecord в порядке исходных городов
+        """
+        self._collect(cities)
+        records = self.merge(cities, on_record)
+
+        aggregates = get_aggregate_store()
+        if aggregates is not None:
+            aggregates.ingest_many(records)
+        return records
+
+    def stream(self, cities: List[str], on_record: Callable[[WeatherRecord], None]) -> int:
+        """
+        Сбор погоды для списка городов без накопления записей в памяти
+
+        Записи передаются в on_record по мере чтения файлов шардов (в
+        порядке файлов, а не исходных городов).
+
+        Returns:
+            Число записей
+        """
+        self._collect(cities)
+        aggregates = get_aggregate_store()
+        count = 0
+        for record in self.iter_records():
+            on_record(record)
+            if aggregates is not None:
+                aggregates.ingest(record)
+            count += 1
+        return count
+
+    def _collect(self, cities: List[str]):
+        """Постановка городов в очередь и работа воркеров до опустошения очереди"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        added = self.queue.enqueue(cities)
+        print(f"🧩 Запуск {self.run_id}: {added} новых городов в очереди, "
+              f"{self.workers} процессов")
+
+        context = multiprocessing.get_context('spawn')
+        processes = {shard: self._start_worker(context, shard) for shard in range(self.workers)}
+        restarts = 0
+
+        try:
+            while processes:
+                time.sleep(0.5)
+                for shard, process in list(processes.items()):
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    del processes[shard]
+                    if process.exitcode != 0 and self.queue.unfinished() and restarts < self.max_restarts:
+                        restarts += 1
+                        print(f"   ⚠️  Воркер {shard} завершился с кодом {process.exitcode}, перезапуск")
+                        processes[shard] = self._start_worker(context, shard)
+        finally:
+            # Прерванный сбор (исключение, Ctrl-C) не оставляет живых воркеров;
+            # их аренды истекут, и продолжение с тем же run_id доберет города
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+        counts = self.queue.counts()
+        print(f"✅ Очередь {self.run_id}: {counts}")
+
+    def iter_records(self):
+        """
+        Записи из файлов шардов, по одной на город
+
+        Файлы читаются от новых к старым, поэтому повторно собранный
+        город (после падения воркера) берется из последнего файла.
+        """
+        seen = set()
+        files = sorted(glob.glob(os.path.join(self.out_dir, '*.jsonl')), key=os.path.getmtime,
+                       reverse=True)
+        for filename in files:
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = WeatherRecord.from_dict(json.loads(line))
+                    if record.get('city') not in seen:
+                        seen.add(record.get('city'))
+                        yield record
+
+    def merge(self, cities: Optional[List[str]] = None,
+              on_record: Optional[Callable[[WeatherRecord], None]] = None) -> List[WeatherRecord]:
+        """
+        Слияние файлов шардов
+
+        Повторно собранный город (после падения воркера) берется из
+        последнего по времени файла.
+
+        Args:
+            cities: Порядок городов в результате (по умолчанию порядок очереди)
+            on_record: Вызывается для каждой записи результата
+        """
+        by_city: Dict[str, WeatherRecord] = {record.get('city'): record for record in self.iter_records()}
+
+        order = cities if cities is not None else self.queue.items()
+        records = [by_city[city] for city in order if city in by_city]
+        if on_record:
+            for record in records:
+                on_record(record)
+        return records
+
+    def close(self):
+        self.queue.close()
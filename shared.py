@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+def connect_sqlite(db_path: str, timeout: float = 10, synchronous: Optional[str] = None,
+                   check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Соединение SQLite в режиме autocommit с журналом WAL
+
+    Папка файла создается при необходимости.
+
+    Args:
+        db_path: Путь к SQLite файлу
+        timeout: Сколько секунд ждать блокировку другого процесса
+        synchronous: Значение PRAGMA synchronous (None - по умолчанию SQLite)
+        check_same_thread: False - соединение используется из разных потоков
+            под собственной блокировкой владельца
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None,
+                           check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+class ThreadConnections:
+    """Отдельное соединение SQLite для каждого потока (открывается при первом обращении)"""
+
+    def __init__(self, db_path: str, timeout: float = 10, synchronous: Optional[str] = None):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """Соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.db_path, self.timeout, self.synchronous)
+        return conn
+
+
+class Shared(Generic[T]):
+    """
+    Общий для процесса объект, создаваемый при первом обращении
+
+    Модули держат его в переменной _shared_<имя> и отдают через get_<имя>():
+    проверки переменных окружения - в get_<имя>(), создание - в factory.
+    """
+
+    def __init__(self):
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self, factory: Callable[[], T]) -> T:
+        """Объект процесса; factory вызывается один раз, даже из нескольких потоков"""
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = factory()
+                value = self._value
+        return value
+
+    def reset(self):
+        """Забыть объект: следующий get() создаст новый (для тестов)"""
+        with self._lock:
+            self._value = None
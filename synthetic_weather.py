@@ -0,0 +1,517 @@
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import CITIES_RU
+from gazetteer import get_gazetteer
+from shared import Shared
+from weather_record import WeatherRecord
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Страны синтетических локаций: название, широта от/до, долгота от/до, вес
+COUNTRIES = [
+    ('Россия', 45.0, 68.0, 30.0, 135.0, 6),
+    ('США', 30.0, 47.0, -122.0, -75.0, 4),
+    ('Китай', 22.0, 45.0, 100.0, 122.0, 4),
+    ('Индия', 10.0, 30.0, 72.0, 88.0, 4),
+    ('Япония', 31.0, 43.5, 130.0, 145.0, 2),
+    ('Бразилия', -30.0, -3.0, -60.0, -36.0, 2),
+    ('Германия', 47.5, 54.5, 6.0, 15.0, 1),
+    ('Франция', 43.5, 50.5, -1.0, 7.0, 1),
+    ('Великобритания', 50.5, 57.5, -5.0, 1.5, 1),
+    ('Италия', 38.0, 46.0, 8.0, 16.0, 1),
+    ('Казахстан', 42.0, 54.0, 50.0, 85.0, 1),
+    ('Египет', 23.0, 31.0, 25.0, 34.0, 1),
+    ('Австралия', -38.0, -17.0, 115.0, 153.0, 1),
+    ('Канада', 43.0, 60.0, -125.0, -65.0, 1),
+]
+# Названия стран по кодам ISO (коды справочника gazetteer и KNOWN_PLACES)
+COUNTRY_NAMES = {
+    'RU': 'Россия', 'US': 'США', 'CN': 'Китай', 'IN': 'Индия', 'JP': 'Япония',
+    'BR': 'Бразилия', 'DE': 'Германия', 'FR': 'Франция', 'GB': 'Великобритания',
+    'IT': 'Италия', 'KZ': 'Казахстан', 'EG': 'Египет', 'AU': 'Австралия', 'CA': 'Канада',
+    'ES': 'Испания', 'TR': 'Турция', 'AE': 'ОАЭ', 'SG': 'Сингапур', 'KR': 'Южная Корея',
+    'TH': 'Таиланд', 'HK': 'Гонконг', 'AT': 'Австрия', 'CZ': 'Чехия', 'PL': 'Польша',
+    'HU': 'Венгрия', 'GR': 'Греция', 'PT': 'Португалия', 'SE': 'Швеция', 'NO': 'Норвегия',
+    'DK': 'Дания', 'FI': 'Финляндия', 'NL': 'Нидерланды', 'BE': 'Бельгия',
+    'CH': 'Швейцария', 'UA': 'Украина', 'BY': 'Беларусь', 'UZ': 'Узбекистан',
+}
+# Координаты городов из config, чтобы демо-режим без справочника не путал страны
+KNOWN_PLACES = {
+    'moscow': ('RU', 55.76, 37.62), 'saint petersburg': ('RU', 59.94, 30.31),
+    'novosibirsk': ('RU', 55.03, 82.92), 'yekaterinburg': ('RU', 56.84, 60.61),
+    'kazan': ('RU', 55.79, 49.12), 'nizhny novgorod': ('RU', 56.33, 44.0),
+    'chelyabinsk': ('RU', 55.16, 61.4), 'samara': ('RU', 53.2, 50.15),
+    'omsk': ('RU', 54.99, 73.37), 'rostov-on-don': ('RU', 47.24, 39.71),
+    'ufa': ('RU', 54.74, 55.97), 'krasnoyarsk': ('RU', 56.01, 92.87),
+    'voronezh': ('RU', 51.67, 39.18), 'perm': ('RU', 58.01, 56.25),
+    'volgograd': ('RU', 48.71, 44.51), 'krasnodar': ('RU', 45.04, 38.98),
+    'saratov': ('RU', 51.53, 46.03), 'tyumen': ('RU', 57.15, 65.53),
+    'izhevsk': ('RU', 56.85, 53.2), 'barnaul': ('RU', 53.35, 83.78),
+    'vladivostok': ('RU', 43.12, 131.89), 'irkutsk': ('RU', 52.29, 104.28),
+    'khabarovsk': ('RU', 48.48, 135.08), 'orenburg': ('RU', 51.77, 55.1),
+    'novokuznetsk': ('RU', 53.76, 87.12), 'tolyatti': ('RU', 53.51, 49.42),
+    'kemerovo': ('RU', 55.35, 86.09), 'astrakhan': ('RU', 46.35, 48.04),
+    'tula': ('RU', 54.19, 37.62), 'sochi': ('RU', 43.6, 39.73),
+    'ryazan': ('RU', 54.63, 39.74), 'penza': ('RU', 53.2, 45.0),
+    'lipetsk': ('RU', 52.61, 39.59), 'naberezhnye chelny': ('RU', 55.74, 52.4),
+    'kaliningrad': ('RU', 54.71, 20.51), 'stavropol': ('RU', 45.04, 41.97),
+    'london': ('GB', 51.51, -0.13), 'new york': ('US', 40.71, -74.01),
+    'tokyo': ('JP', 35.69, 139.69), 'berlin': ('DE', 52.52, 13.4),
+    'paris': ('FR', 48.86, 2.35), 'rome': ('IT', 41.9, 12.5),
+    'madrid': ('ES', 40.42, -3.7), 'beijing': ('CN', 39.9, 116.4),
+    'istanbul': ('TR', 41.01, 28.98), 'sydney': ('AU', -33.87, 151.21),
+    'dubai': ('AE', 25.2, 55.27), 'singapore': ('SG', 1.35, 103.82),
+    'seoul': ('KR', 37.57, 126.98), 'toronto': ('CA', 43.65, -79.38),
+    'mumbai': ('IN', 19.08, 72.88), 'cairo': ('EG', 30.04, 31.24),
+    'bangkok': ('TH', 13.76, 100.5), 'hong kong': ('HK', 22.32, 114.17),
+    'vienna': ('AT', 48.21, 16.37), 'prague': ('CZ', 50.08, 14.44),
+    'warsaw': ('PL', 52.23, 21.01), 'budapest': ('HU', 47.5, 19.04),
+    'athens': ('GR', 37.98, 23.73), 'lisbon': ('PT', 38.72, -9.14),
+    'stockholm': ('SE', 59.33, 18.07), 'oslo': ('NO', 59.91, 10.75),
+    'copenhagen': ('DK', 55.68, 12.57), 'helsinki': ('FI', 60.17, 24.94),
+}
+_RU_TO_EN = {ru_name.lower(): en_name.lower() for ru_name, en_name in CITIES_RU.items()}
+
+# Коды состояний WeatherAPI: текст днем, текст ночью, номер иконки
+CONDITIONS = {
+    1000: ('Солнечно', 'Ясно', 113),
+    1003: ('Переменная облачность', 'Переменная облачность', 116),
+    1006: ('Облачно', 'Облачно', 119),
+    1009: ('Пасмурно', 'Пасмурно', 122),
+    1135: ('Туман', 'Туман', 248),
+    1183: ('Небольшой дождь', 'Небольшой дождь', 296),
+    1189: ('Умеренный дождь', 'Умеренный дождь', 302),
+    1195: ('Сильный дождь', 'Сильный дождь', 308),
+    1213: ('Небольшой снег', 'Небольшой снег', 326),
+    1219: ('Умеренный снег', 'Умеренный снег', 332),
+    1225: ('Сильный снег', 'Сильный снег', 338),
+    1276: ('Умеренный или сильный дождь с грозой', 'Умеренный или сильный дождь с грозой', 389),
+}
+WIND_DIRS = np.array(['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                      'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW'], dtype=object)
+
+_CODES = np.array(list(CONDITIONS), dtype=np.int64)
+_TEXT_DAY = np.array([day for day, _, _ in CONDITIONS.values()], dtype=object)
+_TEXT_NIGHT = np.array([night for _, night, _ in CONDITIONS.values()], dtype=object)
+_ICON_DAY = np.array([f"//cdn.weatherapi.com/weather/64x64/day/{icon}.png"
+                      for _, _, icon in CONDITIONS.values()], dtype=object)
+_ICON_NIGHT = np.array([f"//cdn.weatherapi.com/weather/64x64/night/{icon}.png"
+                        for _, _, icon in CONDITIONS.values()], dtype=object)
+_CODE_INDEX = {code: i for i, code in enumerate(_CODES)}
+
+
+def _format_minutes(times: np.ndarray) -> np.ndarray:
+    """datetime64 -> строки 'ГГГГ-ММ-ДД ЧЧ:ММ' как в ответах WeatherAPI"""
+    if not len(times):
+        return np.array([], dtype=object)
+    return np.char.replace(np.datetime_as_string(times.astype('datetime64[m]'), unit='m'), 'T', ' ')
+
+
+def _known_place(name: str, gazetteer=None) -> Optional[Tuple[str, float, float]]:
+    """(код страны, широта, долгота) известного города или None"""
+    key = ' '.join(str(name).split()).lower()
+    key = _RU_TO_EN.get(key, key)
+    if key in KNOWN_PLACES:
+        return KNOWN_PLACES[key]
+    if gazetteer is not None:
+        place = gazetteer.find(key)
+        if place is not None:
+            return place['country'], place['lat'], place['lon']
+    return None
+
+
+def _clock(hours: np.ndarray) -> List[str]:
+    """Часы суток -> '07:45 AM' как в блоке astro"""
+    minutes = np.round(np.mod(hours, 24) * 60).astype(np.int64) % 1440
+    return [f"{(m // 60) % 12 or 12:02d}:{m % 60:02d} {'AM' if m < 720 else 'PM'}" for m in minutes.tolist()]
+
+
+class SyntheticWeather:
+    """
+    Генератор правдоподобных наблюдений погоды на NumPy
+
+    Все поля считаются векторно для всего массива наблюдений сразу.
+    Температура зависит от широты, сезона (с учетом полушария) и
+    времени суток; облачность, влажность, давление и осадки связаны
+    общей скрытой переменной "ненастья", по ним выбирается код состояния
+    WeatherAPI. При одинаковом seed результат воспроизводим.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Инициализация генератора
+
+        Args:
+            seed: Зерно генератора (None - случайное)
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def _observe(self, lat: np.ndarray, lon: np.ndarray, times: np.ndarray,
+                 offset: np.ndarray, latent: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Погода в точках lat/lon в моменты times (UTC, datetime64)
+
+        Args:
+            offset: Поправка температуры локации (микроклимат)
+            latent: Скрытая переменная ненастья (по умолчанию своя на каждое наблюдение)
+        """
+        rng = self.rng
+        n = len(lat)
+        phi = np.radians(lat)
+        day_of_year = (times.astype('datetime64[D]') - times.astype('datetime64[Y]')).astype(np.float64)
+        utc_hours = (times - times.astype('datetime64[D]')).astype('timedelta64[m]').astype(np.float64) / 60
+        solar_hours = np.mod(utc_hours + lon / 15, 24)
+
+        z = rng.standard_normal(n) if latent is None else latent
+        cloud = 100 / (1 + np.exp(-(1.6 * z + 0.3 + rng.normal(0, 0.6, n))))
+        raining = rng.random(n) < 1 / (1 + np.exp(-2.2 * (z - 0.9)))
+        intensity = np.where(raining, rng.exponential(1.0, n), 0.0)
+        cloud = np.where(raining, np.maximum(cloud, 75), cloud)
+
+        # Годовой ход сильнее к полюсам, в южном полушарии сезоны обратные
+        sin_lat = np.abs(np.sin(phi))
+        mean = 27 - 32 * sin_lat ** 2
+        amplitude = 1 + 20 * sin_lat ** 1.5
+        season = np.cos(2 * np.pi * (day_of_year - 200) / 365.25) * np.sign(lat)
+        diurnal = 4 * np.cos(2 * np.pi * (solar_hours - 15) / 24) * (1 - 0.5 * cloud / 100)
+        temp = mean + amplitude * season + diurnal + offset - 0.8 * z + rng.normal(0, 2.0, n)
+
+        humidity = np.clip(62 + 14 * (0.7 * z + 0.71 * rng.standard_normal(n)) - 0.5 * (temp - 12), 8, 100)
+        humidity = np.where(raining, np.maximum(humidity, 80), humidity)
+        pressure = 1013 - 7 * z + rng.normal(0, 4, n)
+        wind = 12 * rng.weibull(2.0, n) * (1 + 0.25 * np.maximum(z, 0))
+        gust = wind * (1.2 + 0.4 * rng.random(n))
+        wind_degree = rng.integers(0, 360, n)
+
+        declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + day_of_year) / 365)
+        hour_angle = np.radians(15 * (solar_hours - 12))
+        sin_elevation = (np.sin(phi) * np.sin(declination)
+                         + np.cos(phi) * np.cos(declination) * np.cos(hour_angle))
+        is_day = sin_elevation > 0
+        uv = np.clip(12 * sin_elevation, 0, None) * (1 - 0.7 * cloud / 100)
+
+        snow = raining & (temp <= 0.5)
+        fog = ~raining & (humidity >= 97) & (wind < 8)
+        code = np.select(
+            [snow & (intensity < 0.5), snow & (intensity < 1.5), snow,
+             raining & (temp > 18) & (intensity > 2),
+             raining & (intensity < 0.5), raining & (intensity < 1.5), raining,
+             fog, cloud < 20, cloud < 50, cloud < 80],
+            [1213, 1219, 1225, 1276, 1183, 1189, 1195, 1135, 1000, 1003, 1006],
+            default=1009
+        )
+        index = np.searchsorted(_CODES, code)
+
+        visibility = np.select(
+            [fog, snow, raining],
+            [rng.uniform(0.1, 1.0, n), 10 - 4.5 * np.minimum(intensity, 2),
+             10 - 3 * np.minimum(intensity, 2.5)],
+            default=10.0
+        )
+
+        # Ощущаемая температура: ветро-холодовой индекс в холод, формула Стедмана иначе
+        vapour = humidity / 100 * 6.105 * np.exp(17.27 * temp / (237.7 + temp))
+        apparent = temp + 0.33 * vapour - 0.70 * wind / 3.6 - 4.0
+        chill = 13.12 + 0.6215 * temp - 11.37 * wind ** 0.16 + 0.3965 * temp * wind ** 0.16
+        feels = np.where((temp <= 10) & (wind > 4.8), chill, np.where(temp >= 20, apparent, temp))
+
+        temp = np.round(temp, 1)
+        feels = np.round(feels, 1)
+        pressure = np.round(pressure)
+        wind = np.round(wind, 1)
+        gust = np.round(gust, 1)
+        visibility = np.round(visibility, 1)
+        return {
+            'temperature_c': temp,
+            'feelslike_c': feels,
+            'temperature_f': np.round(temp * 9 / 5 + 32, 1),
+            'feelslike_f': np.round(feels * 9 / 5 + 32, 1),
+            'humidity': np.round(humidity).astype(np.int64),
+            'pressure_mb': pressure,
+            'pressure_in': np.round(pressure * 0.02953, 2),
+            'wind_kph': wind,
+            'wind_mph': np.round(wind / 1.609, 1),
+            'wind_dir': WIND_DIRS[((wind_degree + 11.25) // 22.5).astype(np.int64) % 16],
+            'wind_degree': wind_degree,
+            'gust_kph': gust,
+            'gust_mph': np.round(gust / 1.609, 1),
+            'cloud': np.round(cloud).astype(np.int64),
+            'visibility_km': visibility,
+            'visibility_miles': np.round(visibility / 1.609),
+            'condition_text': np.where(is_day, _TEXT_DAY[index], _TEXT_NIGHT[index]),
+            'condition_icon': np.where(is_day, _ICON_DAY[index], _ICON_NIGHT[index]),
+            'condition_code': code,
+            'uv_index': np.round(uv, 1),
+            'precip_mm': np.round(intensity, 1),
+            'is_day': is_day,
+        }
+
+    def _random_locations(self, count: int) -> Dict[str, np.ndarray]:
+        """Случайные локации внутри стран из COUNTRIES (с учетом весов)"""
+        rng = self.rng
+        weights = np.array([country[5] for country in COUNTRIES], dtype=np.float64)
+        country = rng.choice(len(COUNTRIES), size=count, p=weights / weights.sum())
+        return self._place(country, rng.random(count), rng.random(count), rng.normal(0, 2.0, count))
+
+    @staticmethod
+    def _hashed_locations(names: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Локации по названиям: один и тот же город всегда в одной точке
+
+        Известные города (KNOWN_PLACES, затем справочник gazetteer, если он
+        построен) стоят в своих настоящих координатах и странах; остальные
+        названия по хешу попадают в случайную точку одной из COUNTRIES.
+        """
+        def unit(salt: str) -> np.ndarray:
+            return np.array([zlib.crc32(f"{salt}:{name.strip().lower()}".encode('utf-8'))
+                             for name in names], dtype=np.float64) / 2 ** 32
+
+        weights = np.cumsum([country[5] for country in COUNTRIES], dtype=np.float64)
+        country = np.minimum(np.searchsorted(weights / weights[-1], unit('country'), side='right'),
+                             len(COUNTRIES) - 1)
+        offset = (unit('offset') - 0.5) * 6
+        locations = SyntheticWeather._place(country, unit('lat'), unit('lon'), offset)
+
+        gazetteer = get_gazetteer()
+        for i, name in enumerate(names):
+            place = _known_place(name, gazetteer)
+            if place is not None:
+                code, lat, lon = place
+                locations['country'][i] = COUNTRY_NAMES.get(code, code)
+                locations['latitude'][i] = round(lat, 2)
+                locations['longitude'][i] = round(lon, 2)
+        return locations
+
+    @staticmethod
+    def _place(country: np.ndarray, u_lat: np.ndarray, u_lon: np.ndarray,
+               offset: np.ndarray) -> Dict[str, np.ndarray]:
+        bounds = np.array([country[1:5] for country in COUNTRIES], dtype=np.float64)[country]
+        return {
+            'country': np.array([name for name, *_ in COUNTRIES], dtype=object)[country],
+            'latitude': np.round(bounds[:, 0] + u_lat * (bounds[:, 1] - bounds[:, 0]), 2),
+            'longitude': np.round(bounds[:, 2] + u_lon * (bounds[:, 3] - bounds[:, 2]), 2),
+            'offset': offset,
+        }
+
+    def _columns(self, cities: np.ndarray, locations: Dict[str, np.ndarray],
+                 times: np.ndarray, latent: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Полный набор колонок WeatherRecord (плюс precip_mm и is_day)"""
+        with self._lock:
+            weather = self._observe(locations['latitude'], locations['longitude'], times,
+                                    locations['offset'], latent)
+        # Местное время по часовому поясу долготы, обновление данных - раз в 15 минут
+        local = times + (np.round(locations['longitude'] / 15) * 60).astype('timedelta64[m]')
+        updated = local.astype('datetime64[m]')
+        updated = updated - (updated.astype(np.int64) % 15).astype('timedelta64[m]')
+        columns = {
+            'city': cities,
+            'city_name': cities,
+            'country': locations['country'],
+            'region': np.full(len(cities), '', dtype=object),
+            'latitude': locations['latitude'],
+            'longitude': locations['longitude'],
+            'local_time': _format_minutes(local),
+        }
+        columns.update(weather)
+        columns['last_updated'] = _format_minutes(updated)
+        columns['scraped_at'] = np.full(len(cities), datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                        dtype=object)
+        return columns
+
+    def columns(self, n: int, n_locations: Optional[int] = None,
+                start: Optional[datetime] = None, interval_minutes: int = 15) -> Dict[str, np.ndarray]:
+        """
+        Массивы n наблюдений для нагрузочных тестов
+
+        Наблюдения идут сеткой: n_locations локаций опрашиваются каждые
+        interval_minutes минут, начиная со start, поэтому пары
+        (город, last_updated) не повторяются.
+
+        Args:
+            n: Число наблюдений
+            n_locations: Число локаций (по умолчанию min(n, 10000))
+            start: Время первого опроса в UTC (по умолчанию так, чтобы последний был сейчас)
+            interval_minutes: Интервал опроса одной локации
+
+        Returns:
+            Словарь колонка -> numpy массив (колонки WeatherRecord без demo_mode)
+        """
+        n_locations = max(1, min(n_locations or 10000, n))
+        rounds = -(-n // n_locations)
+        if start is None:
+            start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=interval_minutes * (rounds - 1))
+
+        rows = np.arange(n)
+        location = rows % n_locations
+        with self._lock:
+            places = self._random_locations(n_locations)
+        times = (np.datetime64(start, 'm')
+                 + ((rows // n_locations) * interval_minutes).astype('timedelta64[m]'))
+        names = np.array([f"Synthetic City {i:06d}" for i in range(n_locations)], dtype=object)
+        columns = self._columns(names[location], {key: value[location] for key, value in places.items()},
+                                times)
+        del columns['precip_mm'], columns['is_day']
+        return columns
+
+    def frame(self, n: int, n_locations: Optional[int] = None,
+              start: Optional[datetime] = None, interval_minutes: int = 15) -> 'pd.DataFrame':
+        """DataFrame из columns() с теми же аргументами"""
+        import pandas as pd
+
+        return pd.DataFrame(self.columns(n, n_locations, start, interval_minutes))
+
+    def for_cities(self, cities: Sequence[str], when: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Текущая погода для списка городов
+
+        Координаты и страна города определяются его названием, так что
+        один город всегда находится в одной точке.
+
+        Args:
+            cities: Названия городов
+            when: Момент наблюдения в UTC (по умолчанию сейчас)
+        """
+        when = when or datetime.now(timezone.utc).replace(tzinfo=None)
+        names = np.array(list(cities), dtype=object)
+        times = np.full(len(names), np.datetime64(when, 'm'))
+        return self._columns(names, self._hashed_locations(names), times)
+
+    def records(self, cities: Sequence[str], when: Optional[datetime] = None) -> List[WeatherRecord]:
+        """Записи WeatherRecord (с флагом demo_mode) для списка городов"""
+        if not len(cities):
+            return []
+        columns = self.for_cities(cities, when)
+        names = WeatherRecord.field_names()
+        values = [columns[name].tolist() for name in names if name in columns]
+        fields = [name for name in names if name in columns]
+        return [WeatherRecord(**dict(zip(fields, row)), demo_mode=True) for row in zip(*values)]
+
+    def forecast_days(self, city: str, days: int, when: Optional[datetime] = None) -> List[Dict]:
+        """
+        Дни прогноза в формате блока forecast.forecastday WeatherAPI
+
+        Каждый день считается по 24 часовым наблюдениям с общей скрытой
+        переменной ненастья, поэтому день получается цельным.
+        """
+        when = when or datetime.now(timezone.utc).replace(tzinfo=None)
+        location = self._hashed_locations([city])
+        local_start = np.datetime64(when, 'D')
+        shift = (np.round(location['longitude'][0] / 15) * 60).astype(np.int64)
+        hours = np.arange(days * 24)
+        times = local_start + (hours * 60 - shift).astype('timedelta64[m]')
+        with self._lock:
+            latent = np.repeat(self.rng.standard_normal(days), 24)
+            weather = self._observe(np.full(len(hours), location['latitude'][0]),
+                                    np.full(len(hours), location['longitude'][0]),
+                                    times, np.full(len(hours), location['offset'][0]), latent)
+
+        phi = np.radians(location['latitude'][0])
+        result = []
+        for day in range(days):
+            part = slice(day * 24, (day + 1) * 24)
+            date = local_start + np.timedelta64(day, 'D')
+            day_of_year = float((date - date.astype('datetime64[Y]')).astype(np.int64))
+            declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + day_of_year) / 365)
+            half_day = np.degrees(np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))) / 15
+            solar_noon = 12 - (location['longitude'][0] / 15 - shift / 60)
+            sunrise, sunset = _clock(np.array([solar_noon - half_day, solar_noon + half_day]))
+            noon = day * 24 + 13
+            result.append({
+                'date': str(date),
+                'day': {
+                    'maxtemp_c': float(weather['temperature_c'][part].max()),
+                    'mintemp_c': float(weather['temperature_c'][part].min()),
+                    'avgtemp_c': round(float(weather['temperature_c'][part].mean()), 1),
+                    'maxwind_kph': float(weather['wind_kph'][part].max()),
+                    'totalprecip_mm': round(float(weather['precip_mm'][part].sum()), 1),
+                    'avghumidity': round(float(weather['humidity'][part].mean())),
+                    'uv': float(weather['uv_index'][part].max()),
+                    'condition': {
+                        'text': str(_TEXT_DAY[_CODE_INDEX[int(weather['condition_code'][noon])]]),
+                        'icon': str(_ICON_DAY[_CODE_INDEX[int(weather['condition_code'][noon])]]),
+                        'code': int(weather['condition_code'][noon]),
+                    },
+                },
+                'astro': {'sunrise': sunrise, 'sunset': sunset},
+            })
+        return result
+
+    def payloads(self, queries: Sequence[str], days: int = 0) -> List[Dict]:
+        """
+        Ответы в формате /current.json (и /forecast.json при days > 0)
+
+        Нужны демо-режиму: данные проходят тот же разбор, что и настоящие.
+        """
+        if not len(queries):
+            return []
+        columns = self.for_cities(queries)
+        values = {name: array.tolist() for name, array in columns.items()}
+        result = []
+        for i, query in enumerate(queries):
+            row = {name: column[i] for name, column in values.items()}
+            payload = {
+                'location': {
+                    'name': query, 'region': row['region'], 'country': row['country'],
+                    'lat': row['latitude'], 'lon': row['longitude'], 'localtime': row['local_time'],
+                },
+                'current': {
+                    'last_updated': row['last_updated'],
+                    'temp_c': row['temperature_c'], 'temp_f': row['temperature_f'],
+                    'is_day': int(row['is_day']),
+                    'condition': {'text': row['condition_text'], 'icon': row['condition_icon'],
+                                  'code': row['condition_code']},
+                    'wind_mph': row['wind_mph'], 'wind_kph': row['wind_kph'],
+                    'wind_degree': row['wind_degree'], 'wind_dir': row['wind_dir'],
+                    'pressure_mb': row['pressure_mb'], 'pressure_in': row['pressure_in'],
+                    'precip_mm': row['precip_mm'], 'humidity': row['humidity'], 'cloud': row['cloud'],
+                    'feelslike_c': row['feelslike_c'], 'feelslike_f': row['feelslike_f'],
+                    'vis_km': row['visibility_km'], 'vis_miles': row['visibility_miles'],
+                    'uv': row['uv_index'], 'gust_mph': row['gust_mph'], 'gust_kph': row['gust_kph'],
+                },
+            }
+            if days:
+                payload['forecast'] = {'forecastday': self.forecast_days(query, days)}
+            result.append(payload)
+        return result
+
+
+_shared_generator: Shared[SyntheticWeather] = Shared()
+
+
+def get_synthetic_weather() -> SyntheticWeather:
+    """
+    Общий для процесса генератор синтетической погоды
+
+    Зерно берется из переменной окружения WEATHERAPI_DEMO_SEED
+    (если не задано - случайное).
+    """
+    def create() -> SyntheticWeather:
+        seed = os.getenv('WEATHERAPI_DEMO_SEED')
+        return SyntheticWeather(int(seed) if seed else None)
+
+    return _shared_generator.get(create)
+
+
+if __name__ == "__main__":
+    # python synthetic_weather.py [число_наблюдений] [seed] [файл.parquet]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 42
+    started = time.perf_counter()
+    df = SyntheticWeather(seed).frame(count)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Сгенерировано {len(df):,} наблюдений за {elapsed:.2f} с "
+          f"({len(df) / elapsed:,.0f} в секунду), {df.memory_usage(deep=True).sum() / 2 ** 20:.0f} МБ")
+    print(df.groupby('condition_text')['temperature_c'].agg(['count', 'mean']).round(1).to_string())
+    if len(sys.argv) > 3:
+        os.makedirs(os.path.dirname(sys.argv[3]) or '.', exist_ok=True)
+        df.to_parquet(sys.argv[3], engine='pyarrow', index=False)
+        print(f"💾 Сохранено: {sys.argv[3]}")
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Все общие для процесса объекты без файлов на диске и без сети
+ENVIRONMENT = {
+    'WEATHERAPI_API_KEY': 'test',
+    'WEATHERAPI_CACHE': '0',
+    'WEATHERAPI_RESOLVE': '0',
+    'WEATHERAPI_HISTORY_PATH': '',
+    'WEATHERAPI_AGGREGATES_PATH': '',
+    'WEATHERAPI_LOCATIONS_PATH': '',
+    'WEATHERAPI_CACHE_PATH': '',
+    'CITY_INDEX_PATH': '',
+    'GAZETTEER_PATH': '',
+    'WEATHER_METRICS_DIR': '',
+    'WEATHERAPI_RATE_LIMIT': '100000',
+    'WEATHERAPI_RATE_BURST': '100000',
+    'WEATHERAPI_RATE_MAX': '100000',
+}
+
+
+def _reset_shared():
+    """Сброс общих для процесса объектов (_shared_* модулей проекта) и предохранителей"""
+    from shared import Shared
+
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if not path.startswith(ROOT) or os.sep + 'venv' + os.sep in path:
+            continue
+        for value in list(vars(module).values()):
+            if isinstance(value, Shared):
+                value.reset()
+    circuit_breaker = sys.modules.get('circuit_breaker')
+    if circuit_breaker is not None:
+        with circuit_breaker._breakers_lock:
+            circuit_breaker._breakers.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Каждый тест - в своей временной папке и с чистыми синглтонами"""
+    for key, value in ENVIRONMENT.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(tmp_path)
+    _reset_shared()
+    yield tmp_path
+    _reset_shared()
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    """Локальный заглушечный WeatherAPI (benchmark.StubWeatherAPI) для коллекторов"""
+    from benchmark import StubWeatherAPI
+
+    with StubWeatherAPI() as stub:
+        monkeypatch.setenv('WEATHERAPI_BASE_URL', stub.base_url)
+        yield stub
+
+
+@pytest.fixture
+def write_geonames(tmp_path):
+    """Запись выгрузки в формате GeoNames: места (id, название, русское, lat, lon, страна, население)"""
+
+    def write(places, name='cities.txt'):
+        path = tmp_path / name
+        with open(path, 'w', encoding='utf-8') as f:
+            for geonameid, title, russian, lat, lon, country, population in places:
+                parts = [''] * 19
+                parts[0], parts[1], parts[2], parts[3] = str(geonameid), title, title, russian
+                parts[4], parts[5], parts[8], parts[14] = str(lat), str(lon), country, str(population)
+                f.write('\t'.join(parts) + '\n')
+        return str(path)
+
+    return write
@@ -0,0 +1,70 @@
+import sqlite3
+
+from aggregates import AggregateStore
+from weather_record import WeatherRecord
+
+
+def _record(city, updated, temperature, country='Россия'):
+    return WeatherRecord(city=city, city_name=city, country=country,
+                         last_updated=updated, temperature_c=temperature)
+
+
+def test_duplicate_observation_is_counted_once():
+    store = AggregateStore(None)
+    assert store.ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+    assert not store.ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+    assert store.ingest(_record('Москва', '2024-05-01 11:00', 14.0))
+    summary = store.summary('city', 'Москва', '2024-05-01')
+    assert summary['count'] == 2 and summary['mean'] == 12.0
+
+
+def test_lookup_ignores_case(tmp_path):
+    store = AggregateStore(str(tmp_path / 'agg.sqlite'))
+    store.ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+    assert store.buckets('city', 'МОСКВА') == ['2024-05-01']
+    assert store.latest_summary('city', 'москва')[0] == '2024-05-01'
+    assert store.latest_summary('country', 'РОССИЯ', granularity='hour')[0] == '2024-05-01 10'
+
+
+def test_cache_is_bounded_and_evicted_stats_reload(tmp_path):
+    path = str(tmp_path / 'agg.sqlite')
+    store = AggregateStore(path, metrics=('temperature_c',), max_cached=4)
+    for day in range(1, 11):
+        store.ingest(_record('Москва', f'2024-05-{day:02d} 10:00', float(day)))
+        store.ingest(_record('Москва', f'2024-05-{day:02d} 12:00', float(day) + 2))
+        assert len(store._cache) <= 4
+
+    assert store.summary('city', 'Москва', '2024-05-01')['count'] == 2
+    # Сводка вытесненного дня продолжает копиться после перечитывания с диска
+    store.ingest(_record('Тверь', '2024-05-01 13:00', 30.0))
+    assert AggregateStore(path).summary('country', 'россия', '2024-05-01')['count'] == 3
+
+
+def test_memory_only_store_never_evicts():
+    store = AggregateStore(None, metrics=('temperature_c',), max_cached=2)
+    for day in range(1, 6):
+        store.ingest(_record('Москва', f'2024-05-{day:02d} 10:00', float(day)))
+    assert len(store.buckets('city', 'Москва')) == 5
+
+
+def test_old_mixed_case_keys_are_normalized(tmp_path):
+    path = str(tmp_path / 'agg.sqlite')
+    AggregateStore(path).ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE aggregates SET key = 'Москва' WHERE key = 'москва'")
+        conn.execute("UPDATE seen SET key = 'Москва' WHERE key = 'москва'")
+    conn.close()
+
+    store = AggregateStore(path)
+    assert store.latest_summary('city', 'Москва')[1]['count'] == 1
+    assert not store.ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+
+
+def test_reading_unknown_period_does_not_create_it():
+    store = AggregateStore(None)
+    store.ingest(_record('Москва', '2024-05-01 10:00', 10.0))
+    assert store.summary('city', 'Москва', '2024-05-02') is None
+    assert store.summary('city', 'Тверь', '2024-05-01') is None
+    assert store.buckets('city', 'Москва') == ['2024-05-01']
+    assert store.latest_summary('city', 'Тверь') == (None, {'count': 0})
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+
+from async_collector import AsyncWeatherAPIDataCollector
+from weatherapi_collector import WeatherAPIDataCollector
+
+CITIES = ['Moscow', 'Paris', 'Berlin', 'Madrid', 'Rome', 'Vienna', 'Prague', 'Warsaw']
+
+
+class TrackingCollector(WeatherAPIDataCollector):
+    """Считает одновременные запросы; для failing городов провайдер отвечает ошибкой"""
+
+    failing = ('Paris', 'Rome')
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._counter_lock = threading.Lock()
+
+    def make_request(self, endpoint, params=None):
+        with self._counter_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Ответы приходят в обратном порядке: первые города - последними
+            time.sleep(0.01 * (len(CITIES) - CITIES.index(params['q'])))
+            if params['q'] in self.failing:
+                return {}
+            return super().make_request(endpoint, params)
+        finally:
+            with self._counter_lock:
+                self.in_flight -= 1
+
+
+def test_results_keep_input_order_without_failures(stub_api):
+    collector = TrackingCollector()
+
+    async def collect():
+        async with AsyncWeatherAPIDataCollector(collector, max_concurrency=3) as async_collector:
+            return await async_collector.collect_multiple_cities(CITIES), async_collector
+
+    records, async_collector = asyncio.run(collect())
+    assert [record.city for record in records] == [c for c in CITIES if c not in collector.failing]
+    assert collector.max_in_flight == 3
+    assert async_collector._executor._shutdown
+
+
+def test_stream_reports_received_count(stub_api):
+    seen = []
+
+    async def collect():
+        async with AsyncWeatherAPIDataCollector(TrackingCollector(), max_concurrency=8) as async_collector:
+            return await async_collector.stream_multiple_cities(CITIES, seen.append)
+
+    assert asyncio.run(collect()) == len(CITIES) - 2
+    assert sorted(record.city for record in seen) == sorted(set(CITIES) - {'Paris', 'Rome'})
@@ -0,0 +1,90 @@
+from aggregates import AggregateStore
+from weatherapi_collector import WeatherAPIDataCollector
+
+CITIES = ['Moscow', 'Paris', 'Berlin', 'Madrid', 'Rome']
+
+
+class DroppingCollector(WeatherAPIDataCollector):
+    """Bulk-ответ без данных для части городов"""
+
+    drop = ('Paris', 'Rome')
+
+    def make_bulk_request(self, endpoint, locations, params=None):
+        items = super().make_bulk_request(endpoint, locations, params)
+        return [item for item in items if item.get('q') not in self.drop]
+
+
+def test_bulk_keeps_input_order(stub_api):
+    records = WeatherAPIDataCollector().get_current_weather_bulk(CITIES, batch_size=2)
+    assert [record.city for record in records] == CITIES
+    assert stub_api.stats()['bulk'] == 3
+    assert stub_api.stats().get('current.json', 0) == 0
+
+
+def test_missing_bulk_items_fall_back_to_single_requests(stub_api):
+    records = DroppingCollector().get_current_weather_bulk(CITIES)
+    assert [record.city for record in records] == CITIES
+    assert all(record.temperature_c is not None for record in records)
+    assert stub_api.stats()['bulk'] == 1
+    assert stub_api.stats()['current.json'] == 2
+
+
+def test_cold_cache_bulk_does_not_search_each_city(stub_api, monkeypatch):
+    monkeypatch.setenv('WEATHERAPI_RESOLVE', '1')
+    monkeypatch.setenv('WEATHERAPI_CACHE', '1')
+    collector = WeatherAPIDataCollector()
+
+    collector.get_current_weather_bulk(['Moscow', 'Paris'])
+    assert stub_api.stats().get('search.json', 0) == 0
+    assert collector.resolver.lookup('moscow') is not None
+
+    # Повторный вызов целиком из кэша по разрешенным локациям
+    records = collector.get_current_weather_bulk(['Moscow', 'Paris'])
+    assert [record.city for record in records] == ['Moscow', 'Paris']
+    assert stub_api.stats()['bulk'] == 1
+
+
+class BrokenStore:
+    def add_frame(self, df):
+        raise OSError('disk full')
+
+
+def test_collect_frame_reuses_bulk_fallback_and_survives_store_errors(stub_api):
+    collector = DroppingCollector()
+    collector.store = BrokenStore()
+    df = collector.collect_frame(CITIES, bulk=True)
+    assert df['city'].tolist() == CITIES
+    assert df['temperature_c'].notna().all()
+    assert stub_api.stats()['current.json'] == 2
+
+
+class FailingCollector(WeatherAPIDataCollector):
+    """Провайдер недоступен: каждый запрос заканчивается ошибкой"""
+
+    def _send(self, method, endpoint, params=None, json_body=None):
+        return {}
+
+
+def test_failed_cities_are_none():
+    collector = FailingCollector()
+    assert collector.get_current_weather('Moscow') is None
+    assert collector.get_current_weather_bulk(['Moscow', 'Paris']) == [None, None]
+    assert collector.get_weather_with_forecast('Moscow') == {'current': None, 'forecast': []}
+
+
+class NoCountryCollector(WeatherAPIDataCollector):
+    """Ответы без страны и региона: категориальные колонки пустые"""
+
+    def safe_request_with_delay(self, endpoint, params=None):
+        return {'location': {'name': params['q'], 'lat': 55.75, 'lon': 37.62},
+                'current': {'last_updated': '2024-05-01 10:00', 'temp_c': 10.0}}
+
+
+def test_collect_frame_feeds_aggregates_with_missing_categories():
+    collector = NoCountryCollector()
+    collector.store = None
+    collector.aggregates = AggregateStore(None)
+    df = collector.collect_frame(['Moscow', 'Kazan'])
+    assert df['country'].isna().all() and df['region'].isna().all()
+    assert collector.aggregates.summary('city', 'Kazan', '2024-05-01')['count'] == 1
+    assert collector.aggregates.buckets('city', 'Moscow') == ['2024-05-01']
@@ -0,0 +1,100 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import circuit_breaker
+from api_collector import APIDataCollector
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker
+from metrics import get_metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _breaker(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return CircuitBreaker('/current.json', **kwargs), clock
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = _breaker(monkeypatch, failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_half_open_lets_one_trial_through(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.retry_in() == 20
+    clock.now += 20
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+
+def test_failed_trial_reopens(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 30
+
+
+def test_timeout_follows_latency_percentile():
+    tracker = LatencyTracker(min_samples=20, multiplier=3.0, min_timeout=2.0, max_timeout=15.0)
+    assert tracker.timeout() == 15.0
+    for _ in range(20):
+        tracker.record(1.0)
+    assert tracker.timeout() == 3.0
+    tracker.record(100.0)
+    assert tracker.timeout() == 15.0
+
+
+class NotJSONHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'<html>maintenance</html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_malformed_body_is_one_failure(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), NotJSONHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('WEATHERAPI_BASE_URL', f"http://127.0.0.1:{server.server_address[1]}")
+    try:
+        assert APIDataCollector('weatherapi').make_request('/current.json', {'q': 'Moscow'}) == {}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    breaker = circuit_breaker.get_circuit_breaker('/current.json')
+    assert breaker.stats()['failures'] == 1
+    statuses = [row['status'] for row in get_metrics().snapshot()['counters']['weather_http_requests_total']]
+    assert statuses == ['200']
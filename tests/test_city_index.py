@@ -0,0 +1,59 @@
+import pytest
+
+from city_index import EXACT, FUZZY, PREFIX, SUBSTRING, CityIndex, build_config_index, fold
+
+
+@pytest.fixture
+def index():
+    return build_config_index()
+
+
+def test_fold_variants():
+    assert fold('Нижний Новгород') == fold('Nizhny Novgorod') == fold('nizhniy novgorod')
+    assert fold('Екатеринбург') == fold('Yekaterinburg')
+    # Повторы букв сжимаются, цифры - нет
+    assert fold('Tolyatti') == fold('Toliati')
+    assert fold('District 11') != fold('District 1')
+
+
+def test_exact_and_prefix_are_selected(index):
+    assert index.best_match('Москва') == 'Moscow'
+    assert index.best_match('moscow') == 'Moscow'
+    assert index.best_match('nizhniy novgorod') == 'Nizhny Novgorod'
+    assert index.best_match('Ekaterinb') == 'Yekaterinburg'
+
+
+@pytest.mark.parametrize('query, near_miss', [
+    ('Tomsk', 'Omsk'),
+    ('Minsk', 'Chelyabinsk'),
+    ('Samarkand', 'Samara'),
+    ('Bern', 'Berlin'),
+    ('Parma', 'Paris'),
+    ('Tulsa', 'Tula'),
+    ('Novgorod', 'Nizhny Novgorod'),
+])
+def test_near_misses_are_not_auto_selected(index, query, near_miss):
+    assert index.best_match(query) is None
+    ranks = dict(index.search_ranked(query))
+    # Похожее место может предлагаться, но только как вариант
+    if near_miss in ranks:
+        assert ranks[near_miss] > PREFIX
+
+
+def test_ranks_order():
+    index = CityIndex()
+    index.add('Samara', 'Самара')
+    index.add('Samarkand')
+    index.add('New Samarkand')
+    index.build()
+    ranked = index.search_ranked('samar')
+    assert [rank for _, rank in ranked] == sorted(rank for _, rank in ranked)
+    assert index.search_ranked('Samara')[0] == ('Samara', EXACT)
+    assert dict(index.search_ranked('markand'))['Samarkand'] == SUBSTRING
+    assert index.search_ranked('Samarknd') and index.search_ranked('Samarknd')[0][1] == FUZZY
+    assert index.best_match('samar') is None
+    assert index.best_match('Самара') == 'Samara'
+
+
+def test_search_names_match_ranked(index):
+    assert index.search('Sankt', limit=5) == [name for name, _ in index.search_ranked('Sankt', limit=5)]
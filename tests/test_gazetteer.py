@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from gazetteer import Gazetteer, _chord_to_km, _unit_vectors, build_gazetteer
+
+
+@pytest.fixture
+def gazetteer(write_geonames, tmp_path):
+    rng = np.random.default_rng(7)
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, 3000)))
+    lon = rng.uniform(-180, 180, 3000)
+    places = [(i + 1, f"Place {i}", '', round(float(a), 4), round(float(o), 4), 'RU', int(p))
+              for i, (a, o, p) in enumerate(zip(lat, lon, rng.integers(0, 10 ** 6, 3000)))]
+    return build_gazetteer(write_geonames(places), str(tmp_path / 'gazetteer'))
+
+
+def _brute_force(gazetteer, lat, lon):
+    target = _unit_vectors(np.array([lat]), np.array([lon]))[0]
+    chords = np.linalg.norm(np.asarray(gazetteer.coords) - target, axis=1)
+    return chords
+
+
+@pytest.mark.parametrize('lat, lon', [(55.75, 37.62), (-33.9, 151.2), (89.9, 0.0), (0.0, 179.99), (0.0, -179.99)])
+def test_nearest_matches_brute_force(gazetteer, lat, lon):
+    chords = _brute_force(gazetteer, lat, lon)
+    expected = [int(gazetteer.records[i]['geonameid']) for i in np.argsort(chords, kind='stable')[:5]]
+    found = gazetteer.nearest(lat, lon, k=5)
+    assert [place['geonameid'] for place in found] == expected
+    assert found[0]['distance_km'] == pytest.approx(float(_chord_to_km(chords.min())), abs=0.01)
+
+
+def test_nearest_with_min_population(gazetteer):
+    chords = _brute_force(gazetteer, 10.0, 10.0)
+    chords[np.asarray(gazetteer.records['population']) < 500_000] = np.inf
+    expected = int(gazetteer.records[int(np.argmin(chords))]['geonameid'])
+    assert gazetteer.nearest(10.0, 10.0, min_population=500_000)[0]['geonameid'] == expected
+
+
+@pytest.mark.parametrize('radius_km', [50, 500, 2000])
+def test_within_matches_brute_force(gazetteer, radius_km):
+    chords = _brute_force(gazetteer, 48.85, 2.35)
+    inside = np.nonzero(_chord_to_km(chords) <= radius_km - 0.01)[0]
+    found = {place['geonameid'] for place in gazetteer.within(48.85, 2.35, radius_km)}
+    assert {int(gazetteer.records[i]['geonameid']) for i in inside} <= found
+    assert all(place['distance_km'] <= radius_km + 0.01 for place in gazetteer.within(48.85, 2.35, radius_km))
+
+
+def test_reopened_gazetteer_and_find(gazetteer, tmp_path):
+    reopened = Gazetteer(str(tmp_path / 'gazetteer'))
+    assert len(reopened) == 3000
+    assert reopened.find('place 17')['geonameid'] == 18
+    assert reopened.find('Nowhere') is None
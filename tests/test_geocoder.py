@@ -0,0 +1,40 @@
+from geocoder import LocationResolver
+
+MOSCOW = {'id': 2145091, 'name': 'Moscow', 'region': 'Moscow City', 'country': 'Russia',
+          'lat': 55.75, 'lon': 37.62, 'url': 'moscow-moscow-city-russia'}
+
+
+class Search:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def __call__(self, query):
+        self.calls += 1
+        return self.answers.pop(0)
+
+
+def test_spellings_resolve_once(tmp_path):
+    resolver = LocationResolver(str(tmp_path / 'locations.sqlite'))
+    search = Search([MOSCOW])
+    assert resolver.resolve('Москва', search)['id'] == MOSCOW['id']
+    assert resolver.resolve(' moscow ', search)['id'] == MOSCOW['id']
+    assert search.calls == 1
+    # Соответствие переживает перезапуск
+    assert LocationResolver(str(tmp_path / 'locations.sqlite')).lookup('MOSCOW')['id'] == MOSCOW['id']
+
+
+def test_empty_answer_is_negative_cached():
+    resolver = LocationResolver(None)
+    search = Search([], [MOSCOW])
+    assert resolver.resolve('Nowhere', search) is None
+    assert resolver.resolve('Nowhere', search) is None
+    assert search.calls == 1
+
+
+def test_failed_search_is_not_negative_cached():
+    resolver = LocationResolver(None)
+    search = Search(None, [MOSCOW])
+    assert resolver.resolve('Moscow', search) is None
+    assert resolver.resolve('Moscow', search)['id'] == MOSCOW['id']
+    assert search.calls == 2
@@ -0,0 +1,8 @@
+from import_report import measure_import
+
+
+def test_first_city_lookup_stays_light():
+    row = measure_import('weather_cli')
+    assert row['ok'], row['error']
+    assert row['call_ms'] is not None
+    assert not {'numpy', 'pandas'}.intersection(row['heavy_after_call'])
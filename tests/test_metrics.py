@@ -0,0 +1,47 @@
+from metrics import MetricsRegistry, get_metrics
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    registry.record_request('current.json', 200, seconds=0.03, size=2048)
+    registry.record_request('current.json', 200, seconds=0.2, retry=True)
+    registry.record_request('current.json', 'Timeout')
+    text = registry.to_prometheus()
+
+    assert '# TYPE weather_http_requests_total counter' in text
+    assert 'weather_http_requests_total{endpoint="current.json",status="200"} 2' in text
+    assert 'weather_http_requests_total{endpoint="current.json",status="Timeout"} 1' in text
+    assert 'weather_http_response_bytes_total{endpoint="current.json"} 2048' in text
+    assert 'weather_http_request_duration_seconds_bucket{endpoint="current.json",le="0.05"} 1' in text
+    assert 'weather_http_request_duration_seconds_bucket{endpoint="current.json",le="+Inf"} 2' in text
+    assert 'weather_http_request_duration_seconds_count{endpoint="current.json"} 2' in text
+    assert text.endswith('\n')
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc('parser_page_loads_total', domain='a"b\\c\nd')
+    assert 'parser_page_loads_total{domain="a\\"b\\\\c\\nd"} 1' in registry.to_prometheus()
+
+
+def test_summary_and_export(tmp_path):
+    registry = MetricsRegistry()
+    registry.record_request('forecast.json', 200, seconds=0.02, size=100)
+    registry.record_request('forecast.json', 503, seconds=0.5, retry=True)
+    registry.inc('weather_cache_requests_total', endpoint='forecast.json', result='hit')
+
+    summary = registry.summary()['forecast.json']
+    assert (summary['requests'], summary['errors'], summary['retries']) == (2, 1, 1)
+    assert (summary['bytes'], summary['cache_hits']) == (100, 1)
+    assert summary['p50_s'] == 0.025 and summary['p99_s'] == 0.5
+
+    prom_path, json_path = registry.export(str(tmp_path), 'run')
+    assert open(prom_path, encoding='utf-8').read() == registry.to_prometheus()
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_collector_requests_are_counted(stub_api):
+    WeatherAPIDataCollector().get_current_weather('Moscow')
+    rows = get_metrics().snapshot()['counters']['weather_http_requests_total']
+    assert sum(row['value'] for row in rows if row['status'] == '200') == 1
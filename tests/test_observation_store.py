@@ -0,0 +1,46 @@
+import asyncio
+
+from async_collector import AsyncWeatherAPIDataCollector
+from observation_store import ObservationStore, get_observation_store
+from weather_record import WeatherRecord
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+def _record(city, updated, temperature):
+    return WeatherRecord(city=city, city_name=city, country='Россия',
+                         last_updated=updated, temperature_c=temperature)
+
+
+def test_same_location_and_time_is_stored_once(tmp_path):
+    store = ObservationStore(str(tmp_path / 'history.sqlite'))
+    assert store.add(_record('Москва', '2024-05-01 10:00', 10.0))
+    assert not store.add(_record('Москва', '2024-05-01 10:00', 11.0))
+    assert store.add_many([_record('Москва', '2024-05-01 10:00', 12.0),
+                           _record('Москва', '2024-05-01 10:15', 12.0),
+                           _record('Казань', '2024-05-01 10:00', 9.0)]) == 2
+    assert store.count() == 3
+    # Первое сохраненное значение не перезаписывается
+    assert store.history('Москва')[0].temperature_c == 10.0
+
+
+def test_demo_and_undated_records_are_skipped(tmp_path):
+    store = ObservationStore(str(tmp_path / 'history.sqlite'))
+    record = _record('Москва', '2024-05-01 10:00', 10.0)
+    record.demo_mode = True
+    assert store.add_many([record, _record('Казань', None, 9.0)]) == 0
+
+
+def test_all_collectors_share_one_store(stub_api, monkeypatch, tmp_path):
+    monkeypatch.setenv('WEATHERAPI_HISTORY_PATH', str(tmp_path / 'history.sqlite'))
+    collector = WeatherAPIDataCollector()
+    collector.get_current_weather('Moscow')
+    collector.get_current_weather_bulk(['Paris'])
+    collector.collect_frame(['Berlin'])
+
+    async def collect():
+        async with AsyncWeatherAPIDataCollector(WeatherAPIDataCollector()) as async_collector:
+            await async_collector.collect_multiple_cities(['Madrid', 'Moscow'])
+
+    asyncio.run(collect())
+    store = get_observation_store()
+    assert sorted(record.city for record in store.history()) == ['Berlin', 'Madrid', 'Moscow', 'Paris']
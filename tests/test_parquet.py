@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import pyarrow.dataset as ds
+
+from data_saver import DataSaver, parquet_schema
+from utils.data_saver import DataSaver as UtilsDataSaver
+from weather_record import WeatherRecord, to_frame
+
+
+def _record(city, **values):
+    return WeatherRecord(city=city, country='Россия', scraped_at='2024-05-01 10:00:00', **values)
+
+
+def test_schema_comes_from_record_fields():
+    schema = parquet_schema(to_frame([_record('Moscow')]))
+    assert str(schema.field('gust_kph').type) == 'double'
+    assert str(schema.field('humidity').type) == 'double'
+    assert str(schema.field('wind_dir').type) == 'string'
+
+
+def test_chunks_with_empty_columns_share_one_schema(tmp_path):
+    root = str(tmp_path / 'weather')
+    assert DataSaver.save_to_parquet([_record('Moscow', gust_kph=12.5, humidity=40)], root)
+    assert DataSaver.save_to_parquet([_record('Kazan')], root)
+
+    table = ds.dataset(root, format='parquet', partitioning='hive').to_table()
+    assert str(table.schema.field('gust_kph').type) == 'double'
+    assert sorted(table.column('city').to_pylist()) == ['Kazan', 'Moscow']
+
+
+def test_fractional_values_in_integer_fields(tmp_path):
+    root = str(tmp_path / 'weather')
+    assert DataSaver.save_to_parquet([_record('Moscow', humidity=40)], root)
+    assert DataSaver.save_to_parquet([_record('Kazan', humidity=55.5)], root)
+
+    table = ds.dataset(root, format='parquet', partitioning='hive').to_table()
+    assert sorted(table.column('humidity').to_pylist()) == [40.0, 55.5]
+
+
+def test_plain_dicts_use_the_same_partitioning(tmp_path):
+    root = str(tmp_path / 'posts')
+    rows = [{'name': 'Иван', 'age': 25, 'region': 'Москва'}]
+    assert UtilsDataSaver.save_to_parquet(rows, root)
+    assert list((tmp_path / 'posts').glob('collection_date=*/region=*/*.parquet'))
+    df = UtilsDataSaver.load_parquet(root)
+    assert df['name'].tolist() == ['Иван'] and df['age'].tolist() == [25]
+
+
+def test_utils_saver_runs_as_script(tmp_path):
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'utils', 'data_saver.py')
+    result = subprocess.run([sys.executable, script], cwd=tmp_path, capture_output=True,
+                            text=True, encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / 'test_data.json').exists()
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import poll_scheduler
+from poll_scheduler import SECONDS_PER_MONTH, PollScheduler
+from weather_record import WeatherRecord
+
+PROVIDER_CADENCE = 900
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _local(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+class ProviderCollector:
+    """Провайдер обновляет данные раз в 15 минут; температура меняется на rates[city] за обновление"""
+
+    def __init__(self, clock, rates):
+        self.clock = clock
+        self.rates = rates
+        self.calls = {city: 0 for city in rates}
+
+    def get_current_weather(self, city):
+        self.calls[city] += 1
+        updated = self.clock.now // PROVIDER_CADENCE * PROVIDER_CADENCE
+        return WeatherRecord(city=city, last_updated=_local(updated), local_time=_local(self.clock.now),
+                             temperature_c=updated / PROVIDER_CADENCE * self.rates[city])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_scheduler, 'time', clock)
+    return clock
+
+
+def _scheduler(clock, tmp_path, rates, quota):
+    collector = ProviderCollector(clock, rates)
+    scheduler = PollScheduler(collector, list(rates), db_path=str(tmp_path / 'scheduler.sqlite'),
+                              monthly_quota=quota)
+    return scheduler, collector
+
+
+def test_polls_stay_within_quota(clock, tmp_path):
+    # Квота - один запрос в 20 минут на все города
+    quota = SECONDS_PER_MONTH // 1200
+    scheduler, collector = _scheduler(clock, tmp_path, {'Moscow': 1.0, 'Kazan': 1.0}, quota)
+    started = clock.now
+    scheduler.run(max_polls=60, sleep=clock.sleep)
+
+    elapsed = clock.now - started
+    assert sum(collector.calls.values()) <= elapsed / 1200 + len(collector.calls)
+    for city in collector.calls:
+        assert scheduler.budget_interval(city) >= 1200
+
+
+def test_fast_changing_city_is_polled_more_often(clock, tmp_path):
+    quota = SECONDS_PER_MONTH // 600
+    scheduler, collector = _scheduler(clock, tmp_path, {'Fast': 2.0, 'Slow': 0.0}, quota)
+    scheduler.run(max_polls=200, sleep=clock.sleep)
+
+    assert scheduler.state['Fast']['change_rate'] > scheduler.state['Slow']['change_rate']
+    assert scheduler.budget_interval('Fast') < scheduler.budget_interval('Slow')
+    assert collector.calls['Fast'] > collector.calls['Slow']
+
+
+def test_unconstrained_poll_follows_provider_cadence(clock, tmp_path):
+    scheduler, collector = _scheduler(clock, tmp_path, {'Moscow': 1.0}, 10_000_000)
+    scheduler.run(max_polls=20, sleep=clock.sleep)
+    # Без лишних опросов между обновлениями: почти каждый опрос приносит новое наблюдение
+    state = scheduler.state['Moscow']
+    assert state['new_observations'] >= state['polls'] - 2
+    assert state['cadence'] == pytest.approx(PROVIDER_CADENCE, rel=0.1)
+
+
+def test_state_survives_restart(clock, tmp_path):
+    scheduler, _ = _scheduler(clock, tmp_path, {'Moscow': 1.0, 'Kazan': 0.5}, 100_000)
+    scheduler.run(max_polls=10, sleep=clock.sleep)
+    before = scheduler.stats()
+    scheduler.close()
+
+    restarted, _ = _scheduler(clock, tmp_path, {'Moscow': 1.0, 'Kazan': 0.5}, 100_000)
+    assert restarted.stats() == before
+    restarted.close()
@@ -0,0 +1,23 @@
+import json
+
+from profiler import start_profiling, stop_profiling
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+def test_demo_run_has_fetch_and_parse_stages(monkeypatch, tmp_path):
+    monkeypatch.setenv('WEATHERAPI_API_KEY', '')
+    collector = WeatherAPIDataCollector()
+    assert collector.demo_mode
+
+    start_profiling('test', str(tmp_path / 'profile.json'))
+    try:
+        collector.get_current_weather('Moscow')
+        collector.get_current_weather_bulk(['Paris', 'Berlin'])
+    finally:
+        path = stop_profiling()
+
+    with open(path, encoding='utf-8') as f:
+        stages = {row['stage']: row for row in json.load(f)['stages']}
+    assert stages['fetch']['count'] == 2
+    assert stages['parse']['count'] == 3
+    assert not any(name.startswith('fetch/fetch') for name in stages)
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateController, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def test_additive_increase_up_to_max_rate(clock):
+    controller = RateController(rate=1.0, max_rate=1.25, increase_step=0.1)
+    controller.update_from_response(200)
+    assert controller.current_rate == pytest.approx(1.1)
+    for _ in range(5):
+        controller.update_from_response(200)
+    assert controller.current_rate == 1.25
+
+
+def test_multiplicative_decrease_down_to_min_rate(clock):
+    controller = RateController(rate=4.0, min_rate=0.5, decrease_factor=0.5)
+    controller.update_from_response(429)
+    assert controller.current_rate == 2.0
+    controller.update_from_response(503)
+    assert controller.current_rate == 1.0
+    for _ in range(5):
+        controller.update_from_response(429)
+    assert controller.current_rate == 0.5
+    # 4xx кроме 429 скорость не меняет
+    controller.update_from_response(404)
+    assert controller.current_rate == 0.5 and controller.throttled == 7
+
+
+def test_initial_rate_is_clamped(clock):
+    assert RateController(rate=100.0, max_rate=10.0).current_rate == 10.0
+    assert RateController(rate=0.01, min_rate=0.2).current_rate == 0.2
+
+
+def test_bucket_paces_requests_after_burst(clock):
+    controller = RateController(rate=2.0, burst=2)
+    assert controller.acquire() == 0.0 and controller.acquire() == 0.0
+    assert controller.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(1000.5)
+
+
+def test_retry_after_blocks_until_deadline(clock):
+    controller = RateController(rate=10.0, burst=5)
+    controller.update_from_response(429, {'Retry-After': '30'})
+    waited = controller.acquire()
+    assert waited >= 30 and clock.now >= 1030
+    assert controller.current_rate == 5.0
+
+
+def test_parse_retry_after_seconds_date_and_garbage():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('-5') == 0.0
+    future = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert parse_retry_after(format_datetime(future, usegmt=True)) == pytest.approx(120, abs=2)
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('') is None and parse_retry_after(None) is None
@@ -0,0 +1,70 @@
+import csv
+import json
+import os
+
+import pytest
+
+from data_saver import RecordStream
+from weather_record import WeatherRecord
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+def _read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_commit_renames_part_file(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    with RecordStream(path) as stream:
+        stream.write(WeatherRecord(city='Moscow', temperature_c=1.5))
+        assert os.path.exists(path + '.part') and not os.path.exists(path)
+    assert not os.path.exists(path + '.part')
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line)['city'] for line in f] == ['Moscow']
+
+
+def test_interrupted_stream_keeps_only_part_file(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    with pytest.raises(KeyboardInterrupt):
+        with RecordStream(path, flush_every=1) as stream:
+            stream.write(WeatherRecord(city='Moscow'))
+            stream.write(WeatherRecord(city='Paris'))
+            raise KeyboardInterrupt
+    assert not os.path.exists(path)
+    assert [row['city'] for row in _read_csv(path + '.part')] == ['Moscow', 'Paris']
+
+
+def test_csv_header_is_full_record_schema(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    with RecordStream(path) as stream:
+        stream.write(WeatherRecord(city='Moscow', temperature_c=2.0))
+        stream.write(WeatherRecord(city='Paris', temperature_c=3.0, demo_mode=True))
+    rows = _read_csv(path)
+    assert list(rows[0]) == list(WeatherRecord.field_names())
+    assert [row['demo_mode'] for row in rows] == ['', 'True']
+
+
+def test_unknown_dict_key_fails(tmp_path):
+    with pytest.raises(ValueError):
+        with RecordStream(str(tmp_path / 'out.csv')) as stream:
+            stream.write({'city': 'Moscow'})
+            stream.write({'city': 'Paris', 'extra': 1})
+
+
+def test_empty_stream_creates_no_file(tmp_path):
+    for name in ('out.csv', 'out.jsonl'):
+        path = str(tmp_path / name)
+        with RecordStream(path):
+            pass
+        assert not os.path.exists(path) and not os.path.exists(path + '.part')
+
+
+def test_stream_multiple_cities_does_not_keep_records(monkeypatch):
+    monkeypatch.setenv('WEATHERAPI_API_KEY', '')
+    collector = WeatherAPIDataCollector()
+    assert collector.demo_mode
+    seen = []
+    count = collector.stream_multiple_cities(['Moscow', 'Paris', 'Tokyo'], seen.append)
+    assert count == 3
+    assert [record.get('city') for record in seen] == ['Moscow', 'Paris', 'Tokyo']
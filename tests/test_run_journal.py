@@ -0,0 +1,74 @@
+import sys
+
+import pyarrow.dataset as ds
+
+import run_api_weatherapi
+from config import CITIES
+from run_journal import DONE, FAILED, RunJournal
+from weather_record import WeatherRecord
+
+CITIES_3 = ['Moscow', 'Paris', 'Berlin']
+
+
+def _record(city):
+    return WeatherRecord(city=city, country='Russia', scraped_at='2024-05-01 10:00:00',
+                         temperature_c=10.0)
+
+
+def test_interrupted_run_resumes_only_missing_cities(tmp_path):
+    path = str(tmp_path / 'journal.sqlite')
+    journal = RunJournal('run', path)
+    journal.start(CITIES_3)
+    journal.mark_done('Moscow', _record('Moscow'))
+    journal.close()
+
+    journal = RunJournal('run', path)
+    journal.start(CITIES_3)
+    assert journal.pending(CITIES_3) == ['Paris', 'Berlin']
+    assert [record.city for record in journal.records(['Moscow'])] == ['Moscow']
+    journal.close()
+
+
+def test_finished_run_is_not_reopened(tmp_path):
+    journal = RunJournal('run', str(tmp_path / 'journal.sqlite'))
+    journal.start(CITIES_3)
+    for city in CITIES_3[:2]:
+        journal.mark_done(city, _record(city))
+    journal.mark_failed(journal.pending(CITIES_3), 'нет данных')
+    assert journal.summary() == {DONE: 2, FAILED: 1}
+
+    # Повторная регистрация тех же городов статусы не сбрасывает
+    journal.start(CITIES_3)
+    assert journal.summary() == {DONE: 2, FAILED: 1}
+    assert journal.pending(CITIES_3) == ['Berlin']
+    # Устаревшие данные запрашиваются заново
+    assert journal.pending(CITIES_3, max_age=-1) == CITIES_3
+
+
+def _run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['run_api_weatherapi.py', *args])
+    run_api_weatherapi.main()
+
+
+def _parquet_cities():
+    table = ds.dataset('data/parquet/weather', format='parquet', partitioning='hive').to_table()
+    return sorted(table.column('city').to_pylist())
+
+
+def test_resumed_records_reach_parquet_once(stub_api, monkeypatch):
+    cities = CITIES[:3] + ['Orenburg']
+    journal = RunJournal('resume')
+    journal.start(cities)
+    # Прерванный запуск: два города получены, но не успели попасть в Parquet
+    for city in cities[:2]:
+        journal.mark_done(city, _record(city))
+    journal.close()
+
+    _run(monkeypatch, '3', '--run-id=resume', '--bulk')
+    assert _parquet_cities() == sorted(cities)
+    assert stub_api.stats()['bulk'] == 1
+
+    # Завершенный запуск: ничего не запрашивается и не дописывается повторно
+    _run(monkeypatch, '3', '--run-id=resume', '--bulk')
+    assert _parquet_cities() == sorted(cities)
+    assert stub_api.stats()['bulk'] == 1
@@ -0,0 +1,86 @@
+import time
+
+from sharded_collector import LEASE_MIN_TIMEOUT, ShardedCollector, rate_share
+from work_queue import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+
+def _queue(tmp_path, lease_timeout=60, max_attempts=3):
+    return WorkQueue(str(tmp_path / 'queue.sqlite'), 'test', lease_timeout, max_attempts)
+
+
+def test_lease_complete_and_fail(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    assert queue.enqueue(['a', 'b', 'c']) == 3
+    assert queue.enqueue(['a', 'd']) == 1
+
+    assert queue.lease('w1', 2) == ['a', 'b']
+    assert queue.lease('w2', 10) == ['c', 'd']
+    queue.complete('w1', ['a'])
+    queue.fail('w1', ['b'], 'нет данных')
+    assert queue.counts() == {DONE: 1, PENDING: 1, LEASED: 2}
+
+    assert queue.lease('w1', 10) == ['b']
+    queue.fail('w1', ['b'], 'нет данных')
+    assert queue.counts()[FAILED] == 1
+    queue.close()
+
+
+def test_expired_lease_is_reissued(tmp_path):
+    queue = _queue(tmp_path, lease_timeout=0.2)
+    queue.enqueue(['a', 'b'])
+    assert queue.lease('w1', 2) == ['a', 'b']
+    assert queue.lease('w2', 2) == []
+    time.sleep(0.3)
+    assert queue.lease('w2', 2) == ['a', 'b']
+    # Опоздавший воркер не может подтвердить чужую аренду
+    queue.complete('w1', ['a', 'b'])
+    assert queue.counts() == {LEASED: 2}
+    queue.close()
+
+
+def test_renew_keeps_lease(tmp_path):
+    queue = _queue(tmp_path, lease_timeout=0.3)
+    queue.enqueue(['a'])
+    assert queue.lease('w1') == ['a']
+    for _ in range(3):
+        time.sleep(0.15)
+        queue.renew('w1')
+    assert queue.lease('w2') == []
+    queue.complete('w1', ['a'])
+    assert queue.counts() == {DONE: 1}
+    queue.close()
+
+
+def test_rate_share_splits_rate_ceiling_and_burst(monkeypatch):
+    monkeypatch.setenv('WEATHERAPI_RATE_LIMIT', '8')
+    monkeypatch.setenv('WEATHERAPI_RATE_BURST', '10')
+    monkeypatch.setenv('WEATHERAPI_RATE_MAX', '40')
+    share = rate_share(4)
+    assert float(share['WEATHERAPI_RATE_LIMIT']) == 2
+    assert int(share['WEATHERAPI_RATE_BURST']) == 2
+    assert float(share['WEATHERAPI_RATE_MAX']) == 10
+
+
+def test_lease_timeout_scales_with_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv('WEATHERAPI_RATE_LIMIT', '1')
+    small = ShardedCollector(2, 'small', str(tmp_path / 'q.sqlite'), batch_size=5)
+    large = ShardedCollector(2, 'large', str(tmp_path / 'q.sqlite'), batch_size=200)
+    assert small.lease_timeout == LEASE_MIN_TIMEOUT
+    assert large.lease_timeout > 2 * 200 / 0.5
+    assert large.queue.lease_timeout == large.lease_timeout
+    small.close()
+    large.close()
+
+
+def test_sharded_run_collects_every_city_once(tmp_path, stub_api):
+    cities = ['Moscow', 'Paris', 'Tokyo', 'Berlin', 'Madrid', 'Rome', 'Oslo']
+    sharded = ShardedCollector(2, 'run', str(tmp_path / 'q.sqlite'),
+                               out_root=str(tmp_path / 'shards'), batch_size=3)
+    seen = []
+    try:
+        records = sharded.run(cities, seen.append)
+    finally:
+        sharded.close()
+    assert [record.get('city') for record in records] == cities
+    assert [record.get('city') for record in seen] == cities
+    assert stub_api.stats()['current.json'] == len(cities)
@@ -0,0 +1,38 @@
+import threading
+import time
+
+from shared import Shared, ThreadConnections
+
+
+def test_shared_factory_runs_once():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    shared = Shared()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared.get(factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and len({id(value) for value in results}) == 1
+    shared.reset()
+    assert shared.get(factory) is not results[0]
+
+
+def test_connection_per_thread(tmp_path):
+    connections = ThreadConnections(str(tmp_path / 'nested' / 'db.sqlite'), synchronous='NORMAL')
+    conn = connections.get()
+    assert connections.get() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
@@ -0,0 +1,35 @@
+from gazetteer import build_gazetteer
+from synthetic_weather import SyntheticWeather
+
+
+def test_empty_input_returns_empty():
+    generator = SyntheticWeather(1)
+    assert generator.records([]) == []
+    assert generator.payloads([]) == []
+    assert len(generator.for_cities([])['city']) == 0
+
+
+def test_known_cities_keep_their_country():
+    records = SyntheticWeather(1).records(['Paris', 'Москва', 'Sydney', 'New York'])
+    assert [record.country for record in records] == ['Франция', 'Россия', 'Австралия', 'США']
+    assert (records[0].latitude, records[0].longitude) == (48.86, 2.35)
+
+
+def test_unknown_names_are_hashed_deterministically():
+    first = SyntheticWeather(1).payloads(['Nowhere Town'])[0]['location']
+    second = SyntheticWeather(2).payloads([' NOWHERE TOWN '])[0]['location']
+    assert (first['country'], first['lat'], first['lon']) == (second['country'], second['lat'], second['lon'])
+
+
+def test_gazetteer_places_used_for_other_cities(monkeypatch, write_geonames, tmp_path):
+    dump = write_geonames([
+        (1, 'Tomsk', 'Томск', 56.4977, 84.9744, 'RU', 574000),
+        (2, 'Bern', 'Берн', 46.9481, 7.4474, 'CH', 121000),
+        (3, 'Bern', '', 35.1, -77.04, 'US', 30000),
+    ])
+    build_gazetteer(dump, str(tmp_path / 'gazetteer'))
+    monkeypatch.setenv('GAZETTEER_PATH', str(tmp_path / 'gazetteer'))
+
+    records = SyntheticWeather(1).records(['Tomsk', 'Томск', 'Bern'])
+    assert [record.country for record in records] == ['Россия', 'Россия', 'Швейцария']
+    assert (records[2].latitude, records[2].longitude) == (46.95, 7.45)
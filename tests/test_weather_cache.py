@@ -0,0 +1,77 @@
+import weather_cache
+from weather_cache import WeatherCache
+
+NOW = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _payload(updated_epoch, temp=1.0):
+    return {'location': {'name': 'Moscow'},
+            'current': {'last_updated_epoch': updated_epoch, 'temp_c': temp}}
+
+
+def _cache(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(weather_cache, 'time', clock)
+    return WeatherCache(**kwargs), clock
+
+
+def test_ttl_counts_from_last_updated(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=900, db_path=None)
+    cache.put('/current.json', {'q': 'Moscow'}, _payload(NOW - 800))
+
+    clock.now = NOW + 99
+    assert cache.get('/current.json', {'q': ' moscow '}) is not None
+    clock.now = NOW + 101
+    assert cache.get('/current.json', {'q': 'Moscow'}) is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_old_observation_still_lives_min_ttl(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=900, min_ttl=60, db_path=None)
+    cache.put('/current.json', {'q': 'Moscow'}, _payload(NOW - 5000))
+
+    clock.now = NOW + 59
+    assert cache.get('/current.json', {'q': 'Moscow'}) is not None
+    clock.now = NOW + 61
+    assert cache.get('/current.json', {'q': 'Moscow'}) is None
+
+
+def test_local_last_updated_uses_location_offset(monkeypatch):
+    cache, _ = _cache(monkeypatch, ttl=3600, db_path=None)
+    payload = {
+        'location': {'localtime': '2024-05-01 15:00', 'localtime_epoch': NOW},
+        'current': {'last_updated': '2024-05-01 14:45'},
+    }
+    # Обновлено за 15 минут до местного 'сейчас'
+    assert cache._expires_at(payload) == NOW - 900 + 3600
+
+
+def test_disk_level_is_shared_and_expired_rows_removed(monkeypatch, tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first, clock = _cache(monkeypatch, ttl=900, db_path=path)
+    first.put('/current.json', {'q': 'Moscow', 'key': 'secret'}, _payload(NOW))
+
+    second = WeatherCache(ttl=900, db_path=path)
+    assert second.get('/current.json', {'q': 'Moscow'})['current']['temp_c'] == 1.0
+    assert second.stats()['disk_hits'] == 1
+
+    clock.now = NOW + 901
+    third = WeatherCache(ttl=900, db_path=path)
+    assert third.get('/current.json', {'q': 'Moscow'}) is None
+    assert third._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+
+
+def test_memory_level_is_bounded_lru(monkeypatch):
+    cache, _ = _cache(monkeypatch, max_entries=2, db_path=None)
+    for city in ('Moscow', 'Paris', 'Berlin'):
+        cache.put('/current.json', {'q': city}, _payload(NOW))
+    assert cache.get('/current.json', {'q': 'Moscow'}) is None
+    assert cache.stats()['memory_entries'] == 2
@@ -0,0 +1,40 @@
+import builtins
+import sys
+
+import pytest
+
+from weather_cli import WeatherCLI
+
+
+@pytest.mark.parametrize('error', [EOFError, KeyboardInterrupt])
+def test_interrupted_session_restores_stdout(monkeypatch, error):
+    def interrupted(prompt=''):
+        raise error
+
+    monkeypatch.setattr(builtins, 'input', interrupted)
+    stdout = sys.stdout
+    cli = WeatherCLI()
+    with pytest.raises(error):
+        cli.run()
+
+    assert sys.stdout is stdout
+    assert cli._prefetcher._shutdown
+
+
+class DailyOnlyAggregates:
+    def latest_summary(self, scope, key, granularity='day'):
+        if granularity == 'day':
+            return '2024-05-01', {'count': 2, 'mean': 12.0, 'min': 10.0, 'max': 14.0, 'p50': 12.0}
+        return None, {'count': 0}
+
+
+def test_stats_skip_empty_periods(capsys):
+    cli = WeatherCLI()
+    cli.aggregates = DailyOnlyAggregates()
+    try:
+        cli.show_stats('Moscow')
+    finally:
+        cli._prefetcher.shutdown()
+
+    out = capsys.readouterr().out
+    assert 'Сутки 2024-05-01: 2 наблюдений' in out and 'Час' not in out
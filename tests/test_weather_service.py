@@ -0,0 +1,82 @@
+import threading
+import time
+
+from weather_record import ForecastDay, WeatherRecord
+from weather_service import WeatherService
+
+
+class FakeCollector:
+    max_forecast_days = 3
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_current_weather(self, city):
+        with self._lock:
+            self.calls.append(('current', city))
+        time.sleep(self.delay)
+        return WeatherRecord(city=city, temperature_c=float(len(self.calls)))
+
+    def get_weather_with_forecast(self, city, days):
+        with self._lock:
+            self.calls.append(('forecast', city, days))
+        return {'current': WeatherRecord(city=city),
+                'forecast': [ForecastDay(date=str(day)) for day in range(days)]}
+
+
+def test_forecast_days_clamped_to_collector_limit():
+    collector = FakeCollector()
+    service = WeatherService(collector)
+    first, _ = service.get('forecast', 'Moscow', 14)
+    second, state = service.get('forecast', 'Moscow', 3)
+    service.close()
+
+    assert collector.calls == [('forecast', 'Moscow', 3)]
+    assert state == 'fresh' and len(first['forecast']) == 3 and second is first
+
+
+def test_entries_are_bounded_lru():
+    service = WeatherService(FakeCollector(), max_entries=2)
+    service.get('current', 'Moscow')
+    service.get('current', 'Paris')
+    service.get('current', 'Moscow')
+    service.get('current', 'Berlin')
+    service.close()
+
+    assert list(service._entries) == [service.make_key('current', 'Moscow'),
+                                      service.make_key('current', 'Berlin')]
+
+
+def test_expired_entries_are_dropped():
+    service = WeatherService(FakeCollector(), ttl=0.01, stale_ttl=0.01)
+    service.get('current', 'Moscow')
+    time.sleep(0.05)
+    service.get('current', 'Paris')
+    assert list(service._entries) == [service.make_key('current', 'Paris')]
+    _, state = service.get('current', 'Moscow')
+    service.close()
+
+    assert state == 'miss'
+
+
+def test_stale_entry_schedules_one_refresh():
+    collector = FakeCollector(delay=0.2)
+    service = WeatherService(collector, ttl=0.01, stale_ttl=60)
+    service.get('current', 'Moscow')
+    time.sleep(0.05)
+
+    states = []
+    threads = [threading.Thread(target=lambda: states.append(service.get('current', 'Moscow')[1]))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(0.4)
+    service.close()
+
+    assert states == ['stale'] * 8
+    assert len(collector.calls) == 2
+    assert not service._refreshing
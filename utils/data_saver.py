@@ -1,21 +1,30 @@
 import pandas as pd
 import json
 import os
+import sys
 import csv
-from datetime import datetime
 from typing import List, Dict, Optional
 
+# Корень проекта первым в sys.path: при запуске файла как скрипта sys.path[0] -
+# папка utils, и "data_saver" указывал бы на этот же файл
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if sys.path[:1] != [ROOT]:
+    sys.path.insert(0, ROOT)
+
+from data_saver import write_parquet_dataset
+from weather_record import Record, to_dicts, to_frame
+
 
 class DataSaver:
     """Класс для сохранения данных в различные форматы"""
     
     @staticmethod
-    def save_to_csv(data: List[Dict], filename: str, encoding: str = 'utf-8-sig'):
+    def save_to_csv(data: List[Record], filename: str, encoding: str = 'utf-8-sig'):
         """
         Сохранение данных в CSV
         
         Args:
-            data: Список словарей с данными
+            data: Список записей (словари или WeatherRecord)
             filename: Путь к файлу
             encoding: Кодировка файла
         """
@@ -26,7 +35,7 @@ class DataSaver:
         try:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
-            df = pd.DataFrame(data)
+            df = to_frame(data)
             df.to_csv(filename, index=False, encoding=encoding)
             
             print(f"✅ Данные сохранены: {filename}")
@@ -42,11 +51,11 @@ class DataSaver:
             return False
     
     @staticmethod
-    def save_to_json(data: List[Dict], filename: str):
+    def save_to_json(data: List[Record], filename: str):
         """Сохранение данных в JSON"""
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                json.dump(to_dicts(data), f, ensure_ascii=False, indent=2)
             
             print(f"✅ JSON сохранен: {filename}")
             return True
@@ -56,13 +65,13 @@ class DataSaver:
             return False
     
     @staticmethod
-    def print_data_summary(data: List[Dict], name: str = "данных"):
+    def print_data_summary(data: List[Record], name: str = "данных"):
         """Печать сводки по данным"""
         if not data:
             print(f"⚠️ Нет {name} для анализа")
             return
         
-        df = pd.DataFrame(data)
+        df = to_frame(data)
         
         print(f"\n📊 СВОДКА ПО {name.upper()}:")
         print("-" * 50)
@@ -83,16 +92,67 @@ class DataSaver:
             print("   Нет числовых колонок")
     
     @staticmethod
-    def save_to_excel(data: List[Dict], filename: str, sheet_name: str = "Data"):
+    def save_to_excel(data: List[Record], filename: str, sheet_name: str = "Data"):
         """Сохранение данных в Excel"""
         try:
-            df = pd.DataFrame(data)
+            df = to_frame(data)
             df.to_excel(filename, index=False, sheet_name=sheet_name)
             print(f"✅ Excel сохранен: {filename}")
             return True
         except Exception as e:
             print(f"❌ Ошибка при сохранении Excel: {e}")
             return False
+    
+    @staticmethod
+    def save_to_parquet(data: List[Record], root_dir: str,
+                        partition_cols: Optional[List[str]] = None,
+                        compression: str = 'zstd'):
+        """
+        Сохранение данных в партиционированный Parquet датасет
+        
+        Новые данные дописываются отдельными файлами в партиции
+        collection_date=<дата> (и country/region, если такие колонки есть),
+        ранее записанные файлы не переписываются.
+        
+        Args:
+            data: Список записей (словари или WeatherRecord)
+            root_dir: Корневая папка датасета
+            partition_cols: Колонки партиционирования
+            compression: Кодек сжатия (zstd, snappy, gzip)
+        """
+        if not data:
+            print("❌ Нет данных для сохранения")
+            return False
+        
+        try:
+            df = to_frame(data)
+            partition_cols = write_parquet_dataset(df, root_dir, partition_cols, compression)
+            
+            print(f"✅ Parquet сохранен: {root_dir}")
+            print(f"   Записей: {len(df)} | Партиции: {', '.join(partition_cols)}")
+            return True
+            
+        except ImportError:
+            print("❌ Для Parquet нужен pyarrow: pip install pyarrow")
+            return False
+        except Exception as e:
+            print(f"❌ Ошибка при сохранении Parquet: {e}")
+            return False
+    
+    @staticmethod
+    def load_parquet(root_dir: str, columns: Optional[List[str]] = None,
+                     filters: Optional[List] = None) -> pd.DataFrame:
+        """
+        Чтение Parquet датасета с выбором колонок и фильтром по партициям
+        
+        Args:
+            root_dir: Корневая папка датасета
+            columns: Читать только эти колонки
+            filters: Фильтры pyarrow, например [('collection_date', '>=', '2024-01-01')]
+        """
+        return pd.read_parquet(root_dir, engine='pyarrow', columns=columns, filters=filters)
+
+
 if __name__ == "__main__":
     test_data = [
         {"name": "Иван", "age": 25, "city": "Москва"},
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from shared import Shared, ThreadConnections
+
+
+class WeatherCache:
+    """
+    Двухуровневый TTL-кэш ответов API
+
+    Первый уровень - ограниченный LRU в памяти процесса, второй - SQLite
+    файл, общий для всех процессов. Срок жизни записи отсчитывается от
+    current.last_updated из ответа, а не от момента запроса.
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 1024,
+                 db_path: Optional[str] = 'data/cache/weather_cache.sqlite',
+                 min_ttl: float = 60):
+        """
+        Инициализация кэша
+
+        Args:
+            ttl: Время жизни данных после last_updated (секунды)
+            max_entries: Размер LRU в памяти
+            db_path: Путь к SQLite файлу (None - только память)
+            min_ttl: Минимальное время жизни свежесохраненной записи
+        """
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.max_entries = max(1, max_entries)
+        self.db_path = db_path
+
+        self._memory: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = ThreadConnections(db_path, synchronous='NORMAL') if db_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение SQLite текущего потока"""
+        return self._connections.get()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Нормализация строки запроса города"""
+        return ' '.join(str(query).lower().split())
+
+    @classmethod
+    def make_key(cls, endpoint: str, params: Optional[Dict] = None) -> str:
+        """
+        Ключ кэша по endpoint и параметрам запроса
+
+        API ключ в ключ кэша не входит, q нормализуется.
+        """
+        params = dict(params or {})
+        params.pop('key', None)
+        if 'q' in params:
+            params['q'] = cls.normalize_query(params['q'])
+        encoded = '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{endpoint}?{encoded}"
+
+    def _expires_at(self, payload: Dict) -> float:
+        """Момент устаревания: last_updated + ttl, но не раньше now + min_ttl"""
+        now = time.time()
+        current = payload.get('current', {}) if isinstance(payload, dict) else {}
+        updated = current.get('last_updated_epoch')
+        if updated is None and current.get('last_updated'):
+            updated = self._local_time_to_epoch(current['last_updated'], payload.get('location', {}))
+        if updated is None:
+            return now + self.ttl
+        return max(float(updated) + self.ttl, now + self.min_ttl)
+
+    @staticmethod
+    def _local_time_to_epoch(value: str, location: Dict) -> Optional[float]:
+        """Перевод локального времени города в epoch по смещению localtime"""
+        try:
+            updated = datetime.strptime(value, '%Y-%m-%d %H:%M')
+            local_now = datetime.strptime(location['localtime'], '%Y-%m-%d %H:%M')
+            offset = float(location['localtime_epoch']) - local_now.timestamp()
+            return updated.timestamp() + offset
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Получить ответ из кэша
+
+        Returns:
+            Сохраненный ответ API или None, если записи нет или она устарела
+        """
+        key = self.make_key(endpoint, params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self.db_path:
+            row = self._connection().execute(
+                "SELECT payload, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                if row[1] > now:
+                    payload = json.loads(row[0])
+                    self._remember(key, row[1], payload)
+                    with self._lock:
+                        self.disk_hits += 1
+                    return payload
+                self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, endpoint: str, params: Optional[Dict], payload: Dict,
+            expires_at: Optional[float] = None):
+        """Сохранить ответ API в оба уровня кэша"""
+        if not payload:
+            return
+        key = self.make_key(endpoint, params)
+        expires_at = expires_at or self._expires_at(payload)
+        self._remember(key, expires_at, payload)
+        if self.db_path:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, payload, expires_at, stored_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), expires_at, time.time())
+            )
+
+    def _remember(self, key: str, expires_at: float, payload: Dict):
+        with self._lock:
+            self._memory[key] = (expires_at, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Удалить устаревшие записи, возвращает число удаленных из SQLite"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (exp, _) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+        if not self.db_path:
+            return 0
+        cursor = self._connection().execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        return cursor.rowcount
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            self._connection().execute("DELETE FROM cache")
+
+    def stats(self) -> Dict:
+        """Статистика попаданий в кэш"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 3) if total else 0.0,
+                'memory_entries': len(self._memory)
+            }
+
+
+_shared_cache: Shared[WeatherCache] = Shared()
+
+
+def get_weather_cache() -> Optional[WeatherCache]:
+    """
+    Общий для процесса кэш ответов
+
+    Параметры берутся из переменных окружения WEATHERAPI_CACHE_TTL,
+    WEATHERAPI_CACHE_SIZE и WEATHERAPI_CACHE_PATH (пустое значение отключает
+    SQLite уровень). WEATHERAPI_CACHE=0 отключает кэш полностью.
+    """
+    if os.getenv('WEATHERAPI_CACHE', '1') == '0':
+        return None
+    return _shared_cache.get(lambda: WeatherCache(
+        ttl=float(os.getenv('WEATHERAPI_CACHE_TTL', '900')),
+        max_entries=int(os.getenv('WEATHERAPI_CACHE_SIZE', '1024')),
+        db_path=os.getenv('WEATHERAPI_CACHE_PATH', 'data/cache/weather_cache.sqlite') or None
+    ))
@@ -1,92 +1,251 @@
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from weatherapi_collector import WeatherAPIDataCollector
-from config import find_city, CITIES
+from config import CITIES
 import json
-import pandas as pd
+from weather_record import to_dicts, to_frame
+from aggregates import get_aggregate_store
+from city_index import SUBSTRING, get_city_index
+from profiler import profile_from_argv
+
+try:
+    import readline
+except ImportError:  # Windows без pyreadline
+    readline = None
+
+class _QuietThreadsStdout:
+    """Обертка stdout, скрывающая вывод фоновых потоков предзагрузки"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        if getattr(self.local, 'quiet', False):
+            return len(text)
+        return self.stream.write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
 
 class WeatherCLI:
     """Интерактивная командная строка для поиска погоды"""
     
+    # Данные сессии моложе этого (секунды) показываются без запроса
+    session_ttl = 300
+    recent_path = 'data/cache/cli_recent.json'
+    recent_size = 10
+    
     def __init__(self):
         load_dotenv()
         self.collector = WeatherAPIDataCollector()
+        self.aggregates = get_aggregate_store()
+        self.city_index = get_city_index()
+        self._completions = []
+        self._session = {}
+        self._forecasts = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cli-prefetch')
+        self._stdout = None
+        self.last_record = None
+        self.recent = self._load_recent()
+    
+    def _load_recent(self):
+        """Города из прошлых сессий"""
+        try:
+            with open(self.recent_path, 'r', encoding='utf-8') as f:
+                return json.load(f)[:self.recent_size]
+        except (OSError, ValueError):
+            return []
+    
+    def _remember(self, city):
+        """Запомнить город в списке недавних запросов"""
+        self.recent = [city] + [c for c in self.recent if c.lower() != city.lower()]
+        self.recent = self.recent[:self.recent_size]
+        try:
+            os.makedirs(os.path.dirname(self.recent_path), exist_ok=True)
+            with open(self.recent_path, 'w', encoding='utf-8') as f:
+                json.dump(self.recent, f, ensure_ascii=False)
+        except OSError:
+            pass
+    
+    def _fresh(self, cache, city):
+        entry = cache.get(city.strip().lower())
+        if entry and time.time() - entry[0] < self.session_ttl:
+            return entry[1]
+        return None
+    
+    def _fetch_current(self, city, quiet=False):
+        """Запрос текущей погоды с записью в кэш сессии"""
+        if quiet and self._stdout is not None:
+            self._stdout.local.quiet = True
+        try:
+            weather = self.collector.get_current_weather(city)
+        finally:
+            if quiet and self._stdout is not None:
+                self._stdout.local.quiet = False
+        if weather:
+            with self._lock:
+                self._session[city.strip().lower()] = (time.time(), weather)
+        return weather
+    
+    def prefetch(self, cities):
+        """Загрузить погоду для городов в фоне"""
+        for city in cities:
+            key = city.strip().lower()
+            with self._lock:
+                if self._fresh(self._session, city) or key in self._pending:
+                    continue
+                future = self._prefetcher.submit(self._fetch_current, city, True)
+                self._pending[key] = future
+            future.add_done_callback(lambda _, key=key: self._pending.pop(key, None))
+    
+    def current_weather(self, city):
+        """
+        Текущая погода: из кэша сессии, из фоновой загрузки или запросом
+        """
+        weather = self._fresh(self._session, city)
+        if weather:
+            return weather
+        future = self._pending.get(city.strip().lower())
+        if future is not None:
+            try:
+                weather = future.result()
+            except Exception:
+                weather = None
+            if weather:
+                return weather
+        return self._fetch_current(city)
         
+    def complete(self, text, state):
+        """Автодополнение названий городов для readline"""
+        if state == 0:
+            line = readline.get_line_buffer()
+            command, _, prefix = line.partition(' ')
+            if command in ('search', 'forecast', 'save', 'stats') and prefix.strip():
+                # readline заменяет только последнее слово, остальное берем из названия
+                head = prefix[:len(prefix) - len(text)]
+                self._completions = [name[len(head):] for name in
+                                     self.city_index.search(prefix, limit=20)
+                                     if name.lower().startswith(head.lower())]
+            else:
+                self._completions = []
+        return self._completions[state] if state < len(self._completions) else None
+    
     def run(self):
         """Запуск интерактивного режима"""
         
+        if readline is not None:
+            readline.set_completer_delims(' ')
+            readline.set_completer(self.complete)
+            readline.parse_and_bind('tab: complete')
+        
+        self._stdout = _QuietThreadsStdout(sys.stdout)
+        sys.stdout = self._stdout
+        self.prefetch(self.recent)
+        
         print("\n" + "="*60)
         print("🌤️  WEATHER DATA COLLECTOR - ИНТЕРАКТИВНЫЙ РЕЖИМ")
         print("="*60)
         
-        while True:
-            print("\nДоступные команды:")
-            print("  1. search <город>   - Найти погоду для города")
-            print("  2. list             - Показать все города")
-            print("  3. forecast <город> - Прогноз на 3 дня")
-            print("  4. save <город>     - Сохранить данные")
-            print("  5. exit             - Выход")
-            print("  6. help             - Помощь")
-            
-            command = input("\n👉 Введите команду: ").strip().lower()
-            
-            if command.startswith('search '):
-                city = command[7:].strip()
-                if city:
-                    self.search_weather(city)
-                else:
-                    print("❌ Укажите название города")
+        try:
+            while True:
+                print("\nДоступные команды:")
+                print("  1. search <город>   - Найти погоду для города")
+                print("  2. list             - Показать все города")
+                print("  3. forecast <город> - Прогноз на 3 дня")
+                print("  4. save <город>     - Сохранить данные")
+                print("  5. stats <город>    - Статистика за сутки и час")
+                print("  6. exit             - Выход")
+                print("  7. help             - Помощь")
             
-            elif command == 'list':
-                self.list_cities()
+                command = input("\n👉 Введите команду: ").strip().lower()
             
-            elif command.startswith('forecast '):
-                city = command[9:].strip()
-                if city:
-                    self.get_forecast(city)
-                else:
-                    print("❌ Укажите название города")
+                if command.startswith('search '):
+                    city = command[7:].strip()
+                    if city:
+                        self.search_weather(city)
+                    else:
+                        print("❌ Укажите название города")
             
-            elif command.startswith('save '):
-                city = command[5:].strip()
-                if city:
-                    self.save_weather(city)
-                else:
-                    print("❌ Укажите название города")
+                elif command == 'list':
+                    self.list_cities()
             
-            elif command == 'exit':
-                print("👋 До свидания!")
-                break
+                elif command.startswith('forecast '):
+                    city = command[9:].strip()
+                    if city:
+                        self.get_forecast(city)
+                    else:
+                        print("❌ Укажите название города")
             
-            elif command == 'help':
-                self.show_help()
+                elif command.startswith('save '):
+                    city = command[5:].strip()
+                    if city:
+                        self.save_weather(city)
+                    else:
+                        print("❌ Укажите название города")
             
-            else:
-                print("❌ Неизвестная команда. Введите 'help' для помощи.")
+                elif command.startswith('stats '):
+                    city = command[6:].strip()
+                    if city:
+                        self.show_stats(city)
+                    else:
+                        print("❌ Укажите название города")
+            
+                elif command == 'exit':
+                    print("👋 До свидания!")
+                    break
+            
+                elif command == 'help':
+                    self.show_help()
+            
+                else:
+                    print("❌ Неизвестная команда. Введите 'help' для помощи.")
+        finally:
+            # Ctrl-C и конец ввода тоже возвращают stdout и останавливают предзагрузку
+            self._prefetcher.shutdown(wait=False, cancel_futures=True)
+            sys.stdout = self._stdout.stream
     
     def search_weather(self, city):
         """Поиск погоды для города"""
         print(f"\n🔍 Поиск погоды для: {city}")
         
-        found_cities = find_city(city)
-        if found_cities:
-            if len(found_cities) == 1:
-                city = found_cities[0]
-            else:
-                print(f"\nНайдено несколько городов:")
-                for i, c in enumerate(found_cities, 1):
-                    print(f"  {i}. {c}")
+        matches = self.city_index.search_ranked(city, limit=10)
+        best = self.city_index.best_match(city)
+        if best:
+            city = best
+        elif matches:
+            found_cities = [name for name, _ in matches]
+            # Подстрока и опечатки - только подсказки: 'Tomsk' не должен молча стать 'Omsk'
+            guessed = matches[0][1] >= SUBSTRING
+            print("\nВозможно, вы имели в виду:" if guessed else "\nНайдено несколько городов:")
+            for i, c in enumerate(found_cities, 1):
+                print(f"  {i}. {c}")
+            if guessed:
+                print(f"  0. Искать '{city}' как введено")
+            # Пока пользователь выбирает, загружаем первые варианты
+            self.prefetch(found_cities[:5])
+            answer = input("\nВыберите номер: ").strip()
+            if not (guessed and answer in ('', '0')):
                 try:
-                    choice = int(input("\nВыберите номер: "))
+                    choice = int(answer)
+                    if choice < 1:
+                        raise IndexError(choice)
                     city = found_cities[choice - 1]
-                except:
+                except (ValueError, IndexError):
                     print("❌ Неверный выбор")
                     return
         
-        weather = self.collector.get_current_weather(city)
+        weather = self.current_weather(city)
         
         if weather:
+            self.last_record = weather
+            self._remember(city)
             self.display_weather(weather)
         else:
             print(f"❌ Не удалось найти погоду для '{city}'")
@@ -138,7 +297,20 @@ class WeatherCLI:
         """Получить прогноз погоды"""
         print(f"\n📅 Прогноз погды для: {city}")
         
-        forecast = self.collector.get_forecast(city, days=3)
+        result = self._fresh(self._forecasts, city)
+        if result is None:
+            result = self.collector.get_weather_with_forecast(city, days=3)
+            if result['current']:
+                with self._lock:
+                    now = time.time()
+                    self._forecasts[city.strip().lower()] = (now, result)
+                    self._session[city.strip().lower()] = (now, result['current'])
+        forecast = result['forecast']
+        
+        if result['current']:
+            self.last_record = result['current']
+            self._remember(city)
+            self.display_weather(result['current'])
         
         if forecast:
             for day in forecast:
@@ -152,8 +324,14 @@ class WeatherCLI:
             print(f"❌ Не удалось получить прогноз для '{city}'")
     
     def save_weather(self, city):
-        """Сохранить данные о погоде"""
-        weather = self.collector.get_current_weather(city)
+        """Сохранить данные о погоде (последняя показанная запись не запрашивается заново)"""
+        weather = None
+        if self.last_record and city.strip().lower() in (
+                str(self.last_record.get('city', '')).lower(),
+                str(self.last_record.get('city_name', '')).lower()):
+            weather = self.last_record
+        if not weather:
+            weather = self.current_weather(city)
         
         if weather:
             os.makedirs('data/saved', exist_ok=True)
@@ -162,16 +340,38 @@ class WeatherCLI:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"data/saved/{city.lower().replace(' ', '_')}_{timestamp}"
             
-            df = pd.DataFrame([weather])
+            df = to_frame([weather])
             df.to_csv(f"{filename}.csv", index=False, encoding='utf-8-sig')
             
             with open(f"{filename}.json", 'w', encoding='utf-8') as f:
-                json.dump(weather, f, ensure_ascii=False, indent=2)
+                json.dump(to_dicts([weather])[0], f, ensure_ascii=False, indent=2)
             
             print(f"✅ Данные сохранены в {filename}.csv и {filename}.json")
         else:
             print(f"❌ Не удалось получить данные для '{city}'")
     
+    def show_stats(self, city):
+        """Показать готовые сводки по накопленным наблюдениям"""
+        if self.aggregates is None:
+            print("❌ Сводки отключены (WEATHERAPI_AGGREGATES_PATH)")
+            return
+        
+        name = self.city_index.best_match(city) or city
+        
+        day, daily = self.aggregates.latest_summary('city', name, granularity='day')
+        if day is None:
+            print(f"❌ Нет накопленных наблюдений для '{name}'")
+            return
+        hour, hourly = self.aggregates.latest_summary('city', name, granularity='hour')
+        
+        print(f"\n📈 Статистика температуры: {name}")
+        for title, period, summary in (('Сутки', day, daily), ('Час', f"{hour}:00", hourly)):
+            if not summary.get('count'):
+                continue
+            print(f"   {title} {period}: {summary['count']} наблюдений, "
+                  f"среднее {summary['mean']}°C, мин {summary['min']}°C, "
+                  f"макс {summary['max']}°C, медиана {summary['p50']}°C")
+    
     def show_help(self):
         """Показать справку"""
         print("\n📖 СПРАВКА ПО КОМАНДАМ:")
@@ -179,6 +379,7 @@ class WeatherCLI:
         print("  list             - Показать список всех доступных городов")
         print("  forecast <город> - Показать прогноз на 3 дня для города")
         print("  save <город>     - Сохранить данные о погоде в файл")
+        print("  stats <город>    - Статистика по накопленным наблюдениям")
         print("  exit             - Выйти из программы")
         print("  help             - Показать эту справку")
         
@@ -194,4 +395,5 @@ def main():
     cli.run()
 
 if __name__ == "__main__":
+    profile_from_argv('weather_cli')
     main()
\ No newline at end of file
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+from profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class _RecordMixin:
+    """Общие методы компактных записей: доступ как к словарю и конвертация"""
+
+    __slots__ = ()
+
+    @classmethod
+    def field_names(cls) -> tuple:
+        names = cls.__dict__.get('_field_names')
+        if names is None:
+            names = tuple(f.name for f in fields(cls))
+            setattr(cls, '_field_names', names)
+        return names
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Доступ к полю как у словаря (для совместимости со старым кодом)"""
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.field_names()
+
+    def keys(self) -> tuple:
+        return self.field_names()
+
+    def to_dict(self) -> Dict:
+        """Преобразование в обычный словарь"""
+        return {name: getattr(self, name) for name in self.field_names()}
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        """Создание записи из словаря; лишние ключи игнорируются"""
+        return cls(**{name: data[name] for name in cls.field_names() if name in data})
+
+    @classmethod
+    def to_frame(cls, records: Iterable) -> 'pd.DataFrame':
+        """Построение DataFrame из списка записей без промежуточных словарей"""
+        import pandas as pd
+
+        names = cls.field_names()
+        getter = attrgetter(*names)
+        return pd.DataFrame.from_records([getter(r) for r in records], columns=list(names))
+
+    @classmethod
+    def from_frame(cls, df: 'pd.DataFrame') -> List:
+        """Восстановление записей из DataFrame"""
+        names = [name for name in cls.field_names() if name in df.columns]
+        subset = df[names].astype(object).where(df[names].notna(), None)
+        return [cls(**dict(zip(names, row))) for row in subset.itertuples(index=False, name=None)]
+
+
+@dataclass(slots=True)
+class WeatherRecord(_RecordMixin):
+    """Одно наблюдение текущей погоды (схема _parse_weather_data)"""
+
+    city: str
+    city_name: str = ''
+    country: str = ''
+    region: str = ''
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    local_time: str = ''
+
+    temperature_c: Optional[float] = None
+    feelslike_c: Optional[float] = None
+    temperature_f: Optional[float] = None
+    feelslike_f: Optional[float] = None
+
+    humidity: Optional[int] = None
+    pressure_mb: Optional[float] = None
+    pressure_in: Optional[float] = None
+
+    wind_kph: Optional[float] = None
+    wind_mph: Optional[float] = None
+    wind_dir: str = ''
+    wind_degree: Optional[int] = None
+    gust_kph: Optional[float] = None
+    gust_mph: Optional[float] = None
+
+    cloud: Optional[int] = None
+    visibility_km: Optional[float] = None
+    visibility_miles: Optional[float] = None
+
+    condition_text: str = ''
+    condition_icon: str = ''
+    condition_code: Optional[int] = None
+
+    uv_index: Optional[float] = None
+
+    last_updated: str = ''
+    scraped_at: str = ''
+    demo_mode: bool = False
+
+    def to_dict(self) -> Dict:
+        """Преобразование в словарь; флаг demo_mode попадает только у тестовых данных"""
+        data = _RecordMixin.to_dict(self)
+        if not self.demo_mode:
+            del data['demo_mode']
+        return data
+
+
+@dataclass(slots=True)
+class ForecastDay(_RecordMixin):
+    """Один день прогноза погоды"""
+
+    date: str
+    max_temp_c: Optional[float] = None
+    min_temp_c: Optional[float] = None
+    avg_temp_c: Optional[float] = None
+    max_wind_kph: Optional[float] = None
+    total_precip_mm: Optional[float] = None
+    avg_humidity: Optional[float] = None
+    condition: str = ''
+    uv_index: Optional[float] = None
+    sunrise: str = ''
+    sunset: str = ''
+
+
+Record = Union[Dict, WeatherRecord, ForecastDay]
+
+
+def to_dicts(data: Iterable[Record]) -> List[Dict]:
+    """Приведение списка записей (словарей или dataclass-записей) к словарям"""
+    return [item.to_dict() if isinstance(item, _RecordMixin) else item for item in data]
+
+
+@profiled('dataframe')
+def to_frame(data: List[Record]) -> 'pd.DataFrame':
+    """
+    DataFrame из списка записей
+
+    Однородный список WeatherRecord/ForecastDay строится по колонкам без
+    промежуточных словарей, смешанный список - через словари.
+    """
+    if data:
+        record_type = type(data[0])
+        if issubclass(record_type, _RecordMixin) and all(type(item) is record_type for item in data):
+            df = record_type.to_frame(data)
+            if record_type is WeatherRecord and not df['demo_mode'].any():
+                df = df.drop(columns='demo_mode')
+            return df
+    import pandas as pd
+    return pd.DataFrame(to_dicts(data))
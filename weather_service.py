@@ -0,0 +1,275 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from metrics import get_metrics
+from weather_record import to_dicts
+from weatherapi_collector import WeatherAPIDataCollector
+
+
+class SingleFlight:
+    """
+    Объединение одновременных запросов с одним ключом
+
+    Пока запрос по ключу выполняется, остальные вызовы с тем же ключом
+    ждут его результата, а не делают свой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Tuple[threading.Event, list]] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable):
+        """Выполнить fn один раз для всех одновременных вызовов с ключом key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), [None, None])
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        event, outcome = call
+        if leader:
+            try:
+                outcome[0] = fn()
+            except Exception as e:
+                outcome[1] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                event.set()
+        else:
+            event.wait()
+
+        if outcome[1] is not None:
+            raise outcome[1]
+        return outcome[0]
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class WeatherService:
+    """
+    Локальный сервис погоды поверх одного WeatherAPIDataCollector
+
+    Ответы хранятся в памяти: свежие (моложе ttl) отдаются сразу,
+    устаревшие, но моложе ttl + stale_ttl, тоже отдаются сразу, а
+    обновление запускается в фоне (stale-while-revalidate). Запросы к
+    провайдеру по одной локации объединяются (single-flight), поэтому
+    все клиенты делят один лимит запросов.
+    
+    Хранилище ответов - LRU на max_entries локаций; ответы старше
+    ttl + stale_ttl удаляются, а не просто перестают отдаваться.
+    """
+
+    def __init__(self, collector: Optional[WeatherAPIDataCollector] = None,
+                 ttl: float = 300, stale_ttl: float = 1800, refresh_workers: int = 4,
+                 max_entries: int = 10000):
+        """
+        Инициализация сервиса
+
+        Args:
+            collector: Сборщик для запросов к провайдеру
+            ttl: Срок свежести ответа в секундах
+            stale_ttl: Сколько еще секунд можно отдавать устаревший ответ
+            refresh_workers: Число потоков фонового обновления
+            max_entries: Сколько ответов держать в памяти
+        """
+        self.collector = collector or WeatherAPIDataCollector()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.flight = SingleFlight()
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._refreshing = set()
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers,
+                                             thread_name_prefix='weather-refresh')
+        self.counters = {'fresh': 0, 'stale': 0, 'miss': 0, 'upstream': 0, 'errors': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+        get_metrics().inc('weather_service_events_total', event=name)
+
+    @staticmethod
+    def make_key(kind: str, query: str, days: int = 0) -> str:
+        return f"{kind}|{' '.join(query.split()).lower()}|{days}"
+
+    def _fetch(self, kind: str, query: str, days: int) -> Optional[Dict]:
+        """Запрос к провайдеру через сборщик"""
+        self._count('upstream')
+        if kind == 'current':
+            record = self.collector.get_current_weather(query)
+            return to_dicts([record])[0] if record else None
+        result = self.collector.get_weather_with_forecast(query, days)
+        if not result['current']:
+            return None
+        return {'current': to_dicts([result['current']])[0],
+                'forecast': to_dicts(result['forecast'])}
+
+    def _store(self, key: str, payload: Dict):
+        """Сохранение ответа с вытеснением старых (вызывать под _lock)"""
+        now = time.time()
+        self._entries[key] = (now, payload)
+        self._entries.move_to_end(key)
+
+        if now >= self._next_prune:
+            # Полный проход по истекшим - не чаще раза в ttl
+            expired = now - self.ttl - self.stale_ttl
+            for old_key in [k for k, (stored, _) in self._entries.items() if stored < expired]:
+                del self._entries[old_key]
+            self._next_prune = now + self.ttl
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str, kind: str, query: str, days: int) -> Optional[Dict]:
+        def fetch():
+            payload = self._fetch(kind, query, days)
+            if payload:
+                with self._lock:
+                    self._store(key, payload)
+            else:
+                self._count('errors')
+            return payload
+        return self.flight.do(key, fetch)
+
+    def _refresh(self, key: str, kind: str, query: str, days: int):
+        """Фоновое обновление устаревшего ответа"""
+        try:
+            self._load(key, kind, query, days)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, kind: str, query: str, days: int = 3) -> Tuple[Optional[Dict], str]:
+        """
+        Ответ для локации
+
+        Args:
+            kind: 'current' или 'forecast'
+            query: Город или другой запрос q
+            days: Дней прогноза (для forecast, не больше предела сборщика)
+
+        Returns:
+            (данные или None, состояние: fresh, stale или miss)
+        """
+        if kind == 'current':
+            days = 0
+        else:
+            days = min(max(days, 1), self.collector.max_forecast_days)
+        key = self.make_key(kind, query, days)
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.time() - entry[0] if entry else None
+            if entry and age >= self.ttl + self.stale_ttl:
+                del self._entries[key]
+                entry = None
+            elif entry:
+                self._entries.move_to_end(key)
+            # Проверка и пометка в одной критической секции: одно обновление на ключ
+            schedule = bool(entry) and age >= self.ttl and key not in self._refreshing
+            if schedule:
+                self._refreshing.add(key)
+
+        if entry and age < self.ttl:
+            self._count('fresh')
+            return entry[1], 'fresh'
+        if entry:
+            self._count('stale')
+            if schedule:
+                try:
+                    self._refresher.submit(self._refresh, key, kind, query, days)
+                except RuntimeError:
+                    # Сервис закрывается
+                    with self._lock:
+                        self._refreshing.discard(key)
+            return entry[1], 'stale'
+
+        self._count('miss')
+        return self._load(key, kind, query, days), 'miss'
+
+    def stats(self) -> Dict:
+        """Счетчики сервиса"""
+        with self._lock:
+            return dict(self.counters, coalesced=self.flight.coalesced, entries=len(self._entries))
+
+    def close(self):
+        self._refresher.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: WeatherService = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status: int = 200, headers: Optional[Dict] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        path = url.path.rstrip('/')
+
+        if path == '/health':
+            return self._send_json({'status': 'ok', **self.service.stats()})
+        if path == '/metrics':
+            body = get_metrics().to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if path not in ('/current', '/forecast'):
+            return self._send_json({'error': 'неизвестный путь'}, 404)
+
+        query = params.get('q', [''])[0].strip()
+        if not query:
+            return self._send_json({'error': 'нужен параметр q'}, 400)
+        try:
+            days = int(params.get('days', ['3'])[0])
+        except ValueError:
+            return self._send_json({'error': 'days должен быть числом'}, 400)
+
+        payload, state = self.service.get(path[1:], query, days)
+        if payload is None:
+            return self._send_json({'error': f"нет данных для '{query}'"}, 502)
+        self._send_json(payload, headers={'X-Cache': state})
+
+
+def serve(host: str = '127.0.0.1', port: int = 8080,
+          service: Optional[WeatherService] = None) -> ThreadingHTTPServer:
+    """
+    Создание HTTP сервера сервиса погоды
+
+    Пути: /current?q=<город>, /forecast?q=<город>&days=3, /health,
+    /metrics (метрики запросов к провайдеру в формате Prometheus).
+    Заголовок X-Cache показывает, откуда ответ: fresh, stale или miss.
+
+    Returns:
+        Сервер; запуск - serve_forever()
+    """
+    handler = type('WeatherServiceHandler', (_Handler,), {'service': service or WeatherService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -1,15 +1,30 @@
 from api_collector import APIDataCollector
-from typing import Dict, List
+from geocoder import get_location_resolver
+from weather_record import WeatherRecord, ForecastDay
+from batch_parser import parse_current_batch
+from observation_store import get_observation_store
+from aggregates import get_aggregate_store
+from metrics import get_metrics
+from profiler import profiled
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 from datetime import datetime
-import random
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class WeatherAPIDataCollector(APIDataCollector):
     """Сборщик данных о погоде с WeatherAPI.com"""
     
+    bulk_batch_size = 50
+    max_forecast_days = 3  # предел бесплатного тарифа
+    
     def __init__(self):
         super().__init__('weatherapi')
+        self.resolver = get_location_resolver()
+        self.store = get_observation_store()
+        self.aggregates = get_aggregate_store()
     
-    def get_current_weather(self, city: str) -> Dict:
+    def get_current_weather(self, city: str) -> Optional[WeatherRecord]:
         """
         Получение текущей погоды для города
         
@@ -17,72 +32,159 @@ class WeatherAPIDataCollector(APIDataCollector):
             city: Название города
             
         Returns:
-            Словарь с данными о погоде
+            Запись WeatherRecord с данными о погоде (None при ошибке)
         """
-        params = {
-            'q': city,
+        data = self.safe_request_with_delay('/current.json', self._current_params(city))
+        return self._handle_current_response(data, city)
+    
+    def _current_params(self, city: str) -> Dict:
+        """Параметры запроса текущей погоды"""
+        return self._query_params(self.resolve_query(city))
+    
+    @staticmethod
+    def _query_params(query: str) -> Dict:
+        """Параметры запроса текущей погоды по готовой строке q"""
+        return {
+            'q': query,
             'aqi': 'no'
         }
+    
+    def _store_observations(self, records: List[WeatherRecord]):
+        """Запись наблюдений в историю и сводки (дубликаты по last_updated отбрасываются)"""
+        if self.demo_mode or not records:
+            return
+        if self.store is not None:
+            try:
+                self.store.add_many(records)
+            except Exception as e:
+                print(f"   ⚠️  Не удалось записать историю: {e}")
+        if self.aggregates is not None:
+            try:
+                self.aggregates.ingest_many(records)
+            except Exception as e:
+                print(f"   ⚠️  Не удалось обновить сводки: {e}")
+    
+    def search_locations(self, query: str) -> Optional[List[Dict]]:
+        """
+        Поиск локаций через /search.json
+        
+        Args:
+            query: Название города или его часть
+            
+        Returns:
+            Список найденных локаций (id, name, region, country, lat, lon);
+            None, если запрос не удался
+        """
+        data = self.safe_request_with_delay('/search.json', {'q': query})
+        return data if isinstance(data, list) else None
+    
+    def resolve_query(self, city: str) -> str:
+        """
+        Каноническая строка q для города
         
-        data = self.safe_request_with_delay('/current.json', params)
+        Разные написания одного города разрешаются в одну локацию WeatherAPI
+        (один раз через /search.json, дальше из постоянного индекса), и запрос
+        идет по id:<id>. Если разрешить не удалось, возвращается исходная строка.
+        """
+        if self.demo_mode or self.resolver is None:
+            return city
+        location = self.resolver.resolve(city, self.search_locations)
+        return self.resolver.canonical_query(location) if location else city
+    
+    def _known_query(self, city: str) -> Optional[str]:
+        """
+        Каноническая строка q, если город уже разрешен (без запроса к /search.json)
         
-        if data and 'current' in data:
-            return self._parse_weather_data(data, city)
-        else:
+        Returns:
+            Строка q или None, если города еще нет в индексе локаций
+        """
+        if self.demo_mode or self.resolver is None:
+            return city
+        location = self.resolver.lookup(city)
+        return self.resolver.canonical_query(location) if location else None
+    
+    def _remember_location(self, city: str, location: Dict) -> Optional[str]:
+        """
+        Запомнить локацию из ответа API как разрешение города
+        
+        Returns:
+            Каноническая строка q или None, если в ответе нет координат
+        """
+        if self.resolver is None or location.get('lat') is None or location.get('lon') is None:
+            return None
+        location = {
+            'id': location.get('id'),
+            'name': location.get('name', ''),
+            'region': location.get('region', ''),
+            'country': location.get('country', ''),
+            'lat': location['lat'],
+            'lon': location['lon'],
+            'url': location.get('url', '')
+        }
+        self.resolver.remember(city, location)
+        return self.resolver.canonical_query(location)
+    
+    def _handle_current_response(self, data: Dict, city: str) -> Optional[WeatherRecord]:
+        """Разбор ответа /current.json с сообщением об ошибке"""
+        record = self._parse_weather_data(data, city) if data and 'current' in data else None
+        if record is None:
             print(f"   ❌ Не удалось получить данные для {city}")
-            return {}
+            return None
+        self._store_observations([record])
+        return record
     
-    def _parse_weather_data(self, data: Dict, city: str) -> Dict:
+    @profiled('parse')
+    def _parse_weather_data(self, data: Dict, city: str) -> Optional[WeatherRecord]:
         """Парсинг данных о погоде из ответа WeatherAPI"""
         try:
             location = data.get('location', {})
             current = data.get('current', {})
             condition = current.get('condition', {})
             
-            result = {
-                'city': city,
-                'city_name': location.get('name', city),
-                'country': location.get('country', ''),
-                'region': location.get('region', ''),
-                'latitude': location.get('lat', None),
-                'longitude': location.get('lon', None),
-                'local_time': location.get('localtime', ''),
+            result = WeatherRecord(
+                city=city,
+                city_name=location.get('name', city),
+                country=location.get('country', ''),
+                region=location.get('region', ''),
+                latitude=location.get('lat', None),
+                longitude=location.get('lon', None),
+                local_time=location.get('localtime', ''),
                 
-                'temperature_c': current.get('temp_c', None),
-                'feelslike_c': current.get('feelslike_c', None),
-                'temperature_f': current.get('temp_f', None),
-                'feelslike_f': current.get('feelslike_f', None),
+                temperature_c=current.get('temp_c', None),
+                feelslike_c=current.get('feelslike_c', None),
+                temperature_f=current.get('temp_f', None),
+                feelslike_f=current.get('feelslike_f', None),
                 
-                'humidity': current.get('humidity', None),
-                'pressure_mb': current.get('pressure_mb', None),
-                'pressure_in': current.get('pressure_in', None),
+                humidity=current.get('humidity', None),
+                pressure_mb=current.get('pressure_mb', None),
+                pressure_in=current.get('pressure_in', None),
                 
-                'wind_kph': current.get('wind_kph', None),
-                'wind_mph': current.get('wind_mph', None),
-                'wind_dir': current.get('wind_dir', ''),
-                'wind_degree': current.get('wind_degree', None),
-                'gust_kph': current.get('gust_kph', None),
-                'gust_mph': current.get('gust_mph', None),
+                wind_kph=current.get('wind_kph', None),
+                wind_mph=current.get('wind_mph', None),
+                wind_dir=current.get('wind_dir', ''),
+                wind_degree=current.get('wind_degree', None),
+                gust_kph=current.get('gust_kph', None),
+                gust_mph=current.get('gust_mph', None),
                 
-                'cloud': current.get('cloud', None),
-                'visibility_km': current.get('vis_km', None),
-                'visibility_miles': current.get('vis_miles', None),
+                cloud=current.get('cloud', None),
+                visibility_km=current.get('vis_km', None),
+                visibility_miles=current.get('vis_miles', None),
                 
-                'condition_text': condition.get('text', ''),
-                'condition_icon': condition.get('icon', ''),
-                'condition_code': condition.get('code', None),
+                condition_text=condition.get('text', ''),
+                condition_icon=condition.get('icon', ''),
+                condition_code=condition.get('code', None),
                 
-                'uv_index': current.get('uv', None),
+                uv_index=current.get('uv', None),
                 
-                'last_updated': current.get('last_updated', ''),
-                'scraped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+                last_updated=current.get('last_updated', ''),
+                scraped_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
             
             return result
             
         except Exception as e:
             print(f"   ❌ Ошибка парсинга данных погоды: {e}")
-            return {}
+            return None
     
     def get_detailed_weather(self, city: str) -> Dict:
         """
@@ -119,65 +221,203 @@ class WeatherAPIDataCollector(APIDataCollector):
         
         return weather_data
     
-    def collect_multiple_cities(self, cities: List[str]) -> List[Dict]:
+    def get_current_weather_bulk(self, cities: List[str],
+                                 batch_size: int = None) -> List[Optional[WeatherRecord]]:
+        """
+        Получение текущей погоды через bulk-запросы (до 50 локаций за вызов)
+        
+        Args:
+            cities: Список названий городов
+            batch_size: Размер пачки (по умолчанию bulk_batch_size)
+            
+        Returns:
+            Список с данными о погоде в порядке входного списка (None при ошибке)
+        """
+        payloads = self._fetch_current_bulk(cities, batch_size)
+        results = [self._parse_weather_data(payload, city) if payload else None
+                   for payload, city in zip(payloads, cities)]
+        for city, record in zip(cities, results):
+            if record is None:
+                print(f"   ❌ Не удалось получить данные для {city}")
+        self._store_observations([record for record in results if record is not None])
+        return results
+    
+    def _fetch_current_bulk(self, cities: List[str], batch_size: int = None) -> List[Optional[Dict]]:
+        """
+        Сырые ответы /current.json для списка городов через bulk-запросы
+        
+        Города, которые уже есть в кэше, не запрашиваются. Еще не разрешенные
+        города уходят в bulk-запрос как есть (без /search.json на каждый) и
+        разрешаются по блоку location ответа. Города, для которых bulk-ответ
+        содержит ошибку или не вернулся, запрашиваются по одному.
+        
+        Returns:
+            Ответы с блоками location и current в порядке городов (None при ошибке)
+        """
+        batch_size = min(batch_size or self.bulk_batch_size, self.bulk_batch_size)
+        use_cache = self.cache is not None and not self.demo_mode
+        payloads: List[Optional[Dict]] = [None for _ in cities]
+        queries = [self._known_query(city) for city in cities]
+        pending = []
+        
+        for i, city in enumerate(cities):
+            # Неразрешенного города в кэше нет: ключ кэша - каноническая строка q
+            cached = (self.cache.get('/current.json', self._query_params(queries[i]))
+                      if use_cache and queries[i] is not None else None)
+            if use_cache:
+                get_metrics().inc('weather_cache_requests_total', endpoint='/current.json',
+                                  result='hit' if cached else 'miss')
+            if cached:
+                payloads[i] = cached
+            else:
+                pending.append(i)
+        
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            batch_ids = set(batch)
+            locations = [{'q': queries[i] or cities[i], 'custom_id': str(i)} for i in batch]
+            items = self.make_bulk_request('/current.json', locations, {'aqi': 'no'})
+            
+            for item in items:
+                custom_id = item.get('custom_id')
+                if custom_id is None or 'current' not in item:
+                    continue
+                i = int(custom_id)
+                if i not in batch_ids:
+                    continue
+                if queries[i] is None:
+                    queries[i] = self._remember_location(cities[i], item.get('location') or {})
+                payloads[i] = {'location': item.get('location', {}), 'current': item['current']}
+                if use_cache and queries[i] is not None:
+                    self.cache.put('/current.json', self._query_params(queries[i]), payloads[i])
+        
+        failed = [i for i in pending if payloads[i] is None]
+        if failed:
+            print(f"   ⚠️  Bulk-ответ без данных для {len(failed)} городов, запрашиваем по одному")
+        for i in failed:
+            data = self.safe_request_with_delay('/current.json', self._current_params(cities[i]))
+            if data and 'current' in data:
+                payloads[i] = data
+        
+        return payloads
+    
+    def collect_multiple_cities(self, cities: List[str], bulk: bool = False,
+                                on_record: Optional[Callable[[WeatherRecord], None]] = None
+                                ) -> List[WeatherRecord]:
         """
         Сбор погоды для нескольких городов
         
         Args:
             cities: Список названий городов
+            bulk: Запрашивать города пачками через bulk-endpoint
+            on_record: Вызывается для каждой полученной записи (потоковая запись)
             
         Returns:
             Список с данными о погоде
         """
         all_weather = []
         
+        def keep(weather_data: WeatherRecord):
+            all_weather.append(weather_data)
+            if on_record:
+                on_record(weather_data)
+        
+        self.stream_multiple_cities(cities, keep, bulk=bulk)
+        return all_weather
+    
+    def stream_multiple_cities(self, cities: List[str],
+                               on_record: Callable[[WeatherRecord], None],
+                               bulk: bool = False) -> int:
+        """
+        Сбор погоды для нескольких городов без накопления записей в памяти
+        
+        Каждая запись сразу передается в on_record; в bulk-режиме в памяти
+        держится не больше одной пачки bulk_batch_size.
+        
+        Args:
+            cities: Список названий городов
+            on_record: Вызывается для каждой полученной записи
+            bulk: Запрашивать города пачками через bulk-endpoint
+            
+        Returns:
+            Число полученных записей
+        """
+        received = 0
+        prefetched: List[Optional[WeatherRecord]] = []
+        
         print(f"📊 Начинаем сбор данных для {len(cities)} городов...")
         
         for i, city in enumerate(cities, 1):
             print(f"\n[{i}/{len(cities)}] Город: {city}")
             
-            weather_data = self.get_current_weather(city)
+            if bulk:
+                if not prefetched:
+                    prefetched = self.get_current_weather_bulk(cities[i - 1:i - 1 + self.bulk_batch_size])
+                    prefetched.reverse()
+                weather_data = prefetched.pop()
+            else:
+                weather_data = self.get_current_weather(city)
             
             if weather_data:
-                all_weather.append(weather_data)
+                received += 1
+                on_record(weather_data)
                 print(f"   ✅ Данные получены")
                 print(f"   🌡  {weather_data.get('temperature_c', 'N/A')}°C, "
                       f"💨 {weather_data.get('wind_kph', 'N/A')} км/ч, "
                       f"💧 {weather_data.get('humidity', 'N/A')}%")
             else:
                 if self.demo_mode:
-                    mock_data = self._create_mock_data(city)
-                    all_weather.append(mock_data)
+                    received += 1
+                    on_record(self._create_mock_data(city))
                     print(f"   📝 Созданы тестовые данные")
         
         print(f"\n{'='*50}")
-        print(f"✅ Собраны данные для {len(all_weather)} из {len(cities)} городов")
-        return all_weather
+        print(f"✅ Собраны данные для {received} из {len(cities)} городов")
+        return received
     
-    def _create_mock_data(self, city: str) -> Dict:
+    def collect_frame(self, cities: List[str], bulk: bool = False) -> 'pd.DataFrame':
+        """
+        Сбор погоды для списка городов сразу в DataFrame
+        
+        Сырые ответы разбираются пачкой в колонки (batch_parser), без
+        промежуточной записи на каждый город.
+        
+        Args:
+            cities: Список названий городов
+            bulk: Запрашивать города пачками через bulk-endpoint
+            
+        Returns:
+            DataFrame с колонками WeatherRecord
+        """
+        if bulk:
+            payloads = self._fetch_current_bulk(cities)
+        else:
+            payloads = [self.safe_request_with_delay('/current.json', self._current_params(city))
+                        for city in cities]
+        
+        df = parse_current_batch(payloads, cities)
+        if not self.demo_mode and len(df):
+            if self.store is not None:
+                try:
+                    self.store.add_frame(df)
+                except Exception as e:
+                    print(f"   ⚠️  Не удалось записать историю: {e}")
+            if self.aggregates is not None:
+                try:
+                    # NaN пустых категорий (country, region) - в None, как в WeatherRecord
+                    self.aggregates.ingest_many(df.astype(object).where(df.notna(), None).to_dict('records'))
+                except Exception as e:
+                    print(f"   ⚠️  Не удалось обновить сводки: {e}")
+        print(f"✅ Собраны данные для {len(df)} из {len(cities)} городов")
+        return df
+    
+    def _create_mock_data(self, city: str) -> WeatherRecord:
         """Создание тестовых данных для демо-режима"""
-        conditions = [
-            "Sunny", "Partly cloudy", "Cloudy", "Overcast", 
-            "Light rain", "Moderate rain", "Light snow"
-        ]
+        from synthetic_weather import get_synthetic_weather
         
-        return {
-            'city': city,
-            'city_name': city,
-            'country': random.choice(['Russia', 'USA', 'UK', 'Japan']),
-            'temperature_c': random.randint(-10, 35),
-            'feelslike_c': random.randint(-15, 30),
-            'humidity': random.randint(30, 95),
-            'pressure_mb': random.randint(980, 1030),
-            'wind_kph': round(random.uniform(0, 30), 1),
-            'wind_dir': random.choice(['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']),
-            'cloud': random.randint(0, 100),
-            'condition_text': random.choice(conditions),
-            'scraped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'demo_mode': True
-        }
+        return get_synthetic_weather().records([city])[0]
     
-    def get_forecast(self, city: str, days: int = 3) -> List[Dict]:
+    def get_forecast(self, city: str, days: int = 3) -> List[ForecastDay]:
         """
         Получение прогноза погоды
         
@@ -188,34 +428,70 @@ class WeatherAPIDataCollector(APIDataCollector):
         Returns:
             Список прогнозов по дням
         """
+        return self.get_weather_with_forecast(city, days)['forecast']
+    
+    def get_weather_with_forecast(self, city: str, days: int = 3) -> Dict:
+        """
+        Текущая погода и прогноз одним запросом к /forecast.json
+        
+        Ответ /forecast.json уже содержит блоки location и current, поэтому
+        текущая погода разбирается из него же и кладется в кэш /current.json:
+        последующий get_current_weather для этого города не пойдет в сеть.
+        
+        Args:
+            city: Название города
+            days: Количество дней прогноза (макс 3 для бесплатного тарифа)
+            
+        Returns:
+            Словарь {'current': WeatherRecord или None при ошибке, 'forecast': список ForecastDay}
+        """
         params = {
-            'q': city,
-            'days': min(days, 3),  
+            'q': self.resolve_query(city),
+            'days': min(days, self.max_forecast_days),
             'aqi': 'no',
             'alerts': 'no'
         }
         
         data = self.safe_request_with_delay('/forecast.json', params)
+        result = {'current': None, 'forecast': []}
+        
+        if not data:
+            return result
+        
+        if 'current' in data:
+            result['current'] = self._parse_weather_data(data, city)
+        if result['current'] is not None:
+            self._store_observations([result['current']])
+            if self.cache is not None and not self.demo_mode:
+                payload = {'location': data.get('location', {}), 'current': data['current']}
+                self.cache.put('/current.json', self._current_params(city), payload)
+        
+        if 'forecast' in data:
+            result['forecast'] = self._parse_forecast_days(data)
+        
+        return result
+    
+    @profiled('parse')
+    def _parse_forecast_days(self, data: Dict) -> List[ForecastDay]:
+        """Парсинг дней прогноза из ответа /forecast.json"""
         forecasts = []
+        forecast_days = data['forecast'].get('forecastday', [])
+        
+        for day_data in forecast_days:
+            day_info = day_data.get('day', {})
+            forecast = ForecastDay(
+                date=day_data.get('date', ''),
+                max_temp_c=day_info.get('maxtemp_c', None),
+                min_temp_c=day_info.get('mintemp_c', None),
+                avg_temp_c=day_info.get('avgtemp_c', None),
+                max_wind_kph=day_info.get('maxwind_kph', None),
+                total_precip_mm=day_info.get('totalprecip_mm', None),
+                avg_humidity=day_info.get('avghumidity', None),
+                condition=day_info.get('condition', {}).get('text', ''),
+                uv_index=day_info.get('uv', None),
+                sunrise=day_data.get('astro', {}).get('sunrise', ''),
+                sunset=day_data.get('astro', {}).get('sunset', '')
+            )
+            forecasts.append(forecast)
         
-        if data and 'forecast' in data:
-            forecast_days = data['forecast'].get('forecastday', [])
-            
-            for day_data in forecast_days:
-                day_info = day_data.get('day', {})
-                forecast = {
-                    'date': day_data.get('date', ''),
-                    'max_temp_c': day_info.get('maxtemp_c', None),
-                    'min_temp_c': day_info.get('mintemp_c', None),
-                    'avg_temp_c': day_info.get('avgtemp_c', None),
-                    'max_wind_kph': day_info.get('maxwind_kph', None),
-                    'total_precip_mm': day_info.get('totalprecip_mm', None),
-                    'avg_humidity': day_info.get('avghumidity', None),
-                    'condition': day_info.get('condition', {}).get('text', ''),
-                    'uv_index': day_info.get('uv', None),
-                    'sunrise': day_data.get('astro', {}).get('sunrise', ''),
-                    'sunset': day_data.get('astro', {}).get('sunset', '')
-                }
-                forecasts.append(forecast)
-        
-        return forecasts
\ No newline at end of file
+        return forecasts
@@ -0,0 +1,159 @@
+import time
+from typing import Dict, List, Optional
+from shared import connect_sqlite
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    Локальная устойчивая очередь заданий на SQLite с арендой
+
+    Воркер берет пачку заданий в аренду на lease_timeout секунд и либо
+    подтверждает их (complete), либо возвращает (fail). Если процесс
+    воркера упал, аренда истекает и задания снова выдаются другим
+    воркерам. Очередь безопасна для нескольких процессов: выдача идет
+    в транзакции BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, db_path: str = 'data/runs/queue.sqlite', name: str = 'weatherapi',
+                 lease_timeout: float = 120, max_attempts: int = 3):
+        """
+        Открытие очереди
+
+        Args:
+            db_path: Путь к SQLite файлу очереди
+            name: Имя очереди (в одном файле может быть несколько)
+            lease_timeout: Срок аренды заданий в секундах
+            max_attempts: После стольких неудач задание помечается failed
+        """
+        self.db_path = db_path
+        self.name = name
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self.conn = connect_sqlite(db_path, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue_items ("
+            "queue TEXT NOT NULL, item TEXT NOT NULL, position INTEGER NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "owner TEXT, lease_expires REAL, error TEXT, "
+            "PRIMARY KEY (queue, item))"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_queue_items_status "
+            "ON queue_items (queue, status, position)"
+        )
+
+    def enqueue(self, items: List[str]) -> int:
+        """
+        Добавить задания (уже известные не сбрасываются)
+
+        Returns:
+            Число новых заданий
+        """
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            start = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM queue_items WHERE queue = ?",
+                (self.name,)
+            ).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO queue_items (queue, item, position, status) "
+                "VALUES (?, ?, ?, ?)",
+                [(self.name, item, start + i, PENDING) for i, item in enumerate(items)]
+            )
+        return self.conn.total_changes - before
+
+    def lease(self, owner: str, batch_size: int = 25) -> List[str]:
+        """
+        Взять в аренду пачку заданий
+
+        Выдаются ожидающие задания и задания с истекшей арендой.
+
+        Args:
+            owner: Идентификатор воркера
+            batch_size: Размер пачки
+
+        Returns:
+            Список заданий (пустой, если выдавать нечего)
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # Задание, на котором воркеры падают снова и снова, больше не выдается
+            self.conn.execute(
+                "UPDATE queue_items SET status = ?, error = ? WHERE queue = ? AND status = ? "
+                "AND lease_expires < ? AND attempts >= ?",
+                (FAILED, 'аренда истекла', self.name, LEASED, now, self.max_attempts)
+            )
+            items = [row[0] for row in self.conn.execute(
+                "SELECT item FROM queue_items WHERE queue = ? AND "
+                "(status = ? OR (status = ? AND lease_expires < ?)) "
+                "ORDER BY position LIMIT ?",
+                (self.name, PENDING, LEASED, now, batch_size)
+            )]
+            self.conn.executemany(
+                "UPDATE queue_items SET status = ?, owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE queue = ? AND item = ?",
+                [(LEASED, owner, now + self.lease_timeout, self.name, item) for item in items]
+            )
+        return items
+
+    def renew(self, owner: str):
+        """Продлить аренду всех заданий воркера"""
+        self.conn.execute(
+            "UPDATE queue_items SET lease_expires = ? WHERE queue = ? AND owner = ? AND status = ?",
+            (time.time() + self.lease_timeout, self.name, owner, LEASED)
+        )
+
+    def complete(self, owner: str, items: List[str]):
+        """Подтвердить выполнение заданий"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "UPDATE queue_items SET status = ?, lease_expires = NULL, error = NULL "
+                "WHERE queue = ? AND item = ? AND owner = ?",
+                [(DONE, self.name, item, owner) for item in items]
+            )
+
+    def fail(self, owner: str, items: List[str], error: str = ''):
+        """Вернуть задания в очередь или пометить failed после max_attempts"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "UPDATE queue_items SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "lease_expires = NULL, error = ? WHERE queue = ? AND item = ? AND owner = ?",
+                [(self.max_attempts, FAILED, PENDING, error, self.name, item, owner)
+                 for item in items]
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Число заданий по статусам"""
+        return dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM queue_items WHERE queue = ? GROUP BY status",
+            (self.name,)
+        ).fetchall())
+
+    def unfinished(self) -> int:
+        """Число заданий, которые еще не выполнены и не провалены"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM queue_items WHERE queue = ? AND status IN (?, ?)",
+            (self.name, PENDING, LEASED)
+        ).fetchone()[0]
+
+    def items(self, status: Optional[str] = None) -> List[str]:
+        """Задания очереди в порядке добавления"""
+        sql = "SELECT item FROM queue_items WHERE queue = ?"
+        params = [self.name]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        return [row[0] for row in self.conn.execute(sql + " ORDER BY position", params)]
+
+    def close(self):
+        self.conn.close()